@@ -1,18 +1,59 @@
 # app/__init__.py
+import time
+import logging
 from flask import Flask
 from .config import Config
-from .services.catalogue import init_catalogue
+from .services.catalogue import (
+    init_catalogue, start_inference, start_reload_timer, refresh_if_from_snapshot, watch_reload_stamp,
+)
+from .services import sheets
+from .utils.runtime import memory_report
+from .utils.logger import configure_logging
+
+logger = logging.getLogger(__name__)
+
 
 def create_app():
+    started = time.monotonic()
     app = Flask(__name__)
     app.config.from_object(Config)
-    
+    configure_logging(app.config)
+
     # Register blueprints
     from .routes import main_bp
     app.register_blueprint(main_bp)
-    
-    # Initialize services
-    with app.app_context():
-        init_catalogue()
-    
-    return app
\ No newline at end of file
+
+    # Initialize services. With CATALOGUE_PRELOAD off, the model and the
+    # catalogue are loaded by the first search instead.
+    if app.config['CATALOGUE_PRELOAD']:
+        with app.app_context():
+            init_catalogue()
+
+    # Threads don't survive fork(): under a preloading gunicorn master these
+    # are started per worker from gunicorn.conf.py instead.
+    if not app.config['DEFER_BACKGROUND_SERVICES']:
+        start_background_services(app)
+
+    logger.info("🚀 App created in %.2fs, memory: %s", time.monotonic() - started, memory_report())
+    return app
+
+
+def start_background_services(app):
+    """
+    Starts the per-process background threads (Sheets write-behind queue,
+    query inference batching, catalogue reload timer / refresh). Call once
+    in every process that serves requests.
+    """
+    # Connections opened before a fork must not be shared with the parent
+    sheets.invalidate(drop_client=True)
+
+    if app.config['SHEETS_WRITE_BEHIND']:
+        sheets.start_write_behind(app)
+    if app.config['INFERENCE_BATCHING']:
+        start_inference(app)
+    if app.config['CATALOGUE_RELOAD_SECONDS']:
+        start_reload_timer(app, app.config['CATALOGUE_RELOAD_SECONDS'])
+    # Follow reloads that other workers are asked for
+    watch_reload_stamp(app)
+    # Started from the local snapshot: pick up sheet edits made since
+    refresh_if_from_snapshot(app)
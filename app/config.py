@@ -14,9 +14,149 @@ class Config:
     CATALOGUE_TAB           = os.getenv('CATALOGUE_TAB', 'Catalogue')
     ORDERS_TAB              = os.getenv('ORDERS_TAB', 'Orders_Status')
     ORDERS_LOG_TAB          = os.getenv('ORDERS_LOG_TAB', 'Orders_Log')
+
+    # Write-behind queue for Orders_Status / Orders_Log writes. A write that
+    # failed SHEETS_WRITE_MAX_ATTEMPTS times (or can't succeed, e.g. a 400)
+    # is moved to dead-letter.jsonl in SHEETS_SPOOL_DIR.
+    SHEETS_WRITE_BEHIND       = os.getenv('SHEETS_WRITE_BEHIND', 'True') == 'True'
+    SHEETS_FLUSH_INTERVAL_MS  = int(os.getenv('SHEETS_FLUSH_INTERVAL_MS', 500))
+    SHEETS_FLUSH_MAX_ROWS     = int(os.getenv('SHEETS_FLUSH_MAX_ROWS', 50))
+    SHEETS_QUEUE_SIZE         = int(os.getenv('SHEETS_QUEUE_SIZE', 1000))
+    SHEETS_SPOOL_DIR          = os.getenv('SHEETS_SPOOL_DIR', 'spool')
+    SHEETS_WRITE_MAX_ATTEMPTS = int(os.getenv('SHEETS_WRITE_MAX_ATTEMPTS', 8))
+
+    # Client-side Sheets quota (per process) and retries of 429 / 5xx answers.
+    # Message-log writes made inside a request give up waiting for quota
+    # after SHEETS_LOG_WAIT_SECONDS and are retried with the next log write.
+    SHEETS_REQUESTS_PER_MINUTE    = float(os.getenv('SHEETS_REQUESTS_PER_MINUTE', 60))
+    SHEETS_BURST                  = int(os.getenv('SHEETS_BURST', 10))
+    SHEETS_MAX_RETRIES            = int(os.getenv('SHEETS_MAX_RETRIES', 5))
+    SHEETS_BACKOFF_BASE_SECONDS   = float(os.getenv('SHEETS_BACKOFF_BASE_SECONDS', 1.0))
+    SHEETS_BACKOFF_MAX_SECONDS    = float(os.getenv('SHEETS_BACKOFF_MAX_SECONDS', 32))
+    SHEETS_LOG_WAIT_SECONDS       = float(os.getenv('SHEETS_LOG_WAIT_SECONDS', 2))
+    SHEETS_UNLOGGED_MAX_ROWS      = int(os.getenv('SHEETS_UNLOGGED_MAX_ROWS', 1000))
+
+    # (phone, SKU_ID) -> row index over the Orders tab; new rows are read
+    # incrementally at most this often
+    ORDERS_INDEX_RECONCILE_SECONDS = int(os.getenv('ORDERS_INDEX_RECONCILE_SECONDS', 60))
     
+    # Sentence-transformer model and the on-disk embedding cache
+    # (set EMBEDDING_CACHE_DIR empty to always encode in memory)
+    EMBEDDING_MODEL     = os.getenv('EMBEDDING_MODEL', 'paraphrase-MiniLM-L3-v2')
+    EMBEDDING_CACHE_DIR = os.getenv('EMBEDDING_CACHE_DIR', '.cache/embeddings')
+
+    # Matrix each worker scores candidates against: 'float32', 'float16' or
+    # 'int8' (per-dimension scale). With a compressed matrix the best
+    # EMBEDDING_RERANK candidates are re-scored against the exact float32
+    # rows, read lazily from the memory-mapped cache file (without a cache
+    # dir the float32 matrix stays in memory and nothing is saved). int8 is
+    # also faster than float32 on full scans; float16 is slower, since numpy
+    # converts half floats without SIMD. `python -m benchmarks precision`.
+    EMBEDDING_PRECISION = os.getenv('EMBEDDING_PRECISION', 'float32')
+    EMBEDDING_RERANK    = int(os.getenv('EMBEDDING_RERANK', 50))
+
+    # Vector index for the semantic stage: 'flat' (exact), 'ivf' or 'auto'
+    # (ivf from VECTOR_INDEX_MIN_ROWS rows). IVF_NLIST=0 sizes it from the
+    # catalogue; raise IVF_NPROBE for recall, lower it for latency.
+    VECTOR_INDEX          = os.getenv('VECTOR_INDEX', 'auto')
+    VECTOR_INDEX_MIN_ROWS = int(os.getenv('VECTOR_INDEX_MIN_ROWS', 5000))
+    IVF_NLIST             = int(os.getenv('IVF_NLIST', 0))
+    IVF_NPROBE            = int(os.getenv('IVF_NPROBE', 8))
+    SEARCH_CANDIDATES     = int(os.getenv('SEARCH_CANDIDATES', 200))
+
+    # A query naming an item type and a size is only re-ranked over the
+    # rows of that type's N nearest sizes (per DimScheme; 0 = every size)
+    SIZE_INDEX_NEAREST    = int(os.getenv('SIZE_INDEX_NEAREST', 3))
+
+    # Query encodes of concurrent searches are gathered by one inference
+    # thread for up to INFERENCE_BATCH_WINDOW_MS (or INFERENCE_MAX_BATCH
+    # texts) and run as one model call; with 0 only encodes that queued up
+    # during the previous call are batched. INFERENCE_TORCH_THREADS sets
+    # torch's intra-op threads (0 = torch's default, one per core). A search
+    # waits at most INFERENCE_TIMEOUT_SECONDS for its encode (0 = no limit).
+    INFERENCE_BATCHING        = os.getenv('INFERENCE_BATCHING', 'True') == 'True'
+    INFERENCE_BATCH_WINDOW_MS = float(os.getenv('INFERENCE_BATCH_WINDOW_MS', 2))
+    INFERENCE_MAX_BATCH       = int(os.getenv('INFERENCE_MAX_BATCH', 32))
+    INFERENCE_QUEUE_SIZE      = int(os.getenv('INFERENCE_QUEUE_SIZE', 1000))
+    INFERENCE_TORCH_THREADS   = int(os.getenv('INFERENCE_TORCH_THREADS', 0))
+    INFERENCE_TIMEOUT_SECONDS = float(os.getenv('INFERENCE_TIMEOUT_SECONDS', 30))
+
+    # LRU caches for query embeddings and ranked results (TTL 0 = no expiry)
+    SEARCH_CACHE_SIZE        = int(os.getenv('SEARCH_CACHE_SIZE', 1024))
+    SEARCH_CACHE_TTL_SECONDS = int(os.getenv('SEARCH_CACHE_TTL_SECONDS', 3600))
+
+    # Startup: load model + catalogue in create_app() (False = on first
+    # search). Background threads are deferred when a preloading gunicorn
+    # master forks workers (set by gunicorn.conf.py).
+    CATALOGUE_PRELOAD         = os.getenv('CATALOGUE_PRELOAD', 'True') == 'True'
+    DEFER_BACKGROUND_SERVICES = os.getenv('DEFER_BACKGROUND_SERVICES', 'False') == 'True'
+
+    # Catalogue hot reload: re-check the Catalogue tab every N seconds
+    # (0 = off). POST /admin/reload-catalogue with header X-Admin-Token
+    # triggers one on demand; the endpoint is disabled without a token.
+    # The worker that serves it touches CATALOGUE_RELOAD_STAMP_PATH and the
+    # other workers reload within a second of their next search ('' = only
+    # the serving worker reloads).
+    CATALOGUE_RELOAD_SECONDS    = int(os.getenv('CATALOGUE_RELOAD_SECONDS', 0))
+    CATALOGUE_RELOAD_STAMP_PATH = os.getenv('CATALOGUE_RELOAD_STAMP_PATH', '.cache/catalogue.reload')
+    ADMIN_TOKEN                 = os.getenv('ADMIN_TOKEN', '')
+
+    # Conversation state: 'sqlite' (shared by all workers through
+    # CONVERSATION_DB_PATH, so a "yes" routed to another worker still finds
+    # the product) or 'memory' (per worker; only with a single worker).
+    # Idle entries expire after the TTL.
+    CONVERSATION_BACKEND      = os.getenv('CONVERSATION_BACKEND', 'sqlite')
+    CONVERSATION_TTL_SECONDS  = int(os.getenv('CONVERSATION_TTL_SECONDS', 3600))
+    CONVERSATION_MAX_ENTRIES  = int(os.getenv('CONVERSATION_MAX_ENTRIES', 10000))
+    CONVERSATION_DB_PATH      = os.getenv('CONVERSATION_DB_PATH', '.cache/conversations.sqlite3')
+
+    # Webhook de-duplication: a re-delivered message (same MessageSid, or
+    # same From + Body within the window when there is no SID) is answered
+    # with the reply already sent. A retry that arrives while the first
+    # delivery is still running waits up to WEBHOOK_DEDUPE_WAIT_SECONDS for
+    # it. Backend 'sqlite' (shared by all workers; Twilio's retries often
+    # reach another worker) or 'memory' (per worker; only with a single one).
+    WEBHOOK_DEDUPE_ENABLED         = os.getenv('WEBHOOK_DEDUPE_ENABLED', 'True') == 'True'
+    WEBHOOK_DEDUPE_BACKEND         = os.getenv('WEBHOOK_DEDUPE_BACKEND', 'sqlite')
+    WEBHOOK_DEDUPE_TTL_SECONDS     = int(os.getenv('WEBHOOK_DEDUPE_TTL_SECONDS', 600))
+    WEBHOOK_DEDUPE_MAX_ENTRIES     = int(os.getenv('WEBHOOK_DEDUPE_MAX_ENTRIES', 10000))
+    WEBHOOK_DEDUPE_WINDOW_SECONDS  = int(os.getenv('WEBHOOK_DEDUPE_WINDOW_SECONDS', 30))
+    WEBHOOK_DEDUPE_WAIT_SECONDS    = float(os.getenv('WEBHOOK_DEDUPE_WAIT_SECONDS', 10))
+    WEBHOOK_DEDUPE_PENDING_SECONDS = int(os.getenv('WEBHOOK_DEDUPE_PENDING_SECONDS', 30))
+    WEBHOOK_DEDUPE_DB_PATH         = os.getenv('WEBHOOK_DEDUPE_DB_PATH', '.cache/replies.sqlite3')
+
+    # Async webhook pipeline: thread pools for catalogue search and Sheets
+    # I/O, how many calls each admits at once, how long a call may wait to
+    # be admitted and how long the webhook waits for it (seconds)
+    PIPELINE_SEARCH_WORKERS       = int(os.getenv('PIPELINE_SEARCH_WORKERS', 2))
+    PIPELINE_SEARCH_MAX_IN_FLIGHT = int(os.getenv('PIPELINE_SEARCH_MAX_IN_FLIGHT', 8))
+    PIPELINE_IO_WORKERS           = int(os.getenv('PIPELINE_IO_WORKERS', 8))
+    PIPELINE_IO_MAX_IN_FLIGHT     = int(os.getenv('PIPELINE_IO_MAX_IN_FLIGHT', 32))
+    PIPELINE_QUEUE_TIMEOUT        = float(os.getenv('PIPELINE_QUEUE_TIMEOUT', 2))
+    PIPELINE_SEARCH_TIMEOUT       = float(os.getenv('PIPELINE_SEARCH_TIMEOUT', 8))
+    PIPELINE_SHEETS_TIMEOUT       = float(os.getenv('PIPELINE_SHEETS_TIMEOUT', 5))
+
+    # Logging. LOG_LEVELS sets per-module levels, e.g. "gspread=INFO,app.requests=WARNING"
+    LOG_LEVEL        = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_LEVELS       = os.getenv('LOG_LEVELS', 'urllib3=WARNING,huggingface_hub=WARNING,'
+                                               'sentence_transformers=WARNING,gspread=WARNING')
+    # Logs go to stdout; LOG_FILE adds a file every worker appends to (rotate
+    # it externally, e.g. logrotate). LOG_MAX_BYTES > 0 rotates in-process,
+    # which is only safe with a single process.
+    LOG_FILE         = os.getenv('LOG_FILE', '')
+    LOG_MAX_BYTES    = int(os.getenv('LOG_MAX_BYTES', 0))
+    LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+
+    # Prometheus-text /metrics endpoint (per-worker values)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+
     # Payment settings
     UPI_NUMBER             = os.getenv('UPI_NUMBER', '8708065048')
     
-    # Catalogue file fallback (rarely used now—most loads from Sheets)
-    CATALOGUE_FILE = os.getenv('CATALOGUE_FILE', 'catalogue_master.csv')
+    # Catalogue source: 'sheets' (Catalogue tab), 'csv' (CATALOGUE_FILE) or
+    # 'snapshot'. Each Sheets load is saved to CATALOGUE_SNAPSHOT_PATH
+    # (.parquet with pyarrow, else .pkl; empty = off) and startup reads that
+    # snapshot first, then refreshes from Sheets in the background.
+    CATALOGUE_SOURCE        = os.getenv('CATALOGUE_SOURCE', 'sheets')
+    CATALOGUE_FILE          = os.getenv('CATALOGUE_FILE', 'master_catalogue.csv')
+    CATALOGUE_SNAPSHOT_PATH = os.getenv('CATALOGUE_SNAPSHOT_PATH', '.cache/catalogue')
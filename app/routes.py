@@ -1,29 +1,30 @@
 # File: app/routes.py
-from flask import Blueprint, request, Response
+from flask import Blueprint, request, Response, current_app, jsonify, g
+import hmac
+import time
+import asyncio
 import traceback
-import json
-import sys
 import logging
 from datetime import datetime
 
 from twilio.twiml.messaging_response import MessagingResponse
-from app.services.catalogue import enhanced_search
-from app.services import sheets
+from app.services.catalogue import (
+    enhanced_search, batch_search, match_item_types, reload_catalogue, announce_reload,
+)
+from app.services import sheets, pipeline
 from app.utils.conversation_utils import MessageParser, ConversationManager, MessageFormatter
+from app.utils.logger import log_request
+from app.utils.reply_cache import PENDING, delivery_key, get_reply_cache
+from app.utils import metrics
 
-# Set up logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('debug.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
 logger = logging.getLogger(__name__)
 
 main_bp = Blueprint('main', __name__)
 
+_stage_seconds   = metrics.summary('webhook_stage_seconds', 'Webhook latency by stage')
+_request_seconds = metrics.summary('webhook_request_seconds', 'Webhook latency by outcome')
+_duplicates      = metrics.counter('webhook_duplicates_total', 'Re-delivered webhook messages')
+
 # -------------------------------------------------
 # Helper to send quick-reply buttons
 # -------------------------------------------------
@@ -38,170 +39,396 @@ def send_quick_reply(resp, body_text, button_texts):
     # Combine with double line breaks for WhatsApp
     message_text = f"{body_text}\n\n" + "\n".join(options)
     
-    logger.info(f"📤 Sending quick reply message: {message_text}")
+    logger.debug("📤 Sending quick reply message: %s", message_text)
     resp.message(message_text)
 
 # -------------------------------------------------
 # Webhook endpoint
 # -------------------------------------------------
 @main_bp.route('/webhook', methods=['POST'])
-def webhook():
+async def webhook():
+    started = time.perf_counter()
+    g.timings = {}
+    g.outcome = 'error'
+    user_phone = ''
+    key = None
     try:
-        logger.info("\n" + "="*50)
-        logger.info("📥 WEBHOOK REQUEST RECEIVED")
-        
-        # Debug raw payload for visibility
-        raw_data = request.get_data(as_text=True)
-        logger.info(f"✅ RAW DATA: {raw_data}")
-        
+        logger.debug("📥 WEBHOOK REQUEST RECEIVED")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("✅ RAW DATA: %s", request.get_data(as_text=True))
+
         # Parse incoming data (JSON or form-encoded)
         if request.is_json:
-            logger.info("📝 Processing JSON data")
             data = request.get_json()
         else:
-            logger.info("📝 Processing form data")
             data = request.form.to_dict()
-        
-        logger.info(f"📦 Parsed data: {json.dumps(data, indent=2)}")
-        
+        logger.debug("📦 Parsed data: %s", data)
+
+        # A re-delivery of a message we have already handled (or are
+        # handling) gets the same reply without running anything again
+        if current_app.config.get('WEBHOOK_DEDUPE_ENABLED'):
+            key = delivery_key(data, current_app.config['WEBHOOK_DEDUPE_WINDOW_SECONDS'])
+            replayed = await _replay(key)
+            if replayed is not None:
+                user_phone = data.get('From', '')
+                return replayed
+
         # Initialize response and utilities
         resp = MessagingResponse()
         user_msg = MessageParser.normalize_message(data.get('Body', ''))
         user_phone = data.get('From', '')
         conversation = ConversationManager(user_phone)
-        
-        logger.info(f"📱 Phone: {user_phone}")
-        logger.info(f"💬 Message: {user_msg}")
-
-        # Log raw message
-        sheets.log_message(user_phone, user_msg)
-
-        # ---------- Handle greetings ----------
-        if MessageParser.is_greeting(user_msg):
-            conversation.clear_state()
-            resp.message(MessageFormatter.format_greeting())
-            logger.info(f"📤 Sending greeting response: {str(resp)}")
-            return Response(str(resp), mimetype='application/xml')
-
-        # ---------- Handle very short or unclear messages ----------
-        if not MessageParser.is_valid_query(user_msg):
-            # Check if this is a yes/no response to a previous product
-            if conversation.has_active_conversation():
-                if MessageParser.is_yes_response(user_msg):
-                    try:
-                        logger.info("🔄 Processing order confirmation")
-                        # Instead of going straight to payment, show payment options
-                        body_text, buttons = MessageFormatter.format_payment_options()
-                        send_quick_reply(resp, body_text, buttons)
-                        logger.info(f"📤 Sending payment options: {str(resp)}")
-                        return Response(str(resp), mimetype='application/xml')
-                    except Exception as e:
-                        logger.error(f"❌ Error showing payment options: {str(e)}")
-                        logger.error(traceback.format_exc())
-                        resp.message(MessageFormatter.format_order_error())
-                        logger.info(f"📤 Sending error response: {str(resp)}")
-                        return Response(str(resp), mimetype='application/xml')
-                elif MessageParser.is_no_response(user_msg):
-                    conversation.clear_state()
-                    resp.message(MessageFormatter.format_no_thanks())
-                    logger.info(f"📤 Sending 'no thanks' response: {str(resp)}")
-                    return Response(str(resp), mimetype='application/xml')
-                elif MessageParser.is_cod_response(user_msg):
-                    try:
-                        logger.info("🔄 Processing COD order")
-                        sku_id = conversation.get_current_sku()
-                        sheets.update_status(user_phone, sku_id, "COD Confirmed")
-                        resp.message(MessageFormatter.format_cod_confirmation())
-                        conversation.clear_state()
-                        logger.info(f"📤 Sending COD confirmation: {str(resp)}")
-                        return Response(str(resp), mimetype='application/xml')
-                    except Exception as e:
-                        logger.error(f"❌ Error processing COD order: {str(e)}")
-                        logger.error(traceback.format_exc())
-                        resp.message(MessageFormatter.format_order_error())
-                        return Response(str(resp), mimetype='application/xml')
-                elif MessageParser.is_upi_response(user_msg):
-                    try:
-                        logger.info("🔄 Processing UPI payment request")
-                        sku_id = conversation.get_current_sku()
-                        sheets.update_status(user_phone, sku_id, "Awaiting UPI Payment")
-                        resp.message(MessageFormatter.format_upi_payment_instructions())
-                        conversation.clear_state()
-                        logger.info(f"📤 Sending UPI instructions: {str(resp)}")
-                        return Response(str(resp), mimetype='application/xml')
-                    except Exception as e:
-                        logger.error(f"❌ Error processing UPI payment request: {str(e)}")
-                        logger.error(traceback.format_exc())
-                        resp.message(MessageFormatter.format_order_error())
-                        return Response(str(resp), mimetype='application/xml')
-
-            resp.message(MessageFormatter.format_clarification())
-            logger.info(f"📤 Sending clarification response: {str(resp)}")
-            return Response(str(resp), mimetype='application/xml')
-
-        # ---------- Handle legacy order ID responses ----------
-        is_order_id, sku_id = MessageParser.is_order_id_response(user_msg)
-        if is_order_id:
-            try:
-                logger.info("🔄 Processing order confirmation")
-                sheets.update_status(user_phone, sku_id, "Awaiting Payment")
-                resp.message(MessageFormatter.format_order_confirmation(sku_id))
+
+        logger.debug("📱 Phone: %s", user_phone)
+        logger.debug("💬 Message: %s", user_msg)
+
+        # Log raw message; runs alongside the rest of the handling
+        log_task = asyncio.ensure_future(_timed('log_message', pipeline.run_blocking(
+            'io', sheets.log_message, user_phone, user_msg)))
+        try:
+            response = await _reply(resp, user_msg, user_phone, conversation)
+        finally:
+            await pipeline.settle(log_task, current_app.config['PIPELINE_SHEETS_TIMEOUT'])
+        if key is not None:
+            get_reply_cache().put(key, response.get_data(as_text=True))
+        return response
+    except Exception as e:
+        logger.error("❌ Webhook error: %s", e)
+        logger.error(traceback.format_exc())
+        if key is not None:
+            # Let Twilio's retry run the message again
+            get_reply_cache().release(key)
+        resp = MessagingResponse()
+        resp.message(MessageFormatter.format_error_response())
+        return _twiml(resp, 'error')
+    finally:
+        elapsed = time.perf_counter() - started
+        _request_seconds.observe(elapsed, outcome=g.outcome)
+        log_request(
+            phone=user_phone,
+            outcome=g.outcome,
+            total_ms=round(elapsed * 1000, 1),
+            **{f"{stage}_ms": round(ms, 1) for stage, ms in g.timings.items()},
+        )
+
+
+def _twiml(resp, outcome):
+    """Final TwiML response; records the outcome for the request log line."""
+    g.outcome = outcome
+    started = time.perf_counter()
+    body = str(resp)
+    _stage_seconds.observe(time.perf_counter() - started, stage='render')
+    logger.debug("📤 Sending %s response: %s", outcome, body)
+    return Response(body, mimetype='application/xml')
+
+
+async def _replay(key):
+    """
+    Claims key for this delivery and returns None, or returns the cached
+    reply of an earlier delivery of the same message. While that delivery is
+    still running, polls for its reply for up to WEBHOOK_DEDUPE_WAIT_SECONDS;
+    if none arrives, answers with an empty TwiML so the work isn't repeated.
+    """
+    cache = get_reply_cache()
+    body = cache.claim(key)
+    if body is None:
+        return None
+
+    deadline = time.monotonic() + current_app.config['WEBHOOK_DEDUPE_WAIT_SECONDS']
+    while body == PENDING and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+        body = cache.get(key)
+        if body is None:
+            # The first delivery failed and released the key: run this one
+            return await _replay(key)
+
+    if body:
+        _duplicates.inc(state='replayed')
+        logger.info("♻️ Duplicate delivery %s answered from cache", key)
+    else:
+        # Nothing is sent for this delivery; should the first one still fail
+        # and release the key, the customer's message goes unanswered
+        _duplicates.inc(state='in_flight_timeout')
+        logger.warning("⚠️ Duplicate delivery %s still in flight after %ss, answered empty; "
+                       "the message is lost if the first delivery fails",
+                       key, current_app.config['WEBHOOK_DEDUPE_WAIT_SECONDS'])
+    g.outcome = 'duplicate'
+    return Response(body or str(MessagingResponse()), mimetype='application/xml')
+
+
+async def _timed(stage, awaitable):
+    """Awaits awaitable, recording the elapsed time for this request and in /metrics."""
+    started = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        elapsed = time.perf_counter() - started
+        g.timings[stage] = g.timings.get(stage, 0.0) + elapsed * 1000
+        _stage_seconds.observe(elapsed, stage=stage)
+
+
+# -------------------------------------------------
+# Message handling (runs inside the async webhook)
+# -------------------------------------------------
+async def _update_status(conversation, fn, *args) -> bool:
+    """
+    Applies a status write for the current draft and clears the
+    conversation state. Returns False, keeping the draft, when the pool is
+    saturated or the write outlives PIPELINE_SHEETS_TIMEOUT, so the
+    customer is asked to try again; setting the same status twice is
+    harmless. Only with write-behind, where the update is already spooled
+    and retried there, is a slow write confirmed all the same.
+    """
+    timeout = current_app.config['PIPELINE_SHEETS_TIMEOUT']
+    try:
+        await _timed('update_status', pipeline.run_blocking('io', fn, *args, timeout=timeout))
+    except pipeline.PipelineBusy:
+        logger.warning("⏳ Status update not admitted, asking customer to retry")
+        return False
+    except asyncio.TimeoutError:
+        if sheets.get_writer() is None:
+            logger.warning("⏳ Status update still running after %ss, asking customer to retry", timeout)
+            return False
+        logger.warning("⏳ Status update still queueing after %ss, finishing in the background", timeout)
+    conversation.clear_state()
+    return True
+
+
+def _busy(resp):
+    resp.message(MessageFormatter.format_busy())
+    return _twiml(resp, 'busy')
+
+
+async def _reply(resp, user_msg, user_phone, conversation):
+    """
+    Builds the TwiML reply for one message. Blocking Sheets calls and the
+    catalogue search are awaited on the pipeline pools.
+    """
+    sheets_timeout = current_app.config['PIPELINE_SHEETS_TIMEOUT']
+
+    # ---------- Handle greetings ----------
+    if MessageParser.is_greeting(user_msg):
+        conversation.clear_state()
+        resp.message(MessageFormatter.format_greeting())
+        return _twiml(resp, 'greeting')
+
+    # ---------- Handle very short or unclear messages ----------
+    if not MessageParser.is_valid_query(user_msg):
+        # Check if this is a yes/no response to a previous product
+        if conversation.has_active_conversation():
+            if MessageParser.is_yes_response(user_msg):
+                try:
+                    logger.info("🔄 Processing order confirmation")
+                    # Instead of going straight to payment, show payment options
+                    body_text, buttons = MessageFormatter.format_payment_options()
+                    send_quick_reply(resp, body_text, buttons)
+                    return _twiml(resp, 'payment_options')
+                except Exception as e:
+                    logger.error("❌ Error showing payment options: %s", e)
+                    logger.error(traceback.format_exc())
+                    resp.message(MessageFormatter.format_order_error())
+                    return _twiml(resp, 'order_error')
+            elif MessageParser.is_no_response(user_msg):
                 conversation.clear_state()
-                logger.info(f"📤 Sending payment response: {str(resp)}")
-                return Response(str(resp), mimetype='application/xml')
-            except Exception as e:
-                logger.error(f"❌ Error updating order status: {str(e)}")
-                logger.error(traceback.format_exc())
-                resp.message(MessageFormatter.format_order_error())
-                logger.info(f"📤 Sending error response: {str(resp)}")
-                return Response(str(resp), mimetype='application/xml')
-
-        # ---------- Product search ----------
-        logger.info("🔍 Searching for products")
-        matches = enhanced_search(user_msg, top_n=3)
-        if not matches:
-            resp.message(MessageFormatter.format_no_matches())
-            logger.info(f"📤 Sending no matches response: {str(resp)}")
-            return Response(str(resp), mimetype='application/xml')
-
-        # Choose best match and send options
-        best = matches[0]
-        logger.info(f"✨ Best match: {best['brand']} {best['name']}")
-        
-        # Store the SKU_ID in conversation state
-        conversation.set_current_sku(best['id'])
-        
-        # Format and send response
-        body_text, buttons = MessageFormatter.format_product_response(best)
-        send_quick_reply(resp, body_text, buttons)
-
-        # ---------- Log draft order ----------
+                resp.message(MessageFormatter.format_no_thanks())
+                return _twiml(resp, 'no_thanks')
+            elif MessageParser.is_cod_response(user_msg):
+                try:
+                    logger.info("🔄 Processing COD order")
+                    sku_ids = conversation.get_current_skus()
+                    if not await _update_status(conversation, sheets.update_statuses,
+                                                user_phone, sku_ids, "COD Confirmed"):
+                        return _busy(resp)
+                    resp.message(MessageFormatter.format_cod_confirmation())
+                    return _twiml(resp, 'cod_confirmed')
+                except Exception as e:
+                    logger.error("❌ Error processing COD order: %s", e)
+                    logger.error(traceback.format_exc())
+                    resp.message(MessageFormatter.format_order_error())
+                    return _twiml(resp, 'order_error')
+            elif MessageParser.is_upi_response(user_msg):
+                try:
+                    logger.info("🔄 Processing UPI payment request")
+                    sku_ids = conversation.get_current_skus()
+                    if not await _update_status(conversation, sheets.update_statuses,
+                                                user_phone, sku_ids, "Awaiting UPI Payment"):
+                        return _busy(resp)
+                    resp.message(MessageFormatter.format_upi_payment_instructions())
+                    return _twiml(resp, 'upi_requested')
+                except Exception as e:
+                    logger.error("❌ Error processing UPI payment request: %s", e)
+                    logger.error(traceback.format_exc())
+                    resp.message(MessageFormatter.format_order_error())
+                    return _twiml(resp, 'order_error')
+
+        resp.message(MessageFormatter.format_clarification())
+        return _twiml(resp, 'clarification')
+
+    # ---------- Handle legacy order ID responses ----------
+    is_order_id, sku_id = MessageParser.is_order_id_response(user_msg)
+    if is_order_id:
         try:
-            logger.info("\n📝 Attempting to log draft order...")
-            qty = MessageParser.extract_quantity(user_msg)
-            
-            order_data = {
-                "Timestamp": datetime.now().isoformat(),  # Use current timestamp
-                "Phone": user_phone,
-                "Query": user_msg,
-                "SKU_ID": best['id'],
-                "Qty": qty,
-                "Status": "Awaiting Confirm"
-            }
-            logger.info(f"📦 Order data to log: {json.dumps(order_data, indent=2)}")
-            sheets.append_order(order_data)
-            logger.info("✅ Draft order logged successfully")
+            logger.info("🔄 Processing order confirmation")
+            if not await _update_status(conversation, sheets.update_status,
+                                        user_phone, sku_id, "Awaiting Payment"):
+                return _busy(resp)
+            resp.message(MessageFormatter.format_order_confirmation(sku_id))
+            return _twiml(resp, 'order_confirmed')
         except Exception as e:
-            logger.error(f"❌ Error logging draft order: {str(e)}")
+            logger.error("❌ Error updating order status: %s", e)
             logger.error(traceback.format_exc())
-            # Continue with response even if logging fails
-            
-        logger.info(f"📤 Sending final response: {str(resp)}")
-        return Response(str(resp), mimetype='application/xml')
+            resp.message(MessageFormatter.format_order_error())
+            return _twiml(resp, 'order_error')
+
+    # ---------- Several items in one message ----------
+    items = MessageParser.split_order_items(user_msg, match_item_types)
+    if len(items) > 1:
+        return await _reply_order_items(resp, user_phone, conversation, items)
+
+    # ---------- Product search ----------
+    try:
+        matches = await _timed('search', pipeline.run_blocking(
+            'search', enhanced_search, user_msg, top_n=3, timeout=current_app.config['PIPELINE_SEARCH_TIMEOUT']))
+    except (pipeline.PipelineBusy, asyncio.TimeoutError) as e:
+        logger.warning("⏳ Search unavailable (%s), asking customer to retry", type(e).__name__)
+        resp.message(MessageFormatter.format_busy())
+        return _twiml(resp, 'busy')
+    if not matches:
+        resp.message(MessageFormatter.format_no_matches())
+        return _twiml(resp, 'no_matches')
+
+    # Choose best match and send options
+    best = matches[0]
+    logger.info("✨ Best match: %s %s", best['brand'], best['name'])
+
+    # Store the SKU_ID in conversation state
+    conversation.set_current_sku(best['id'])
+
+    # Format and send response
+    body_text, buttons = MessageFormatter.format_product_response(best)
+    send_quick_reply(resp, body_text, buttons)
+
+    # ---------- Log draft order ----------
+    try:
+        qty = MessageParser.extract_quantity(user_msg)
+
+        order_data = {
+            "Timestamp": datetime.now().isoformat(),  # Use current timestamp
+            "Phone": user_phone,
+            "Query": user_msg,
+            "SKU_ID": best['id'],
+            "Qty": qty,
+            "Status": "Awaiting Confirm"
+        }
+        logger.debug("📦 Order data to log: %s", order_data)
+        await _timed('append_order', pipeline.run_blocking('io', sheets.append_order, order_data, timeout=sheets_timeout))
+        logger.debug("✅ Draft order logged")
     except Exception as e:
-        logger.error(f"❌ Webhook error: {str(e)}")
+        logger.error("❌ Error logging draft order: %s", e)
         logger.error(traceback.format_exc())
-        resp = MessagingResponse()
-        resp.message(MessageFormatter.format_error_response())
-        logger.info(f"📤 Sending error response: {str(resp)}")
-        return Response(str(resp), mimetype='application/xml')
+        # Continue with response even if logging fails
+
+    return _twiml(resp, 'product_match')
+
+
+def _merge_repeated_skus(matched):
+    """
+    Folds items that matched the same SKU into one line with their
+    quantities added (an item without one counts as 1). Status updates
+    find an order row by (phone, SKU_ID), so a second row for the same SKU
+    would never be confirmed.
+    """
+    merged, line_of = [], {}
+    for qty, text, product in matched:
+        if product is None:
+            merged.append((qty, text, product))
+            continue
+        n = line_of.get(product['id'])
+        if n is None:
+            line_of[product['id']] = len(merged)
+            merged.append((qty, text, product))
+            continue
+        prev_qty, prev_text, _ = merged[n]
+        total = sum(int(q) if q != "-1" else 1 for q in (prev_qty, qty))
+        merged[n] = (str(total), f"{prev_text}, {text}", product)
+    return merged
+
+
+async def _reply_order_items(resp, user_phone, conversation, items):
+    """
+    Multi-item order ("2 bend 110mm, 5 coupler 110"): every item is
+    searched in one batched call and the draft order is appended as one
+    multi-row write.
+    """
+    try:
+        results = await _timed('search', pipeline.run_blocking(
+            'search', batch_search, [text for _, text in items], top_n=1,
+            timeout=current_app.config['PIPELINE_SEARCH_TIMEOUT']))
+    except (pipeline.PipelineBusy, asyncio.TimeoutError) as e:
+        logger.warning("⏳ Search unavailable (%s), asking customer to retry", type(e).__name__)
+        resp.message(MessageFormatter.format_busy())
+        return _twiml(resp, 'busy')
+
+    matched = _merge_repeated_skus(
+        [(qty, text, found[0] if found else None) for (qty, text), found in zip(items, results)])
+    products = [(qty, text, product) for qty, text, product in matched if product is not None]
+    if not products:
+        resp.message(MessageFormatter.format_no_matches())
+        return _twiml(resp, 'no_matches')
+    logger.info("✨ Matched %s of %s order items", len(products), len(items))
+
+    conversation.set_current_skus([product['id'] for _, _, product in products])
+    body_text, buttons = MessageFormatter.format_order_items_response(matched)
+    send_quick_reply(resp, body_text, buttons)
+
+    # ---------- Log draft order (one row per item) ----------
+    try:
+        timestamp = datetime.now().isoformat()
+        rows = [{
+            "Timestamp": timestamp,
+            "Phone": user_phone,
+            "Query": text,
+            "SKU_ID": product['id'],
+            "Qty": qty,
+            "Status": "Awaiting Confirm"
+        } for qty, text, product in products]
+        await _timed('append_order', pipeline.run_blocking(
+            'io', sheets.append_orders, rows, timeout=current_app.config['PIPELINE_SHEETS_TIMEOUT']))
+        logger.debug("✅ Draft order of %s items logged", len(rows))
+    except Exception as e:
+        logger.error("❌ Error logging draft order: %s", e)
+        logger.error(traceback.format_exc())
+
+    return _twiml(resp, 'order_items_match')
+
+
+# -------------------------------------------------
+# Metrics (Prometheus text format)
+# -------------------------------------------------
+@main_bp.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    if not current_app.config.get('METRICS_ENABLED', True):
+        return jsonify({'error': 'metrics disabled'}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+# -------------------------------------------------
+# Admin: catalogue hot reload
+# -------------------------------------------------
+@main_bp.route('/admin/reload-catalogue', methods=['POST'])
+def admin_reload_catalogue():
+    token = current_app.config.get('ADMIN_TOKEN', '')
+    if not token:
+        return jsonify({'error': 'admin endpoint disabled'}), 404
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token):
+        return jsonify({'error': 'forbidden'}), 403
+    try:
+        summary = reload_catalogue()
+        # This worker only: the others reload once they see the stamp
+        summary['other_workers'] = 'notified' if announce_reload() else 'not notified'
+        logger.info("🔄 Catalogue reload requested via admin endpoint: %s", summary)
+        return jsonify(summary)
+    except Exception as e:
+        logger.error("❌ Catalogue reload failed: %s", e)
+        logger.error(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
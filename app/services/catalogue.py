@@ -2,19 +2,130 @@
 
 import os
 import re
-from numpy.linalg import norm
+import time
+import logging
+import threading
+from functools import lru_cache
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from flask import current_app
 import pandas as pd
 
-from app.services import sheets   # <-- new import for Google-Sheets loader
+from app.services import catalogue_source
+from app.services.embedding_store import EmbeddingStore, normalize_rows, text_hash
+from app.services.vector_index import build_index
+from app.services.type_matcher import ItemTypeMatcher
+from app.services.size_index import SizeIndex
+from app.services.quantization import quantize
+from app.services.inference import InferenceService
+from app.services.product_table import Catalogue
+from app.utils.cache import LRUCache
+from app.utils import metrics
+from app.utils.conversation_utils import MessageParser
+
+logger = logging.getLogger(__name__)
+
+# DimScheme → code (schemes are stored upper-cased)
+_SCHEME_OD, _SCHEME_ODXOD, _SCHEME_LXW, _SCHEME_CS, _SCHEME_VOL = range(5)
+_SCHEME_UNKNOWN = -1
+_SCHEME_CODES = {
+    'OD'   : _SCHEME_OD,
+    'ODXOD': _SCHEME_ODXOD,
+    'LXW'  : _SCHEME_LXW,
+    'CS'   : _SCHEME_CS,
+    'VOL'  : _SCHEME_VOL,
+}
+_ONE_DIM_SCHEMES = (_SCHEME_OD, _SCHEME_CS, _SCHEME_VOL)
+_TWO_DIM_SCHEMES = (_SCHEME_ODXOD, _SCHEME_LXW)
+_NO_DISTANCE = 999.0
+
+
+class CatalogueSnapshot:
+    """
+    Everything enhanced_search() reads about the catalogue. A snapshot is
+    built completely off to the side and then published with a single
+    assignment, so a search never sees products from one load and
+    embeddings from another.
+    """
+
+    def __init__(self, products, texts, embeddings, index=None, version=0, size_nearest=3,
+                 scoring=None, rerank=50):
+        if not isinstance(products, Catalogue):
+            products = Catalogue.from_records(products)
+        self.version    = version
+        self.products   = products          # columnar Catalogue; products[i] is a Product view
+        self.texts      = texts             # text each embedding row was built from
+        self.embeddings = embeddings        # (N, d) float32, rows L2-normalised
+        self.index      = index             # FlatIndex / IVFIndex over scoring
+        # Matrix candidates are first scored against: embeddings itself, or
+        # a float16 / int8 QuantizedMatrix whose best rerank candidates are
+        # re-scored against the exact embeddings rows
+        self.scoring    = embeddings if scoring is None else scoring
+        self.rerank     = rerank
+
+        # Column arrays for the vectorised scorer (aligned with products)
+        self.dim_a = products.column('dim_a')
+        self.dim_b = products.column('dim_b')
+        codes, schemes = products.codes('scheme')
+        scheme_code_of = np.array([_SCHEME_CODES.get(s.upper(), _SCHEME_UNKNOWN) for s in schemes],
+                                  dtype=np.int8)
+        self.scheme_codes = scheme_code_of[codes]
+
+        # Item-type matcher and its type → rows inverted index; one entry
+        # per distinct lower-cased name, so this is cheap at any size
+        codes, names = products.codes('name')
+        lower_codes, types = pd.factorize(pd.Series(names, dtype=object).str.lower())
+        row_types = lower_codes[codes] if len(codes) else np.zeros(0, dtype=np.intp)
+        order  = np.argsort(row_types, kind='stable')
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(row_types, minlength=len(types)))])
+        self.type_rows    = {t: order[bounds[k]:bounds[k + 1]].astype(np.intp)
+                             for k, t in enumerate(types)}
+        self.item_types   = set(self.type_rows)
+        self.type_matcher = ItemTypeMatcher(self.item_types)
+        self.by_id        = products.by_id
+
+        # Distinct sizes per (item type, scheme): a typed query with a size
+        # only re-ranks the rows of its size_nearest nearest sizes (0 = off)
+        self.size_index   = SizeIndex(self.type_rows, self.scheme_codes, self.dim_a, self.dim_b,
+                                      _ONE_DIM_SCHEMES, _TWO_DIM_SCHEMES)
+        self.size_nearest = size_nearest
+
+    def __len__(self):
+        return len(self.products)
+
 
 # In-memory state
-_catalogue   = []
-_model       = None
-_embeddings  = None
-_ITEM_TYPES  = None
+_model    = None
+_inference = None                   # InferenceService batching query encodes, once started
+_snapshot = CatalogueSnapshot([], [], np.zeros((0, 0), dtype=np.float32))
+_origin   = None                    # where the live snapshot was read from
+_reload_lock  = threading.Lock()
+_first_load_lock = threading.Lock()
+_reload_timer = None
+
+# A reload asked of one worker (admin endpoint) reaches the others through
+# the mtime of a stamp file, which searches look at once a second
+_STAMP_CHECK_SECONDS = 1.0
+_stamp_app     = None
+_stamp_path    = None
+_stamp_seen    = None
+_stamp_checked = 0.0
+_stamp_lock    = threading.Lock()
+
+# Hot-query caches, keyed on normalised query text; cleared on every reload
+_query_embedding_cache = LRUCache()   # text → unit query vector
+_result_cache          = LRUCache()   # (snapshot version, text, top_n) → ranked SKU_IDs
+
+# Search stage timers, created once so a search only pays for the clock reads
+_SEARCH_STAGE = "search_stage_seconds"
+_time_total   = metrics.timed(_SEARCH_STAGE, "enhanced_search() latency by stage", stage="total")
+_time_encode  = metrics.timed(_SEARCH_STAGE, stage="encode")
+_time_score   = metrics.timed(_SEARCH_STAGE, stage="score")
+_time_batch   = metrics.timed(_SEARCH_STAGE, stage="batch_total")
+
+_REQUIRED_COLUMNS = ['SKU_ID', 'SKU', 'ProductName', 'Brand',
+                     'DimScheme', 'SizeText', 'DimA', 'DimB',
+                     'DimUnit', 'PriceUnit', 'SellingPrice']
+
 
 def init_catalogue():
     """
@@ -22,55 +133,332 @@ def init_catalogue():
     """
     load_catalogue()
 
-def load_catalogue():
+
+def _text_column(df: pd.DataFrame, name: str, default: str = '') -> pd.Series:
+    if name not in df.columns:
+        return pd.Series(default, index=df.index, dtype=object)
+    return df[name].astype(str).str.strip()
+
+
+def _number_column(df: pd.DataFrame, name: str) -> np.ndarray:
+    if name not in df.columns:
+        return np.zeros(len(df))
+    return pd.to_numeric(df[name].replace('', 0), errors='coerce').fillna(0).to_numpy(np.float64)
+
+
+def _join_words(*parts: pd.Series) -> pd.Series:
+    """Row-wise " ".join(filter(None, parts)) over string columns."""
+    text = parts[0]
+    for part in parts[1:]:
+        text = text.where(part.eq(''), text.where(text.eq(''), text + ' ') + part)
+    return text
+
+
+def _columns_from_df(df: pd.DataFrame):
+    """
+    Normalises the Catalogue-tab columns in bulk. Returns (columns, texts):
+    one aligned array per product field, and the text embedded per row.
+    """
+    missing = [c for c in _REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Catalogue missing columns: {missing}")
+
+    brand     = _text_column(df, 'Brand')
+    name      = _text_column(df, 'ProductName')
+    size_text = _text_column(df, 'SizeText')
+    columns = {
+        'id'         : _text_column(df, 'SKU_ID').to_numpy(object),
+        'sku'        : _text_column(df, 'SKU').to_numpy(object),
+        'name'       : name.to_numpy(object),
+        'brand'      : brand.to_numpy(object),
+        'scheme'     : _text_column(df, 'DimScheme').str.upper().to_numpy(object),
+        'size_text'  : size_text.to_numpy(object),
+        'dim_a'      : _number_column(df, 'DimA'),
+        'dim_b'      : _number_column(df, 'DimB'),
+        'unit'       : _text_column(df, 'DimUnit', 'mm').to_numpy(object),
+        'price_unit' : _text_column(df, 'PriceUnit', 'PCS').to_numpy(object),
+        'price'      : pd.to_numeric(df['SellingPrice']).to_numpy(np.float64),
+    }
+    texts = _join_words(brand, name, size_text).tolist()
+    return columns, texts
+
+
+def _products_from_df(df: pd.DataFrame):
+    columns, texts = _columns_from_df(df)
+    return Catalogue(columns), texts
+
+
+def _get_model():
+    global _model
+    if _model is None:
+        # Imported here so that importing the app (tests, the gunicorn
+        # master before preload) doesn't pay for torch
+        from sentence_transformers import SentenceTransformer
+        threads = current_app.config.get("INFERENCE_TORCH_THREADS", 0)
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        _model = SentenceTransformer(current_app.config["EMBEDDING_MODEL"])
+    return _model
+
+
+def start_inference(app) -> InferenceService:
     """
-    Loads the Catalogue tab via sheets.load_catalogue_df(), normalises
-    columns, builds sentence-transformer embeddings, caches item-type set.
+    Starts the thread that batches query encodes from concurrent searches.
+    Call once per process (after forking, when running under gunicorn).
     """
-    global _catalogue, _model, _embeddings, _ITEM_TYPES
+    global _inference
+    if _inference is None:
+        def encode(texts):
+            with app.app_context():
+                return _get_model().encode(texts, convert_to_numpy=True)
+
+        _inference = InferenceService(
+            encode,
+            window_ms  = app.config["INFERENCE_BATCH_WINDOW_MS"],
+            max_batch  = app.config["INFERENCE_MAX_BATCH"],
+            queue_size = app.config["INFERENCE_QUEUE_SIZE"],
+            timeout    = app.config["INFERENCE_TIMEOUT_SECONDS"] or None,
+        ).start()
+        metrics.gauge("inference_queue_depth", "Encode requests waiting for the inference thread",
+                      lambda: _inference.depth if _inference is not None else 0)
+        logger.info("✅ Inference service started (%sms window, batches of up to %s)",
+                    app.config["INFERENCE_BATCH_WINDOW_MS"], app.config["INFERENCE_MAX_BATCH"])
+    return _inference
+
 
+def _embed(texts, previous: CatalogueSnapshot):
+    """
+    Embeddings for texts. Uses the on-disk EmbeddingStore when configured;
+    otherwise reuses rows of the previous snapshot whose text is unchanged.
+    Either way only new or changed texts go through the model.
+    """
+    def encode(batch):
+        return _get_model().encode(batch, convert_to_numpy=True)
+
+    cache_dir = current_app.config["EMBEDDING_CACHE_DIR"]
+    if cache_dir:
+        return EmbeddingStore(cache_dir, current_app.config["EMBEDDING_MODEL"]).load(texts, encode)
+
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    known = {text_hash(t): i for i, t in enumerate(previous.texts)}
+    todo  = sorted({t for t in texts if text_hash(t) not in known})
+    fresh = dict(zip(todo, normalize_rows(encode(todo)))) if todo else {}
+    logger.info("🧮 Encoding %s of %s catalogue rows", len(todo), len(texts))
+    return np.stack([fresh[t] if t in fresh else previous.embeddings[known[text_hash(t)]]
+                     for t in texts]).astype(np.float32)
+
+
+def _diff(old: CatalogueSnapshot, products: Catalogue) -> dict:
+    """
+    Compares products with a snapshot by SKU_ID.
+    """
+    new_rows  = products.row_tuples()
+    old_rows  = old.products.row_tuples()
+    added     = [i for i in new_rows if i not in old_rows]
+    removed   = [i for i in old_rows if i not in new_rows]
+    changed   = [i for i, row in new_rows.items() if i in old_rows and old_rows[i] != row]
+    reordered = not np.array_equal(products.column('id'), old.products.column('id'))
+    return {'added': added, 'removed': removed, 'changed': changed, 'reordered': reordered}
+
+
+@metrics.timed("catalogue_load_seconds", "Catalogue (re)load latency")
+def _load(force: bool, startup: bool = False) -> dict:
+    """
+    Loads the catalogue from its source and publishes a new snapshot.
+    Unless force is set, nothing is rebuilt when no SKU differs from the
+    live snapshot.
+    """
+    global _snapshot, _origin
+    with _reload_lock:
+        started  = time.monotonic()
+        previous = _snapshot
+
+        df, origin = catalogue_source.load_catalogue_frame(startup=startup)
+        _origin = origin
+        products, texts = _products_from_df(df)
+
+        diff = _diff(previous, products)
+        summary = {k: len(v) if isinstance(v, list) else v for k, v in diff.items()}
+        if not force and previous.version and not (diff['added'] or diff['removed']
+                                                   or diff['changed'] or diff['reordered']):
+            logger.info("✅ Catalogue unchanged, keeping current snapshot")
+            return {**summary, 'swapped': False}
+
+        embeddings = _embed(texts, previous)
+        index = build_index(
+            embeddings,
+            kind     = current_app.config["VECTOR_INDEX"],
+            min_rows = current_app.config["VECTOR_INDEX_MIN_ROWS"],
+            nlist    = current_app.config["IVF_NLIST"],
+            nprobe   = current_app.config["IVF_NPROBE"],
+        )
+        # The index is built (or its saved lists checked) on the float32
+        # rows; searches then read the compressed matrix
+        scoring = quantize(embeddings, current_app.config.get("EMBEDDING_PRECISION", "float32"))
+        index.embeddings = scoring
+        snapshot = CatalogueSnapshot(products, texts, embeddings, index, version=previous.version + 1,
+                                     size_nearest=current_app.config.get("SIZE_INDEX_NEAREST", 3),
+                                     scoring=scoring,
+                                     rerank=current_app.config.get("EMBEDDING_RERANK", 50))
+
+        # Publish: one reference swap; in-flight searches keep the old one
+        _snapshot = snapshot
+
+        # Cached results refer to the previous catalogue
+        max_size = current_app.config["SEARCH_CACHE_SIZE"]
+        ttl      = current_app.config["SEARCH_CACHE_TTL_SECONDS"] or None
+        _query_embedding_cache.configure(max_size, ttl)
+        _result_cache.configure(max_size, ttl)
+
+        elapsed = time.monotonic() - started
+        logger.info("✅ Catalogue v%s live from %s: %s SKUs, %s added, %s removed, %s changed (%.2fs)",
+                    snapshot.version, origin, len(snapshot), summary['added'], summary['removed'],
+                    summary['changed'], elapsed)
+        return {**summary, 'swapped': True, 'version': snapshot.version, 'seconds': round(elapsed, 3)}
+
+
+def load_catalogue():
+    """
+    Loads the catalogue (see catalogue_source.py: Sheets, a local snapshot
+    or CSV), normalises columns, builds sentence-transformer embeddings,
+    caches item-type set. Embeddings come from the on-disk EmbeddingStore
+    when configured, so only new or changed rows are encoded.
+    """
     # Log that we're loading the catalogue
     print("Loading catalogue and initializing embeddings model...")
+    _get_model()
+    _load(force=True, startup=True)
+    print("Catalogue loaded and embeddings model initialized successfully!")
 
-    df = sheets.load_catalogue_df()        # <-- fresh DataFrame incl. SKU_IDs
 
-    required = ['SKU_ID', 'SKU', 'ProductName', 'Brand',
-                'DimScheme', 'SizeText', 'DimA', 'DimB',
-                'DimUnit', 'PriceUnit', 'SellingPrice']
-    missing = [c for c in required if c not in df.columns]
-    if missing:
-        raise ValueError(f"Catalogue missing columns: {missing}")
+def _ensure_loaded():
+    """
+    Loads the catalogue for the first search when it wasn't preloaded.
+    Searches racing for it wait for one load instead of each rebuilding it.
+    """
+    if len(_snapshot):
+        return
+    with _first_load_lock:
+        if not len(_snapshot):
+            load_catalogue()
+
+
+def reload_catalogue() -> dict:
+    """
+    Incremental hot reload: diffs the sheet against the live snapshot by
+    SKU_ID, re-embeds only new / changed texts and swaps the result in
+    atomically. Returns a summary of what changed.
+    """
+    return _load(force=False)
+
+
+def refresh_if_from_snapshot(app):
+    """
+    If startup was served from the local snapshot while the source is
+    Sheets, re-reads the tab once in a daemon thread.
+    """
+    if _origin != catalogue_source.SOURCE_SNAPSHOT:
+        return None
+    if app.config.get('CATALOGUE_SOURCE', catalogue_source.SOURCE_SHEETS) != catalogue_source.SOURCE_SHEETS:
+        return None
+
+    def run():
+        try:
+            with app.app_context():
+                reload_catalogue()
+        except Exception as e:
+            logger.error("❌ Catalogue refresh after snapshot start failed: %s", e)
+
+    thread = threading.Thread(target=run, name="catalogue-refresh", daemon=True)
+    thread.start()
+    return thread
+
+
+def _stamp_mtime(path: str):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
 
-    _catalogue = []
-    texts      = []
-
-    for _, row in df.iterrows():
-        p = {
-            'id'         : str(row['SKU_ID']).strip(),
-            'sku'        : str(row['SKU']).strip(),
-            'name'       : str(row['ProductName']).strip(),
-            'brand'      : str(row['Brand']).strip(),
-            'scheme'     : str(row['DimScheme']).strip().upper(),
-            'size_text'  : str(row['SizeText']).strip(),
-            'dim_a'      : float(row.get('DimA', 0) or 0),
-            'dim_b'      : float(row.get('DimB', 0) or 0),
-            'unit'       : str(row.get('DimUnit', 'mm')).strip(),
-            'price_unit' : str(row.get('PriceUnit', 'PCS')).strip(),
-            'price'      : float(row['SellingPrice'])
-        }
-        _catalogue.append(p)
-        texts.append(" ".join(filter(None, [
-            p['brand'], p['name'], p['size_text']
-        ])))
-
-    # Embeddings
-    # _model      = SentenceTransformer('all-MiniLM-L6-v2')
-    _model      = SentenceTransformer("paraphrase-MiniLM-L3-v2")
-    _embeddings = _model.encode(texts, convert_to_numpy=True)
-
-    _ITEM_TYPES = set(p['name'].lower() for p in _catalogue)
-    
-    print("Catalogue loaded and embeddings model initialized successfully!")
+
+def watch_reload_stamp(app):
+    """
+    Makes this process follow reloads announced by other workers through
+    CATALOGUE_RELOAD_STAMP_PATH ('' = off). Call once per worker.
+    """
+    global _stamp_app, _stamp_path, _stamp_seen
+    path = app.config.get("CATALOGUE_RELOAD_STAMP_PATH", "")
+    if not path:
+        return
+    _stamp_app, _stamp_path, _stamp_seen = app, path, _stamp_mtime(path)
+
+
+def announce_reload():
+    """Tells every worker following the stamp file to reload the catalogue."""
+    global _stamp_seen
+    path = current_app.config.get("CATALOGUE_RELOAD_STAMP_PATH", "")
+    if not path:
+        return False
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a"):
+        os.utime(path)
+    with _stamp_lock:
+        if _stamp_path == path:
+            _stamp_seen = _stamp_mtime(path)     # this worker is already reloaded
+    return True
+
+
+def _follow_reload_stamp():
+    """Starts a background reload when another worker announced one."""
+    global _stamp_seen, _stamp_checked
+    if _stamp_path is None:
+        return
+    now = time.monotonic()
+    if now - _stamp_checked < _STAMP_CHECK_SECONDS:
+        return
+    with _stamp_lock:
+        if now - _stamp_checked < _STAMP_CHECK_SECONDS:
+            return
+        _stamp_checked = now
+        mtime = _stamp_mtime(_stamp_path)
+        if mtime is None or mtime == _stamp_seen:
+            return
+        _stamp_seen = mtime
+
+    def run():
+        try:
+            with _stamp_app.app_context():
+                logger.info("🔄 Catalogue reload announced by another worker")
+                reload_catalogue()
+        except Exception as e:
+            logger.error("❌ Announced catalogue reload failed: %s", e)
+
+    threading.Thread(target=run, name="catalogue-announced-reload", daemon=True).start()
+
+
+def start_reload_timer(app, interval_seconds: int):
+    """
+    Re-checks the Catalogue tab every interval_seconds in a daemon thread.
+    """
+    global _reload_timer
+    if _reload_timer is not None or interval_seconds <= 0:
+        return _reload_timer
+
+    def run():
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                with app.app_context():
+                    reload_catalogue()
+            except Exception as e:
+                logger.error("❌ Scheduled catalogue reload failed: %s", e)
+
+    _reload_timer = threading.Thread(target=run, name="catalogue-reload", daemon=True)
+    _reload_timer.start()
+    logger.info("⏱️ Catalogue reload every %ss", interval_seconds)
+    return _reload_timer
 
 
 # -------- Dimension / scheme distance helpers ----------
@@ -88,6 +476,54 @@ def _parse_query_dims(q: str):
     return nums, unit
 
 
+# "2 pcs", "10 pieces" anywhere in a query are quantities, not sizes
+_QUANTITY = re.compile(r'\b\d+\s*(?:pc|pcs|pieces?|units?|nos)\b', re.I)
+
+
+@lru_cache(maxsize=4096)
+def _query_dims_mm(query: str) -> tuple:
+    """
+    The sizes in a query, in mm (or the catalogue's unit for CS / VOL),
+    with quantities ("2 coupler 110", "5 pcs tee 63") left out. A lone
+    leading number ("110 coupler") is a size: it is only read as a
+    quantity with a marker (x / pcs / nos) or when another number follows.
+    Parsed once per distinct query.
+    """
+    qty = MessageParser.LEADING_QTY.match(query)
+    if qty and not _bare_leading_number(query):
+        query = query[qty.end():]
+    q_nums, q_unit = _parse_query_dims(_QUANTITY.sub(' ', query))
+    return tuple(_unit_to_mm(n, q_unit) for n in q_nums)
+
+
+def _bare_leading_number(query: str) -> bool:
+    """A leading number with no quantity marker and no other number after it ("2 bend")."""
+    qty = MessageParser.LEADING_QTY.match(query)
+    return bool(qty) and not query[qty.end(1):qty.end()].strip() and not re.search(r'\d', query[qty.end():])
+
+
+# A bare leading number is a size if the named item type comes within this
+# much of it (relative, at least _SIZE_TOLERANCE_MM); otherwise a quantity
+_SIZE_TOLERANCE    = 0.05
+_SIZE_TOLERANCE_MM = 1.0
+
+
+def _query_sizes(snap: CatalogueSnapshot, query: str, matched_types) -> tuple:
+    """
+    _query_dims_mm() against this catalogue: a bare leading number ("2
+    bend", "110 coupler") is only kept as a size when the item types the
+    query names come in a size close to it. "2 bend" is then a quantity
+    and the query has no size, instead of being narrowed to the smallest
+    bends.
+    """
+    q_mm = _query_dims_mm(query)
+    if len(q_mm) == 1 and matched_types and _bare_leading_number(query):
+        tolerance = max(_SIZE_TOLERANCE_MM, _SIZE_TOLERANCE * q_mm[0])
+        if not snap.size_index.has_size(matched_types, q_mm[0], tolerance):
+            return ()
+    return q_mm
+
+
 def _unit_to_mm(val: float, unit: str):
     if unit == 'inch': return val * 25.4
     if unit == 'ft':   return val * 304.8
@@ -99,65 +535,231 @@ def _scheme_distance(p, q_nums, q_unit):
     Numeric distance between product p and query numbers.
     Large fallback (999) if not comparable.
     """
-    if not q_nums:
-        return 999
+    codes = np.array([_SCHEME_CODES.get(p['scheme'].upper(), _SCHEME_UNKNOWN)], dtype=np.int8)
+    return float(_distances(codes, np.array([p['dim_a']]), np.array([p['dim_b']]), q_nums, q_unit)[0])
+
+
+def _distances(codes, dim_a, dim_b, q_nums, q_unit):
+    """
+    Vectorised _scheme_distance over aligned scheme-code / dim arrays.
+    """
+    return _distances_mm(codes, dim_a, dim_b, [_unit_to_mm(n, q_unit) for n in q_nums])
+
+
+def _distances_mm(codes, dim_a, dim_b, q_mm):
+    """_distances() for query sizes already in mm."""
+    dist = np.full(len(codes), _NO_DISTANCE)
+    if not q_mm:
+        return dist
 
-    scheme = p['scheme']
-    a, b = p['dim_a'], p['dim_b']
-    q_nums_mm = [_unit_to_mm(n, q_unit) for n in q_nums]
+    one_dim = (codes == _SCHEME_OD) | (codes == _SCHEME_CS) | (codes == _SCHEME_VOL)
+    dist[one_dim] = np.abs(dim_a[one_dim] - q_mm[0])
 
-    if scheme == 'OD':
-        return abs(a - q_nums_mm[0])
-    if scheme == 'ODxOD' and len(q_nums_mm) >= 2:
-        d1 = abs(a - q_nums_mm[0]) + abs(b - q_nums_mm[1])
-        d2 = abs(a - q_nums_mm[1]) + abs(b - q_nums_mm[0])
-        return min(d1, d2)
-    if scheme == 'LxW' and len(q_nums_mm) >= 2:
-        d1 = abs(a - q_nums_mm[0]) + abs(b - q_nums_mm[1])
-        d2 = abs(a - q_nums_mm[1]) + abs(b - q_nums_mm[0])
-        return min(d1, d2)
-    if scheme in ('CS','VOL'):
-        return abs(a - q_nums_mm[0])
-    return 999
+    if len(q_mm) >= 2:
+        # ODxOD / LxW: either orientation of the two numbers may match
+        two_dim = (codes == _SCHEME_ODXOD) | (codes == _SCHEME_LXW)
+        a, b = dim_a[two_dim], dim_b[two_dim]
+        d1 = np.abs(a - q_mm[0]) + np.abs(b - q_mm[1])
+        d2 = np.abs(a - q_mm[1]) + np.abs(b - q_mm[0])
+        dist[two_dim] = np.minimum(d1, d2)
+    return dist
+
+
+def _top_n(scores, cand_idx, top_n):
+    """
+    Indices (into the catalogue) of the top_n scores, best first. Ties keep
+    catalogue order.
+    """
+    k = min(top_n, len(scores))
+    if k <= 0:
+        return []
+    if k < len(scores):
+        part = np.argpartition(-scores, k - 1)[:k]
+    else:
+        part = np.arange(len(scores))
+    order = np.lexsort((cand_idx[part], -scores[part]))
+    return cand_idx[part[order]].tolist()
+
+
+# -------- Query caches ----------
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def _encode_texts(texts):
+    """Model embeddings of query texts, batched with other searches' once start_inference() ran."""
+    if _inference is not None:
+        return _inference.encode(texts, timeout=_inference.timeout)
+    return _get_model().encode(texts, convert_to_numpy=True)
+
+
+def _encode_query(text: str):
+    q_embed = _query_embedding_cache.get(text)
+    if q_embed is None:
+        q_embed = normalize_rows(_encode_texts([text]))[0]
+        _query_embedding_cache.put(text, q_embed)
+    return q_embed
+
+
+def _encode_queries(texts):
+    """
+    Unit query vectors for texts, (len(texts), d). Texts not in the
+    query-embedding cache are encoded together in one model call.
+    """
+    vectors = [_query_embedding_cache.get(t) for t in texts]
+    todo = sorted({t for t, v in zip(texts, vectors) if v is None})
+    if todo:
+        fresh = dict(zip(todo, normalize_rows(_encode_texts(todo))))
+        for t in todo:
+            _query_embedding_cache.put(t, fresh[t])
+        vectors = [fresh[t] if v is None else v for t, v in zip(texts, vectors)]
+    return np.stack(vectors)
+
+
+def search_cache_stats() -> dict:
+    return {
+        'query_embedding': _query_embedding_cache.stats(),
+        'results'        : _result_cache.stats(),
+    }
+
+
+def _cache_metric(field):
+    return lambda: [({'cache': name}, stats[field]) for name, stats in search_cache_stats().items()]
+
+
+metrics.gauge("search_cache_hits_total",   "Search cache hits",   _cache_metric('hits'),   kind='counter')
+metrics.gauge("search_cache_misses_total", "Search cache misses", _cache_metric('misses'), kind='counter')
+metrics.gauge("search_cache_hit_ratio",    "Search cache hit rate since start", _cache_metric('hit_rate'))
+metrics.gauge("catalogue_skus", "SKUs in the live catalogue snapshot", lambda: len(_snapshot))
+metrics.gauge("catalogue_scoring_matrix_bytes", "Bytes of the matrix searches score against",
+              lambda: _snapshot.scoring.nbytes)
 
 
 # -------- Main search entrypoint ----------
 
+@_time_total
 def enhanced_search(query: str, top_n: int = 3):
     """
     Combines item-type matching, semantic similarity, and size distance
-    using the DimScheme logic.
+    using the DimScheme logic. Repeated queries are answered from the
+    result / query-embedding caches.
     """
-    global _catalogue, _model, _embeddings, _ITEM_TYPES
-    if not _catalogue:
-        # This is now just a safety check, should not normally be needed
-        load_catalogue()
+    _ensure_loaded()
+    _follow_reload_stamp()
 
-    q_low   = query.lower()
-    q_embed = _model.encode(query, convert_to_numpy=True)
-    
-    # Item-type match (plural-aware)
-    matched_types = [t for t in _ITEM_TYPES if re.search(rf'\b{re.escape(t)}s?\b', q_low)]
+    # Read the published snapshot once; a concurrent reload swaps in a new
+    # one without disturbing this search
+    snap = _snapshot
+
+    query = _normalize_query(query)
+    cache_key = (snap.version, query, top_n)
+    cached = _result_cache.get(cache_key)
+    if cached is not None:
+        return [snap.by_id[sku_id] for sku_id in cached if sku_id in snap.by_id]
+
+    with _time_encode:
+        q_embed = _encode_query(query)
 
-    # Parse numbers
-    q_nums, q_unit = _parse_query_dims(query)
+    with _time_score:
+        ranked = _rank(snap, query, q_embed, top_n)
+    _result_cache.put(cache_key, tuple(p['id'] for p in ranked))
+    return ranked
 
-    def combined_score(p, sem):
-        dist = _scheme_distance(p, q_nums, q_unit)
-        return sem - 0.01 * dist
 
+def match_item_types(text: str):
+    """Catalogue item types named in text ("2 couplers 110" → ['coupler'])."""
+    return _snapshot.type_matcher.match(text)
+
+
+def _candidates(snap: CatalogueSnapshot, q_embed, q_mm, matched_types):
+    """Catalogue rows worth scoring for a query (sorted, unique)."""
     if matched_types:
-        cand_idx = [i for i, p in enumerate(_catalogue) if p['name'].lower() in matched_types]
-    else:
-        cand_idx = range(len(_catalogue))
-
-    # Compute semantic similarity
-    sem_sims = (_embeddings[cand_idx] @ q_embed) / (norm(_embeddings[cand_idx], axis=1) * norm(q_embed))
-    scored = []
-    for idx, sem in zip(cand_idx, sem_sims):
-        p = _catalogue[idx]
-        score = combined_score(p, sem)
-        scored.append((score, p))
-
-    ranked = [p for _, p in sorted(scored, key=lambda x: x[0], reverse=True)]
-    return ranked[:top_n]
+        # With a size, only the rows of the nearest sizes of those types
+        nearest = snap.size_index.nearest(matched_types, q_mm, snap.size_nearest)
+        if nearest is not None:
+            return nearest
+        return np.unique(np.concatenate([snap.type_rows[t] for t in matched_types]))
+    if snap.index is not None and snap.index.kind != 'flat':
+        # Approximate retrieval first; dimensions re-rank the shortlist
+        return np.sort(snap.index.search(q_embed, current_app.config["SEARCH_CANDIDATES"]))
+    return np.arange(len(snap))
+
+
+def _similarities(snap: CatalogueSnapshot, rows, q_embed):
+    """
+    Cosine similarity of catalogue rows against a unit query vector (rows
+    are unit-length, so a dot product is the cosine), from the scoring
+    matrix. Small subsets are gathered first; otherwise everything is
+    scored in place.
+    """
+    if len(rows) * 4 < len(snap):
+        return snap.scoring[rows] @ q_embed
+    return (snap.scoring @ q_embed)[rows]
+
+
+def _best(snap: CatalogueSnapshot, q_mm, q_embed, cand_idx, sem_sims, top_n: int):
+    """Adds the size distance to the similarities; returns the top_n products."""
+    dist   = _distances_mm(snap.scheme_codes[cand_idx], snap.dim_a[cand_idx], snap.dim_b[cand_idx], q_mm)
+    scores = sem_sims - 0.01 * dist
+    if snap.scoring is not snap.embeddings and len(cand_idx):
+        # Approximate scores pick the shortlist; exact float32 rows order it
+        k = max(top_n, snap.rerank)
+        if k < len(scores):
+            keep = np.sort(np.argpartition(-scores, k - 1)[:k])
+            cand_idx, dist = cand_idx[keep], dist[keep]
+        scores = np.asarray(snap.embeddings[cand_idx] @ q_embed) - 0.01 * dist
+    return [snap.products[i] for i in _top_n(scores, cand_idx, top_n)]
+
+
+def _rank(snap: CatalogueSnapshot, query: str, q_embed, top_n: int):
+    """Scores the query against the snapshot; returns the top_n products."""
+    # Item-type match (plural-aware)
+    types    = snap.type_matcher.match(query)
+    q_mm     = _query_sizes(snap, query, types)
+    cand_idx = _candidates(snap, q_embed, q_mm, types)
+    return _best(snap, q_mm, q_embed, cand_idx, _similarities(snap, cand_idx, q_embed), top_n)
+
+
+@_time_batch
+def batch_search(queries, top_n: int = 3):
+    """
+    enhanced_search() over several queries (e.g. the line items of one
+    order) at roughly the cost of one: repeated items are ranked once,
+    cache misses are encoded in one model call and full-catalogue scans
+    share one matrix product. Returns one ranked list per query, in order.
+    """
+    _ensure_loaded()
+    _follow_reload_stamp()
+    snap = _snapshot
+
+    queries = [_normalize_query(q) for q in queries]
+    ranked: dict = {}                                  # distinct query → products
+    for query in dict.fromkeys(queries):
+        cached = _result_cache.get((snap.version, query, top_n))
+        if cached is not None:
+            ranked[query] = [snap.by_id[sku_id] for sku_id in cached if sku_id in snap.by_id]
+    texts = [q for q in dict.fromkeys(queries) if q not in ranked]
+
+    if texts:
+        with _time_encode:
+            q_embeds = _encode_queries(texts)
+
+        with _time_score:
+            types = [snap.type_matcher.match(text) for text in texts]
+            dims  = [_query_sizes(snap, text, t) for text, t in zip(texts, types)]
+            cands = [_candidates(snap, q, q_mm, t) for q, q_mm, t in zip(q_embeds, dims, types)]
+            # Queries that score most of the catalogue share one (N, d) x (d, k)
+            # product; narrow ones (an item type, an IVF shortlist) only touch
+            # their own few rows, which is cheaper than widening them to the union
+            wide = [j for j, cand_idx in enumerate(cands) if len(cand_idx) * 4 >= len(snap)]
+            wide_sims = snap.scoring @ q_embeds[wide].T if wide else None
+            column = {j: c for c, j in enumerate(wide)}
+            for j, (text, cand_idx) in enumerate(zip(texts, cands)):
+                if j in column:
+                    sem_sims = wide_sims[cand_idx, column[j]]
+                else:
+                    sem_sims = _similarities(snap, cand_idx, q_embeds[j])
+                ranked[text] = _best(snap, dims[j], q_embeds[j], cand_idx, sem_sims, top_n)
+                _result_cache.put((snap.version, text, top_n), tuple(p['id'] for p in ranked[text]))
+    return [ranked[q] for q in queries]
@@ -0,0 +1,157 @@
+"""
+Where the catalogue DataFrame comes from
+———————————
+CATALOGUE_SOURCE picks one of:
+• 'sheets'   – the Catalogue tab (default). Every successful read is saved
+  as a local snapshot; at startup the snapshot is read first (no network,
+  milliseconds) and the tab is re-read in the background. If Sheets is
+  unreachable the snapshot is used instead.
+• 'csv'      – CATALOGUE_FILE, e.g. master_catalogue.csv (offline / dev).
+• 'snapshot' – only the local snapshot.
+Snapshots are Parquet when pyarrow (or fastparquet) is installed and a
+pandas pickle otherwise; either way the column layout is the tab's.
+"""
+
+import os
+import hashlib
+import logging
+from typing import Optional, Tuple
+
+import pandas as pd
+from flask import current_app
+
+from app.services import sheets
+
+logger = logging.getLogger(__name__)
+
+SOURCE_SHEETS   = 'sheets'
+SOURCE_CSV      = 'csv'
+SOURCE_SNAPSHOT = 'snapshot'
+
+_PARQUET = '.parquet'
+_PICKLE  = '.pkl'
+
+
+def _parquet_available() -> bool:
+    for module in ('pyarrow', 'fastparquet'):
+        try:
+            __import__(module)
+            return True
+        except ImportError:
+            continue
+    return False
+
+
+def _snapshot_base() -> str:
+    return current_app.config.get('CATALOGUE_SNAPSHOT_PATH', '')
+
+
+def _existing_snapshot(base: str) -> Optional[str]:
+    for ext in (_PARQUET, _PICKLE):
+        if os.path.exists(base + ext):
+            return base + ext
+    return None
+
+
+def snapshot_exists() -> bool:
+    base = _snapshot_base()
+    return bool(base) and _existing_snapshot(base) is not None
+
+
+def read_snapshot(base: Optional[str] = None) -> pd.DataFrame:
+    base = base if base is not None else _snapshot_base()
+    path = _existing_snapshot(base) if base else None
+    if path is None:
+        raise FileNotFoundError(f"No catalogue snapshot at {base}{_PARQUET} / {_PICKLE}")
+    if path.endswith(_PARQUET):
+        return pd.read_parquet(path)
+    # Written by write_snapshot() below, never from outside input
+    return pd.read_pickle(path)
+
+
+def write_snapshot(df: pd.DataFrame, base: Optional[str] = None) -> Optional[str]:
+    """
+    Saves df atomically; returns the path written. Failures are logged, a
+    missing snapshot only costs the next cold start.
+    """
+    base = base if base is not None else _snapshot_base()
+    if not base:
+        return None
+    ext  = _PARQUET if _parquet_available() else _PICKLE
+    path = base + ext
+    tmp  = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Sheets cells come back as mixed str / number; store them as text
+        # so Parquet gets one type per column
+        out = df.astype(str) if ext == _PARQUET else df
+        if ext == _PARQUET:
+            out.to_parquet(tmp, index=False)
+        else:
+            out.to_pickle(tmp)
+        os.replace(tmp, path)
+        # Don't leave a snapshot of the other format behind to be read later
+        other = base + (_PICKLE if ext == _PARQUET else _PARQUET)
+        if os.path.exists(other):
+            os.remove(other)
+        return path
+    except Exception as e:
+        logger.error("❌ Failed to write catalogue snapshot %s: %s", path, e)
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return None
+
+
+def _fill_missing_ids(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    CSV rows without a SKU_ID get a stable one derived from the SKU code,
+    so IDs (kept in conversations and order rows) survive restarts.
+    """
+    ids = df['SKU_ID'].astype(str).str.strip()
+    blank = ids.eq('') | ids.str.lower().eq('nan')
+    if blank.any():
+        df = df.copy()
+        df.loc[blank, 'SKU_ID'] = [hashlib.md5(str(sku).encode()).hexdigest()[:8]
+                                   for sku in df.loc[blank, 'SKU']]
+    return df
+
+
+def read_csv(path: Optional[str] = None) -> pd.DataFrame:
+    path = path or current_app.config['CATALOGUE_FILE']
+    df = pd.read_csv(path, dtype={'SKU_ID': str, 'SKU': str}, keep_default_na=False)
+    if 'SKU_ID' not in df.columns:
+        raise ValueError("Catalogue file must have a SKU_ID column")
+    return _fill_missing_ids(df)
+
+
+def load_catalogue_frame(startup: bool = False) -> Tuple[pd.DataFrame, str]:
+    """
+    Returns (DataFrame in Catalogue-tab layout, where it came from).
+    startup=True lets the 'sheets' source answer from the local snapshot.
+    """
+    source = current_app.config.get('CATALOGUE_SOURCE', SOURCE_SHEETS)
+    if source == SOURCE_CSV:
+        return read_csv(), SOURCE_CSV
+    if source == SOURCE_SNAPSHOT:
+        return read_snapshot(), SOURCE_SNAPSHOT
+    if source != SOURCE_SHEETS:
+        raise ValueError(f"Unknown CATALOGUE_SOURCE: {source}")
+
+    if startup and snapshot_exists():
+        try:
+            df = read_snapshot()
+            logger.info("⚡ Catalogue read from local snapshot (%s rows)", len(df))
+            return df, SOURCE_SNAPSHOT
+        except Exception as e:
+            logger.warning("⚠️ Catalogue snapshot unreadable, using Sheets: %s", e)
+
+    try:
+        df = sheets.load_catalogue_df()
+    except Exception as e:
+        if not snapshot_exists():
+            raise
+        logger.warning("⚠️ Sheets unavailable (%s), serving the catalogue snapshot", e)
+        return read_snapshot(), SOURCE_SNAPSHOT
+
+    write_snapshot(df)
+    return df, SOURCE_SHEETS
@@ -0,0 +1,158 @@
+"""
+On-disk embedding cache for the catalogue
+———————————
+• One .npy matrix + one JSON manifest per model, under EMBEDDING_CACHE_DIR.
+• Rows are keyed by a hash of the text that was embedded, so only new or
+  changed products go through the model on a (re)load.
+• Rows are stored L2-normalised, so a dot product is the cosine score.
+• The matrix is opened with mmap_mode='r': every worker maps the same
+  file read-only and the OS keeps a single copy in the page cache.
+"""
+
+import os
+import re
+import json
+import glob
+import hashlib
+import logging
+from typing import Callable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_MANIFEST_VERSION = 2   # 2: rows are stored L2-normalised
+
+Encoder = Callable[[List[str]], np.ndarray]
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    Returns a float32 copy of matrix with unit-length rows (zero rows stay zero).
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms  = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class EmbeddingStore:
+    def __init__(self, cache_dir: str, model_name: str):
+        self.cache_dir  = cache_dir
+        self.model_name = model_name
+        self._slug      = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.cache_dir, f"{self._slug}.json")
+
+    def _read_manifest(self) -> Optional[dict]:
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("version") != _MANIFEST_VERSION or manifest.get("model") != self.model_name:
+            return None
+        return manifest
+
+    def _open_matrix(self, manifest: dict) -> Optional[np.ndarray]:
+        path = os.path.join(self.cache_dir, manifest["file"])
+        try:
+            matrix = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        if matrix.shape[0] != len(manifest["hashes"]):
+            return None
+        return matrix
+
+    def load(self, texts: List[str], encode: Encoder) -> np.ndarray:
+        """
+        Returns a read-only (len(texts), dim) float32 matrix of unit-length
+        embeddings for texts, encoding only the ones not already in the store.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        hashes = [text_hash(t) for t in texts]
+
+        manifest = self._read_manifest()
+        cached   = self._open_matrix(manifest) if manifest else None
+        if cached is not None and manifest["hashes"] == hashes:
+            logger.info("✅ Embedding cache hit for all %s rows", len(texts))
+            return cached
+
+        cached_pos = {}
+        if cached is not None:
+            cached_pos = {h: i for i, h in enumerate(manifest["hashes"])}
+
+        # Encode each distinct missing text once
+        missing = {}
+        for h, t in zip(hashes, texts):
+            if h not in cached_pos and h not in missing:
+                missing[h] = t
+        logger.info("🧮 Encoding %s of %s catalogue rows", len(missing), len(texts))
+
+        fresh_pos = {}
+        fresh = None
+        if missing:
+            fresh = normalize_rows(encode(list(missing.values())))
+            fresh_pos = {h: i for i, h in enumerate(missing)}
+
+        dim = fresh.shape[1] if fresh is not None else cached.shape[1]
+        matrix = np.empty((len(texts), dim), dtype=np.float32)
+        for row, h in enumerate(hashes):
+            if h in fresh_pos:
+                matrix[row] = fresh[fresh_pos[h]]
+            else:
+                matrix[row] = cached[cached_pos[h]]
+
+        return self._write(matrix, hashes)
+
+    def _write(self, matrix: np.ndarray, hashes: List[str]) -> np.ndarray:
+        """
+        Writes a new version and points the manifest at it. File names carry
+        a digest of the row hashes so concurrent writers of the same
+        catalogue produce the same file, and a reader never sees a manifest
+        that points at a half-written matrix.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        digest    = hashlib.sha1("".join(hashes).encode("ascii")).hexdigest()[:16]
+        file_name = f"{self._slug}-{digest}.npy"
+        path      = os.path.join(self.cache_dir, file_name)
+        pid       = os.getpid()
+
+        tmp_path = f"{path}.{pid}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, matrix)
+        os.replace(tmp_path, path)
+
+        manifest = {
+            "version": _MANIFEST_VERSION,
+            "model"  : self.model_name,
+            "dim"    : int(matrix.shape[1]),
+            "file"   : file_name,
+            "hashes" : hashes,
+        }
+        tmp_manifest = f"{self.manifest_path}.{pid}.tmp"
+        with open(tmp_manifest, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_manifest, self.manifest_path)
+
+        # Older versions are unreachable now; workers that still map one
+        # keep their view until they reload (POSIX unlink semantics).
+        version_file = re.compile(rf"{re.escape(self._slug)}-[0-9a-f]{{16}}\.npy$")
+        for old in glob.glob(os.path.join(self.cache_dir, f"{self._slug}-*.npy")):
+            if old != path and version_file.match(os.path.basename(old)):
+                # plus any sidecar built from it (e.g. vector index files)
+                for stale in [old] + glob.glob(f"{old}.*"):
+                    try:
+                        os.remove(stale)
+                    except OSError:
+                        pass
+
+        logger.info("💾 Wrote embedding cache %s (%s rows)", file_name, matrix.shape[0])
+        return np.load(path, mmap_mode="r")
@@ -0,0 +1,178 @@
+"""
+Micro-batching inference service for query embeddings
+———————————
+• Search threads submit() query texts and get a Future back.
+• One daemon thread makes every query-encode model call: it takes the
+  first waiting request, gathers more for up to window_ms (and whatever
+  queued up while the last call ran), up to max_batch texts, and encodes
+  them in one call. A burst of searches costs one forward pass instead of
+  one tiny batch per thread, all contending for torch's intra-op threads.
+  A lone search pays up to window_ms extra. A request larger than
+  max_batch is encoded in max_batch-sized model calls.
+• Every request's Future completes, with the embeddings or the error; a
+  caller that stops waiting (encode() timeout) is dropped from its batch.
+• Texts repeated across the requests of a batch are encoded once.
+• Batch sizes and how long requests waited for their batch are exported
+  as inference_batch_size / inference_queue_wait_seconds.
+"""
+
+import time
+import queue
+import atexit
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# encode(texts) -> (len(texts), d) array, one row per text
+Encoder = Callable[[List[str]], np.ndarray]
+
+_batch_size = metrics.summary("inference_batch_size", "Distinct texts per model call of the inference service")
+_queue_wait = metrics.summary("inference_queue_wait_seconds", "Time a request waited for its encode batch")
+
+
+class _Request:
+    __slots__ = ('texts', 'future', 'queued')
+
+    def __init__(self, texts: List[str]):
+        self.texts  = texts
+        self.future = Future()
+        self.queued = time.monotonic()
+
+
+class InferenceService:
+    def __init__(self, encode: Encoder, window_ms: float = 2, max_batch: int = 32,
+                 queue_size: int = 1000, timeout: Optional[float] = None):
+        self.encode_batch = encode
+        self.window       = window_ms / 1000.0
+        self.max_batch    = max(1, max_batch)
+        self.timeout      = timeout       # how long callers wait for their batch (None = forever)
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._atexit = False
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._thread = threading.Thread(target=self._run, name="inference", daemon=True)
+        self._thread.start()
+        if not self._atexit:
+            atexit.register(self.stop)
+            self._atexit = True
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        """Encodes what is queued and stops the worker thread."""
+        if self._thread is None:
+            return
+        thread, self._thread = self._thread, None    # later submits encode inline
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("⚠️ Inference queue still full after %ss, not waiting for it to drain", timeout)
+            return
+        thread.join(timeout)
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    # ---------- producer side ----------
+
+    def submit(self, texts: List[str]) -> Future:
+        """
+        Queues texts for the next batch; the Future resolves to their
+        (len(texts), d) embeddings. When the service is not running or its
+        queue is full the texts are encoded on the calling thread instead.
+        """
+        request = _Request(list(texts))
+        if self._thread is not None:
+            try:
+                self._queue.put_nowait(request)
+                return request.future
+            except queue.Full:
+                logger.warning("⚠️ Inference queue full, encoding %s texts inline", len(request.texts))
+        self._encode([request])
+        return request.future
+
+    def encode(self, texts: List[str], timeout: Optional[float] = None) -> np.ndarray:
+        future = self.submit(texts)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()       # not encoded yet: leave it out of its batch
+            raise
+
+    # ---------- worker side ----------
+
+    def _run(self):
+        carry = None      # request that didn't fit the last batch
+        while True:
+            first, carry = (carry, None) if carry is not None else (self._queue.get(), None)
+            if first is None:
+                return
+            batch, size, stopping = [first], len(first.texts), False
+            deadline = time.monotonic() + self.window
+            while size < self.max_batch:
+                # Past the window, still take whatever queued up meanwhile
+                remaining = deadline - time.monotonic()
+                try:
+                    request = (self._queue.get(timeout=remaining) if remaining > 0
+                               else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                if size + len(request.texts) > self.max_batch:
+                    carry = request
+                    break
+                batch.append(request)
+                size += len(request.texts)
+            self._encode(batch)
+            if stopping:
+                if carry is not None:
+                    self._encode([carry])
+                return
+
+    def _encode(self, batch: List[_Request]):
+        # A caller that gave up (cancelled its future) is left out
+        batch = [r for r in batch if r.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        started = time.monotonic()
+        for request in batch:
+            _queue_wait.observe(started - request.queued)
+        texts = list(dict.fromkeys(t for request in batch for t in request.texts))
+        # Anything going wrong here must still complete every future: the
+        # worker thread has to survive it and callers must not wait forever
+        try:
+            vectors = self._encode_texts(texts)
+            row = {t: i for i, t in enumerate(texts)}
+            results = [vectors[[row[t] for t in request.texts]] if request.texts
+                       else np.zeros((0, 0), dtype=np.float32) for request in batch]
+        except Exception as e:
+            logger.error("❌ Encoding a batch of %s texts failed: %s", len(texts), e)
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        for request, result in zip(batch, results):
+            request.future.set_result(result)
+
+    def _encode_texts(self, texts: List[str]) -> Optional[np.ndarray]:
+        """One model call per max_batch texts."""
+        if not texts:
+            return None
+        chunks = [np.asarray(self.encode_batch(texts[i:i + self.max_batch]))
+                  for i in range(0, len(texts), self.max_batch)]
+        for chunk in chunks:
+            _batch_size.observe(len(chunk))
+        return chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
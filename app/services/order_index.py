@@ -0,0 +1,90 @@
+"""
+In-memory index of the Orders_Status tab
+———————————
+Maps (phone, SKU_ID) → sheet row number so update_status() can write one
+cell instead of downloading the whole tab.
+• Our own appends are added as they happen (from the append response).
+• reconcile() reads only the rows below the last one already indexed, so
+  rows added by someone else (or another worker) are picked up cheaply.
+The Orders tab is treated as append-only: rows are never expected to be
+deleted or re-sorted.
+"""
+
+import re
+import time
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+Key = Tuple[str, str]
+
+_UPDATED_RANGE = re.compile(r"![A-Z]+(\d+)(?::[A-Z]+(\d+))?$")
+
+
+def rows_from_updated_range(updated_range: str) -> Optional[Tuple[int, int]]:
+    """
+    'Orders_Status!A12:F14' → (12, 14). None if it can't be parsed.
+    """
+    m = _UPDATED_RANGE.search(updated_range or "")
+    if not m:
+        return None
+    first = int(m.group(1))
+    last  = int(m.group(2) or first)
+    return first, last
+
+
+class OrderIndex:
+    def __init__(self, reconcile_seconds: float = 60.0):
+        self.reconcile_seconds = reconcile_seconds
+        self._rows: Dict[Key, int] = {}
+        self._scanned_to = 1          # header is row 1
+        self._built = False
+        self._last_reconcile = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    @property
+    def built(self) -> bool:
+        return self._built
+
+    def reset(self):
+        with self._lock:
+            self._rows.clear()
+            self._scanned_to = 1
+            self._built = False
+            self._last_reconcile = 0.0
+
+    def lookup(self, phone: str, sku_id: str) -> Optional[int]:
+        return self._rows.get((phone, sku_id))
+
+    def add_rows(self, first_row: int, keys: Iterable[Key]):
+        """Records rows we appended ourselves, starting at first_row."""
+        with self._lock:
+            last_row = first_row - 1
+            for offset, key in enumerate(keys):
+                # first matching row wins, same as a top-down scan
+                self._rows.setdefault(key, first_row + offset)
+                last_row = first_row + offset
+            # Only move the high-water mark if nothing was skipped in between
+            if self._built and first_row == self._scanned_to + 1:
+                self._scanned_to = last_row
+
+    def reconcile_due(self) -> bool:
+        return not self._built or time.monotonic() - self._last_reconcile >= self.reconcile_seconds
+
+    def reconcile(self, read_from: Callable[[int], List[Tuple[str, str]]]) -> int:
+        """
+        read_from(start_row) must return (phone, sku_id) pairs for every
+        row from start_row to the end of the tab. Returns rows read.
+        """
+        with self._lock:
+            start = self._scanned_to + 1
+        pairs = read_from(start)
+        with self._lock:
+            for offset, key in enumerate(pairs):
+                self._rows.setdefault(key, start + offset)
+            self._scanned_to = max(self._scanned_to, start + len(pairs) - 1)
+            self._built = True
+            self._last_reconcile = time.monotonic()
+        return len(pairs)
@@ -0,0 +1,109 @@
+"""
+Async request pipeline helpers
+———————————
+The webhook is an async view: blocking work is pushed onto bounded thread
+pools and awaited, so Sheets I/O and the catalogue search run side by
+side and a slow call is cut off by a timeout instead of stalling the
+worker thread.
+• 'search' pool – CPU-bound catalogue search / model encode.
+• 'io' pool     – Google Sheets calls.
+Each pool admits at most PIPELINE_<POOL>_MAX_IN_FLIGHT calls; beyond that a
+call waits up to PIPELINE_QUEUE_TIMEOUT seconds (off the event loop) and
+then fails fast with PipelineBusy.
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineBusy(Exception):
+    """Raised when a pool is saturated and the call could not be admitted."""
+
+
+class _Pool:
+    def __init__(self, name: str, workers: int, max_in_flight: int):
+        self.name      = name
+        self.executor  = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"pipeline-{name}")
+        self.admission = threading.BoundedSemaphore(max_in_flight)
+
+
+_pools: Dict[str, _Pool] = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(name: str) -> _Pool:
+    pool = _pools.get(name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                key = name.upper()
+                pool = _Pool(
+                    name,
+                    workers       = current_app.config[f"PIPELINE_{key}_WORKERS"],
+                    max_in_flight = current_app.config[f"PIPELINE_{key}_MAX_IN_FLIGHT"],
+                )
+                _pools[name] = pool
+    return pool
+
+
+async def _admit(pool: _Pool, wait: float) -> bool:
+    """
+    Takes an in-flight slot of pool. A saturated pool is waited on in the
+    default executor so the event loop keeps serving other requests.
+    """
+    if pool.admission.acquire(blocking=False):
+        return True
+    waiting = asyncio.get_running_loop().run_in_executor(None, pool.admission.acquire, True, wait)
+    try:
+        return await asyncio.shield(waiting)
+    except asyncio.CancelledError:
+        # The waiting thread may still get the slot: hand it back
+        waiting.add_done_callback(lambda f: f.result() and pool.admission.release())
+        raise
+
+
+async def run_blocking(pool_name: str, fn: Callable[..., Any], *args,
+                       timeout: Optional[float] = None, **kwargs) -> Any:
+    """
+    Runs fn(*args, **kwargs) on the named pool inside the current app
+    context and awaits it. Raises PipelineBusy if the pool is saturated and
+    asyncio.TimeoutError if the call takes longer than timeout (the thread
+    itself finishes in the background).
+    """
+    pool = _get_pool(pool_name)
+    app  = current_app._get_current_object()
+
+    if not await _admit(pool, app.config["PIPELINE_QUEUE_TIMEOUT"]):
+        raise PipelineBusy(f"{pool_name} pool is saturated")
+
+    def call():
+        try:
+            with app.app_context():
+                return fn(*args, **kwargs)
+        finally:
+            pool.admission.release()
+
+    future = asyncio.get_running_loop().run_in_executor(pool.executor, call)
+    if timeout:
+        # shield: on timeout stop waiting, but let the thread finish its work
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+    return await future
+
+
+async def settle(task: "asyncio.Future", timeout: Optional[float] = None) -> None:
+    """
+    Waits for a fire-and-forget task before the request ends; failures are
+    logged, never raised.
+    """
+    try:
+        await asyncio.wait_for(asyncio.shield(task), timeout)
+    except Exception as e:
+        logger.error("❌ Background pipeline task failed: %s", e)
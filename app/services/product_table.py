@@ -0,0 +1,152 @@
+"""
+Columnar product catalogue
+———————————
+Catalogue keeps one array per product field instead of one dict per SKU:
+• numeric fields (dim_a, dim_b, price) – float64 arrays
+• repetitive text (name, brand, scheme, size_text, units) – integer codes
+  into a small table of interned strings
+• unique text (id, sku) – object arrays
+Product is a two-slot view (table, row) that reads like the old dict:
+product['brand'], product.get(...), dict(product), == against a dict.
+"""
+
+import sys
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+FIELDS      = ('id', 'sku', 'name', 'brand', 'scheme', 'size_text',
+               'dim_a', 'dim_b', 'unit', 'price_unit', 'price')
+NUMERIC     = ('dim_a', 'dim_b', 'price')
+CATEGORICAL = ('name', 'brand', 'scheme', 'size_text', 'unit', 'price_unit')
+UNIQUE      = ('id', 'sku')
+
+
+class Product(Mapping):
+    """Read-only view of one catalogue row."""
+    __slots__ = ('_table', '_row')
+
+    def __init__(self, table: "Catalogue", row: int):
+        self._table = table
+        self._row   = row
+
+    def __getitem__(self, key):
+        return self._table.value(key, self._row)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(FIELDS)
+
+    def __len__(self) -> int:
+        return len(FIELDS)
+
+    def __repr__(self):
+        return f"Product({dict(self)!r})"
+
+    @property
+    def row(self) -> int:
+        return self._row
+
+
+class _ById(Mapping):
+    """SKU_ID → Product over a Catalogue."""
+    __slots__ = ('_table',)
+
+    def __init__(self, table: "Catalogue"):
+        self._table = table
+
+    def __getitem__(self, sku_id) -> Product:
+        return Product(self._table, self._table.positions[sku_id])
+
+    def __contains__(self, sku_id) -> bool:
+        return sku_id in self._table.positions
+
+    def __iter__(self):
+        return iter(self._table.positions)
+
+    def __len__(self) -> int:
+        return len(self._table.positions)
+
+
+def _categorical(values) -> tuple:
+    series = pd.Series(values, dtype=object)
+    codes, uniques = pd.factorize(series)
+    uniques = list(uniques)
+    # Missing values come back as -1 (use_na_sentinel=False needs pandas
+    # 1.5); they share one category of their own
+    missing = codes == -1
+    if missing.any():
+        uniques.append(series[missing].iloc[0])
+        codes = np.where(missing, len(uniques) - 1, codes)
+    categories = np.array([sys.intern(str(u)) for u in uniques], dtype=object)
+    dtype = np.int16 if len(categories) < 2 ** 15 else np.int32
+    return codes.astype(dtype), categories
+
+
+class Catalogue:
+    def __init__(self, columns: Dict[str, Iterable]):
+        """columns: one aligned sequence per field in FIELDS."""
+        n = len(columns['id'])
+        self._numeric: Dict[str, np.ndarray] = {
+            f: np.asarray(columns[f], dtype=np.float64).reshape(n) for f in NUMERIC}
+        self._codes: Dict[str, np.ndarray] = {}
+        self._categories: Dict[str, np.ndarray] = {}
+        for f in CATEGORICAL:
+            self._codes[f], self._categories[f] = _categorical(columns[f])
+        self._unique: Dict[str, np.ndarray] = {
+            f: np.array([str(v) for v in columns[f]], dtype=object).reshape(n) for f in UNIQUE}
+        self.positions: Dict[str, int] = dict(zip(self._unique['id'].tolist(), range(n)))
+        self.by_id = _ById(self)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Mapping]) -> "Catalogue":
+        records = list(records)
+        return cls({f: [r[f] for r in records] for f in FIELDS})
+
+    def __len__(self) -> int:
+        return len(self._unique['id'])
+
+    def __getitem__(self, row) -> Product:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return Product(self, int(row))
+
+    def __iter__(self) -> Iterator[Product]:
+        return (Product(self, i) for i in range(len(self)))
+
+    # ---------- field access ----------
+
+    def value(self, field: str, row: int):
+        if field in self._codes:
+            return self._categories[field][self._codes[field][row]]
+        if field in self._numeric:
+            return float(self._numeric[field][row])
+        if field in self._unique:
+            return self._unique[field][row]
+        raise KeyError(field)
+
+    def column(self, field: str) -> np.ndarray:
+        """Whole column, decoded (numeric columns are returned as stored)."""
+        if field in self._codes:
+            return self._categories[field][self._codes[field]]
+        if field in self._numeric:
+            return self._numeric[field]
+        if field in self._unique:
+            return self._unique[field]
+        raise KeyError(field)
+
+    def codes(self, field: str):
+        """(codes, categories) of a categorical column."""
+        return self._codes[field], self._categories[field]
+
+    def get(self, sku_id: str) -> Optional[Product]:
+        row = self.positions.get(sku_id)
+        return None if row is None else Product(self, row)
+
+    def row_tuples(self) -> Dict[str, tuple]:
+        """SKU_ID → tuple of every field, for change detection."""
+        cols = [self.column(f).tolist() for f in FIELDS]
+        return dict(zip(cols[0], zip(*cols)))
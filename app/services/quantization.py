@@ -0,0 +1,77 @@
+"""
+Compressed embedding matrices for the first scoring pass
+———————————
+EMBEDDING_PRECISION picks what each worker keeps in memory for scoring:
+• 'float32' – the embeddings themselves (default)
+• 'float16' – half the bytes; scores within ~1e-3 of float32
+• 'int8'    – a quarter of the bytes; every dimension is scaled by its own
+  max |value| / 127, so dimensions with a small range keep their precision
+A QuantizedMatrix stands in for the float32 matrix where candidates are
+scored (matrix[rows], matrix @ q): rows are decoded to float32 in blocks,
+so no full-size float32 copy is ever built. enhanced_search() then re-ranks
+its best few candidates against the exact float32 rows, read from the
+memory-mapped EmbeddingStore file (only those rows are paged in).
+"""
+
+import numpy as np
+
+PRECISIONS = ('float32', 'float16', 'int8')
+
+_DECODE_BLOCK = 512           # rows decoded to float32 at a time by @ (stays in cache)
+
+
+class QuantizedMatrix:
+    def __init__(self, codes: np.ndarray, scale: np.ndarray = None):
+        self.codes = codes                          # (N, d) float16 or int8
+        self.scale = scale                          # (d,) float32 for int8, else None
+        self.precision = codes.dtype.name
+
+    @classmethod
+    def from_float32(cls, matrix: np.ndarray, precision: str) -> "QuantizedMatrix":
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if precision == 'float16':
+            return cls(matrix.astype(np.float16))
+        if precision != 'int8':
+            raise ValueError(f"Unknown embedding precision: {precision}")
+        scale = np.abs(matrix).max(axis=0) / 127.0 if len(matrix) else np.ones(matrix.shape[1])
+        scale = np.where(scale > 0, scale, 1.0).astype(np.float32)
+        codes = np.clip(np.rint(matrix / scale), -127, 127).astype(np.int8)
+        return cls(codes, scale)
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def _decode(self, codes: np.ndarray) -> np.ndarray:
+        rows = codes.astype(np.float32)
+        return rows * self.scale if self.scale is not None else rows
+
+    def __getitem__(self, rows) -> np.ndarray:
+        """Decoded float32 rows."""
+        return self._decode(self.codes[rows])
+
+    def __matmul__(self, other: np.ndarray) -> np.ndarray:
+        """Approximate self @ other for a (d,) or (d, k) float32 operand."""
+        other = np.asarray(other, dtype=np.float32)
+        if self.scale is not None:
+            # x ≈ codes * scale per dimension, so x·q = codes·(scale * q)
+            other = other * (self.scale if other.ndim == 1 else self.scale[:, None])
+        out = np.empty((len(self.codes),) + other.shape[1:], dtype=np.float32)
+        for start in range(0, len(self.codes), _DECODE_BLOCK):
+            block = self.codes[start:start + _DECODE_BLOCK]
+            out[start:start + len(block)] = block.astype(np.float32) @ other
+        return out
+
+
+def quantize(matrix: np.ndarray, precision: str):
+    """matrix itself for 'float32', else a QuantizedMatrix of it."""
+    if precision == 'float32' or matrix.size == 0:
+        return matrix
+    return QuantizedMatrix.from_float32(matrix, precision)
@@ -0,0 +1,317 @@
+"""
+Write-behind queue for Google Sheets
+———————————
+• Webhook threads submit() small write ops and return straight away.
+• A daemon thread drains the bounded queue and hands the ops to a handler
+  in batches: every flush_interval_ms, or sooner once max_batch_rows ops
+  are waiting.
+• Every op is appended to a local spool file before it is queued and only
+  dropped from it once the handler succeeded, so a restart (or a crash)
+  replays whatever had not reached the sheet yet.
+• Failed ops are retried with the next batch, alongside new writes, so
+  delivery is at-least-once: an op whose failed attempt reached the sheet
+  anyway is written twice. An op that failed max_attempts times, or with
+  an error the retryable() callback rejects, is moved to the dead-letter
+  file (dead-letter.jsonl in the spool directory) so it can't hold up the
+  writes behind it.
+• Once a kind fails, the kinds ranked after it in last_kinds are carried
+  untried: a status update must not run ahead of the append it refers to.
+"""
+
+import os
+import glob
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# handler(kind, ops) writes one batch of ops of the same kind; raising
+# leaves the whole batch pending for the next attempt.
+BatchHandler = Callable[[str, List[Dict[str, Any]]], None]
+# retryable(exc) → False for errors a later attempt can't fix
+Retryable = Callable[[Exception], bool]
+
+_MAX_BACKOFF_SECONDS = 30
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SheetWriter:
+    def __init__(self, app, handler: BatchHandler, flush_interval_ms: int = 500,
+                 max_batch_rows: int = 50, queue_size: int = 1000,
+                 spool_dir: Optional[str] = None, last_kinds: tuple = (),
+                 max_attempts: int = 8, retryable: Optional[Retryable] = None):
+        self.app              = app
+        self.handler          = handler
+        self.max_attempts     = max(1, max_attempts)
+        self.retryable        = retryable or (lambda exc: True)
+        self.flush_interval   = flush_interval_ms / 1000.0
+        self.max_batch_rows   = max_batch_rows
+        self.spool_dir        = spool_dir
+        # Kinds applied after every other kind in a batch, in this order
+        # (e.g. status updates must land after the appends they refer to).
+        self.last_kinds       = tuple(last_kinds)
+
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=queue_size)
+        self._pending: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._lock     = threading.Lock()
+        self._seq      = 0
+        self._thread   = None
+        self._stopping = threading.Event()
+        self._idle     = threading.Event()
+        self._idle.set()
+        self._spool    = None
+        self._spool_path = None
+        # Ops that failed a synchronous write (queue full); the worker
+        # retries them with its next batch
+        self._retry: List[Dict[str, Any]] = []
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        if self.spool_dir:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            self._spool_path = os.path.join(self.spool_dir, f"sheets-{os.getpid()}.jsonl")
+            replayed, claimed = self._claim_orphaned_spools()
+            self._rewrite_spool()
+            # Only forget the old files once their ops are in our own spool
+            for path in claimed:
+                os.remove(path)
+        else:
+            replayed = []
+
+        # Running before the replay, so a spool larger than the queue drains
+        # through it instead of blocking start()
+        self._thread = threading.Thread(target=self._run, name="sheet-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        for op in replayed:
+            self._queue.put(op)
+        if replayed:
+            logger.info("♻️ Replaying %s spooled Sheets writes", len(replayed))
+        return self
+
+    def stop(self, timeout: float = 10.0):
+        """Flushes what is queued and stops the worker thread."""
+        if self._thread is None:
+            return
+        self.flush(timeout)
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+        with self._lock:
+            if self._spool is not None:
+                self._spool.close()
+                self._spool = None
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Blocks until everything submitted so far has been attempted."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._queue.unfinished_tasks == 0 and self._idle.is_set() and not self._retry:
+                return True
+            time.sleep(0.01)
+        return False
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    # ---------- producer side ----------
+
+    def submit(self, kind: str, **payload):
+        """
+        Queues a write. Falls back to writing synchronously when the queue
+        is full so that back-pressure never loses a row.
+        """
+        with self._lock:
+            self._seq += 1
+            op = {"seq": self._seq, "kind": kind, **payload}
+            self._pending[op["seq"]] = op
+            self._append_to_spool(op)
+        try:
+            self._queue.put_nowait(op)
+        except queue.Full:
+            logger.warning("⚠️ Sheets write queue full, writing %s synchronously", kind)
+            failed = self._apply([op])
+            if failed:
+                with self._lock:
+                    self._retry.extend(failed)
+
+    # ---------- worker side ----------
+
+    def _run(self):
+        carry: List[Dict[str, Any]] = []
+        failures = 0
+        while not self._stopping.is_set():
+            with self._lock:
+                batch, self._retry = carry + self._retry, []
+                if batch:
+                    self._idle.clear()
+            carry = []
+            taken = 0
+            if not batch:
+                try:
+                    batch.append(self._queue.get(timeout=self.flush_interval))
+                except queue.Empty:
+                    continue
+                self._idle.clear()
+                taken = 1
+            # New writes go out with the retried ones instead of queueing
+            # behind them; only a fresh batch waits to fill up
+            batch_deadline = time.monotonic() + (self.flush_interval if taken else 0)
+            while len(batch) < self.max_batch_rows:
+                remaining = batch_deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0
+                                 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+                taken += 1
+
+            carry = self._apply(batch)
+            for _ in range(taken):
+                self._queue.task_done()
+
+            if carry:
+                failures += 1
+                backoff = min(_MAX_BACKOFF_SECONDS, 2 ** failures)
+                logger.warning("⚠️ %s Sheets writes failed, retrying in %ss", len(carry), backoff)
+                self._stopping.wait(backoff)
+            else:
+                failures = 0
+            self._idle.set()
+
+    def _apply(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Applies a batch grouped by kind; returns the ops to retry. Ops that
+        can't succeed are dead-lettered instead.
+        """
+        groups: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        for op in batch:
+            groups.setdefault(op["kind"], []).append(op)
+        rank = {kind: n + 1 for n, kind in enumerate(self.last_kinds)}
+        ordered = sorted(groups.items(), key=lambda kv: rank.get(kv[0], 0))
+
+        failed: List[Dict[str, Any]] = []
+        failed_rank = None
+        with self.app.app_context():
+            for kind, ops in ordered:
+                if failed_rank is not None and rank.get(kind, 0) >= failed_rank:
+                    # Depends on a kind that didn't land: carry it untried
+                    failed.extend(ops)
+                    continue
+                retry = self._apply_group(kind, ops)
+                if retry:
+                    failed.extend(retry)
+                    failed_rank = rank.get(kind, 0)
+
+        with self._lock:
+            self._rewrite_spool()
+        return failed
+
+    def _apply_group(self, kind: str, ops: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Runs the handler on ops of one kind; returns the ops to retry."""
+        try:
+            self.handler(kind, ops)
+        except Exception as e:
+            if len(ops) > 1 and not self.retryable(e):
+                # One bad op shouldn't take the rest of its batch down with it
+                return [retry for op in ops for retry in self._apply_group(kind, [op])]
+            logger.error("❌ Sheets write-behind failed for %s %s op(s): %s", len(ops), kind, e)
+            retry = []
+            for op in ops:
+                op["attempts"] = op.get("attempts", 0) + 1
+                if op["attempts"] >= self.max_attempts or not self.retryable(e):
+                    self._dead_letter(op, e)
+                else:
+                    retry.append(op)
+            return retry
+        with self._lock:
+            for op in ops:
+                self._pending.pop(op["seq"], None)
+        return []
+
+    def _dead_letter(self, op: Dict[str, Any], error: Exception):
+        """Gives up on op: logs it and moves it from the spool to the dead-letter file."""
+        logger.error("💀 Giving up on Sheets %s write after %s attempt(s): %s – %s",
+                     op["kind"], op.get("attempts", 0), error, op)
+        with self._lock:
+            self._pending.pop(op["seq"], None)
+            if self.spool_dir:
+                with open(os.path.join(self.spool_dir, "dead-letter.jsonl"), "a", encoding="utf-8") as f:
+                    f.write(json.dumps({**op, "error": str(error), "failed_at": time.time()}) + "\n")
+
+    # ---------- spool file ----------
+
+    def _append_to_spool(self, op: Dict[str, Any]):
+        if self._spool is None:
+            return
+        self._spool.write(json.dumps(op) + "\n")
+        self._spool.flush()
+
+    def _rewrite_spool(self):
+        """Compacts the spool down to the ops that are still pending."""
+        if self._spool_path is None:
+            return
+        if self._spool is not None:
+            self._spool.close()
+        tmp_path = self._spool_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for op in self._pending.values():
+                f.write(json.dumps(op) + "\n")
+        os.replace(tmp_path, self._spool_path)
+        self._spool = open(self._spool_path, "a", encoding="utf-8")
+
+    def _claim_orphaned_spools(self):
+        """
+        Takes over spool files left behind by processes that are gone.
+        Renaming is atomic, so with several workers starting at once each
+        orphan is claimed by exactly one of them.
+        """
+        replayed: List[Dict[str, Any]] = []
+        claimed_paths: List[str] = []
+        for path in sorted(glob.glob(os.path.join(self.spool_dir, "sheets-*.jsonl"))):
+            try:
+                pid = int(os.path.basename(path)[len("sheets-"):-len(".jsonl")])
+            except ValueError:
+                continue
+            if pid != os.getpid() and _pid_alive(pid):
+                continue
+            claimed = f"{path}.claimed-{os.getpid()}"
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            with open(claimed, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        logger.warning("⚠️ Skipping corrupt spool line in %s", path)
+                        continue
+                    self._seq += 1
+                    op["seq"] = self._seq
+                    self._pending[op["seq"]] = op
+                    replayed.append(op)
+            claimed_paths.append(claimed)
+        return replayed, claimed_paths
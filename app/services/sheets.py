@@ -1,25 +1,40 @@
 """
 Google Sheets helper layer
 ———————————
-• Authorises via service-account JSON.
-• Grabs worksheets by title & tab name.
+• Authorises via service-account JSON (once per process).
+• Grabs worksheets by title & tab name; client, spreadsheet and worksheet
+  handles are cached and dropped again on 401/404.
 • Loads the Catalogue tab into a DataFrame and back-fills missing SKU_IDs
   (unique 8-char hex).
-• Appends / updates rows in the Orders tabs.
+• Appends / updates rows in the Orders tabs, optionally through the
+  write-behind queue in sheet_writer.py. Appends are at-least-once: one
+  that failed is sent again later, and if Google had committed it before
+  answering 5xx the rows appear twice.
+• Every API call goes through the rate-limited, prioritised scheduler in
+  sheets_scheduler.py.
 """
 
 import os
-import uuid
-import time
 import logging
-from typing import Dict, Any, List
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple, Callable
 from datetime import datetime
 
 import gspread
+from gspread.utils import rowcol_to_a1
+import numpy as np
 import pandas as pd
 from oauth2client.service_account import ServiceAccountCredentials
 from flask import current_app
 
+from app.services.sheet_writer import SheetWriter
+from app.services.sheets_scheduler import (
+    SheetsScheduler, _status_code, PRIORITY_STATUS, PRIORITY_ORDER, PRIORITY_CATALOGUE, PRIORITY_LOG, PRIORITY_NAMES,
+)
+from app.services.order_index import OrderIndex, rows_from_updated_range
+from app.utils import metrics
+
 logger = logging.getLogger(__name__)
 
 # -------------------------------------------------
@@ -47,7 +62,7 @@ def _authorize():
                 creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
                 logger.info("✅ Successfully loaded credentials from environment")
             except Exception as e:
-                logger.error(f"❌ Failed to parse credentials from environment: {str(e)}")
+                logger.error("❌ Failed to parse credentials from environment: %s", e)
                 raise
         else:
             # Fall back to file-based credentials
@@ -56,13 +71,13 @@ def _authorize():
                 logger.error(error_msg)
                 raise FileNotFoundError(error_msg)
                 
-            logger.info(f"🔑 Using credentials file: {creds_file}")
+            logger.info("🔑 Using credentials file: %s", creds_file)
             
             try:
                 creds = ServiceAccountCredentials.from_json_keyfile_name(creds_file, scope)
                 logger.info("✅ Successfully loaded credentials")
             except Exception as e:
-                logger.error(f"❌ Failed to load credentials: {str(e)}")
+                logger.error("❌ Failed to load credentials: %s", e)
                 raise
             
         # Authorize with gspread
@@ -71,56 +86,271 @@ def _authorize():
             logger.info("✅ Successfully authorized with Google Sheets")
             return client
         except Exception as e:
-            logger.error(f"❌ Failed to authorize with Google Sheets: {str(e)}")
+            logger.error("❌ Failed to authorize with Google Sheets: %s", e)
             raise
             
     except Exception as e:
-        logger.error(f"❌ Authorization failed: {str(e)}")
+        logger.error("❌ Authorization failed: %s", e)
         raise
 
 
-def get_worksheet(sheet_title: str, tab_name: str):
+# -------------------------------------------------
+# Cached client / spreadsheet / worksheet handles
+# -------------------------------------------------
+# One authorised client per process. gspread's session refreshes the OAuth
+# token on its own when it expires, so the client is only rebuilt after an
+# explicit invalidate() (e.g. the API answered 401).
+
+_cache_lock      = threading.RLock()
+_client          = None
+_spreadsheets: Dict[str, Any] = {}              # sheet title -> Spreadsheet
+_spreadsheet_keys: Dict[str, str] = {}          # sheet title -> key (survives re-auth)
+_worksheets: Dict[Tuple[str, str], Any] = {}    # (sheet title, tab) -> Worksheet
+_headers: Dict[Tuple[str, str], List[str]] = {} # (sheet title, tab) -> header row
+_order_indexes: Dict[Tuple[str, str], OrderIndex] = {}  # (sheet title, tab) -> row index
+
+# Status codes that mean a cached handle is stale rather than the call being bad
+_STALE_AUTH_STATUS   = 401
+_STALE_HANDLE_STATUS = 404
+
+_scheduler: Optional[SheetsScheduler] = None
+
+
+def _get_client():
+    global _client
+    with _cache_lock:
+        if _client is None:
+            _client = _authorize()
+        return _client
+
+
+def _get_spreadsheet(sheet_title: str):
+    with _cache_lock:
+        spreadsheet = _spreadsheets.get(sheet_title)
+        if spreadsheet is not None:
+            return spreadsheet
+
+        client = _get_client()
+        key = _spreadsheet_keys.get(sheet_title)
+        try:
+            if key:
+                # Skips the Drive files?q=name=... lookup that open() does
+                spreadsheet = client.open_by_key(key)
+            else:
+                spreadsheet = client.open(sheet_title)
+                _spreadsheet_keys[sheet_title] = spreadsheet.id
+            logger.info("✅ Successfully opened sheet: %s", sheet_title)
+        except Exception:
+            logger.error("❌ Failed to open sheet '%s'. Make sure it exists and is shared with the service account.", sheet_title)
+            raise
+
+        _spreadsheets[sheet_title] = spreadsheet
+        return spreadsheet
+
+
+def invalidate(sheet_title: Optional[str] = None, tab_name: Optional[str] = None, drop_client: bool = False):
+    """
+    Drops cached handles so the next call re-opens them.
+    • drop_client=True  → forget everything (new OAuth client next time).
+    • tab_name given    → forget that worksheet (and its header) only.
+    • sheet_title only  → forget that spreadsheet and all of its tabs.
+    """
+    global _client
+    with _cache_lock:
+        if drop_client:
+            _client = None
+            _spreadsheets.clear()
+            _worksheets.clear()
+            _headers.clear()
+            return
+
+        if tab_name is not None:
+            keys = [k for k in _worksheets if k[1] == tab_name and sheet_title in (None, k[0])]
+            for k in keys:
+                _worksheets.pop(k, None)
+                _headers.pop(k, None)
+                _reset_order_index(k)
+            return
+
+        if sheet_title is not None:
+            _spreadsheets.pop(sheet_title, None)
+            for k in [k for k in _worksheets if k[0] == sheet_title]:
+                _worksheets.pop(k, None)
+                _headers.pop(k, None)
+                _reset_order_index(k)
+
+
+def _reset_order_index(key: Tuple[str, str]):
+    index = _order_indexes.get(key)
+    if index is not None:
+        index.reset()
+
+
+def _get_scheduler() -> SheetsScheduler:
+    global _scheduler
+    with _cache_lock:
+        if _scheduler is None:
+            config = current_app.config
+            _scheduler = SheetsScheduler(
+                requests_per_minute = config.get("SHEETS_REQUESTS_PER_MINUTE", 60),
+                burst               = config.get("SHEETS_BURST", 10),
+                max_retries         = config.get("SHEETS_MAX_RETRIES", 5),
+                backoff_base        = config.get("SHEETS_BACKOFF_BASE_SECONDS", 1.0),
+                backoff_max         = config.get("SHEETS_BACKOFF_MAX_SECONDS", 32),
+            )
+            metrics.gauge("sheets_scheduler_queue_depth", "Sheets calls waiting for quota, by priority",
+                          lambda: [({"priority": name}, _scheduler.depth().get(p, 0))
+                                   for p, name in PRIORITY_NAMES.items()] if _scheduler is not None else 0)
+        return _scheduler
+
+
+def get_worksheet(sheet_title: str, tab_name: str, create_headers: Optional[List[str]] = None):
     """
     Returns a gspread Worksheet, opening by *name* (not index).
+    Handles are cached per (sheet, tab); pass create_headers to create the
+    tab with that header row when it does not exist yet.
     """
+    key = (sheet_title, tab_name)
     try:
-        client = _authorize()
-        logger.info(f"📊 Opening sheet: {sheet_title}, tab: {tab_name}")
-        
-        try:
-            spreadsheet = client.open(sheet_title)
-            logger.info(f"✅ Successfully opened sheet: {sheet_title}")
-        except Exception as e:
-            logger.error(f"❌ Failed to open sheet '{sheet_title}'. Make sure it exists and is shared with the service account.")
-            raise
-            
-        try:
-            worksheet = spreadsheet.worksheet(tab_name)
-            logger.info(f"✅ Successfully opened tab: {tab_name}")
+        with _cache_lock:
+            worksheet = _worksheets.get(key)
+            if worksheet is not None:
+                return worksheet
+
+            logger.info("📊 Opening sheet: %s, tab: %s", sheet_title, tab_name)
+            spreadsheet = _get_spreadsheet(sheet_title)
+
+            try:
+                worksheet = spreadsheet.worksheet(tab_name)
+                logger.info("✅ Successfully opened tab: %s", tab_name)
+            except gspread.exceptions.WorksheetNotFound:
+                if create_headers is None:
+                    logger.error("❌ Failed to open tab '%s'. Make sure it exists in the sheet.", tab_name)
+                    raise
+                logger.info("[LOG] Creating new tab: %s", tab_name)
+                worksheet = spreadsheet.add_worksheet(title=tab_name, rows=1000, cols=len(create_headers))
+                worksheet.append_row(create_headers, value_input_option="USER_ENTERED")
+                _headers[key] = list(create_headers)
+                logger.info("[OK] Created new tab with headers")
+
+            _worksheets[key] = worksheet
             return worksheet
-        except Exception as e:
-            logger.error(f"❌ Failed to open tab '{tab_name}'. Make sure it exists in the sheet.")
-            raise
-            
+
     except Exception as e:
-        logger.error(f"❌ Failed to get worksheet: {str(e)}")
+        logger.error("❌ Failed to get worksheet: %s", e)
         raise
 
 
+def get_header(sheet_title: str, tab_name: str, priority: int = PRIORITY_CATALOGUE) -> List[str]:
+    """
+    Returns the (cached) header row of a tab.
+    """
+    key = (sheet_title, tab_name)
+    header = _headers.get(key)
+    if header is None:
+        header = with_worksheet(sheet_title, tab_name, lambda ws: ws.row_values(1), priority=priority)
+        _headers[key] = header
+    return header
+
+
+def with_worksheet(sheet_title: str, tab_name: str, fn: Callable[[Any], Any],
+                   create_headers: Optional[List[str]] = None,
+                   priority: int = PRIORITY_CATALOGUE, timeout: Optional[float] = None,
+                   idempotent: bool = True):
+    """
+    Runs fn(worksheet) against the cached handle once the scheduler grants
+    quota at the given priority (429 / 5xx are retried there, only 429 for
+    a non-idempotent fn such as an append; timeout bounds the wait for
+    quota). A 401 drops the client and a 404 drops the stale
+    spreadsheet/tab handle; either way the call is retried once with freshly
+    opened handles.
+    """
+    scheduler = _get_scheduler()
+    for attempt in (1, 2):
+        ws = get_worksheet(sheet_title, tab_name, create_headers=create_headers)
+        try:
+            return scheduler.call(lambda: _timed_call(fn, ws, tab_name), priority, tab_name, timeout,
+                                  idempotent=idempotent)
+        except gspread.exceptions.APIError as e:
+            status = _status_code(e)
+            metrics.counter("sheets_api_status_total", "Sheets API errors by HTTP status").inc(
+                tab=tab_name, status=status)
+            if attempt == 2 or status not in (_STALE_AUTH_STATUS, _STALE_HANDLE_STATUS):
+                raise
+            logger.warning("⚠️ Sheets returned %s for tab '%s', re-opening handles", status, tab_name)
+            if status == _STALE_AUTH_STATUS:
+                invalidate(drop_client=True)
+            else:
+                invalidate(sheet_title=sheet_title)
+
+
+def _timed_call(fn: Callable[[Any], Any], ws, tab_name: str):
+    with metrics.timed("sheets_api_seconds", "Latency of Sheets API calls", tab=tab_name):
+        return fn(ws)
+
+
 # -------------------------------------------------
 # Catalogue helpers
 # -------------------------------------------------
 
-def _generate_unique_id(existing_ids: set[str]) -> str:
+def _generate_unique_ids(count: int, existing_ids: set) -> List[str]:
     """
-    Generates an 8-char hex string that does not collide with existing_ids.
+    count distinct 8-char hex IDs that don't collide with existing_ids.
+    Drawn in one batch; only collisions (rare) are drawn again.
     """
-    while True:
-        new_id = uuid.uuid4().hex[:8]
-        if new_id not in existing_ids:
-            return new_id
+    ids: List[str] = []
+    taken = set(existing_ids)
+    while len(ids) < count:
+        need  = count - len(ids)
+        draws = np.frombuffer(os.urandom(4 * need), dtype=">u4")
+        for new_id in np.char.zfill(np.char.mod("%x", draws), 8).tolist():
+            if new_id not in taken:
+                taken.add(new_id)
+                ids.append(new_id)
+    return ids
+
 
+def _contiguous_blocks(sheet_rows: List[int]) -> List[Tuple[int, int]]:
+    """[2, 3, 4, 9, 10] → [(2, 4), (9, 10)] (rows must be sorted)."""
+    blocks: List[Tuple[int, int]] = []
+    for row in sheet_rows:
+        if blocks and row == blocks[-1][1] + 1:
+            blocks[-1] = (blocks[-1][0], row)
+        else:
+            blocks.append((row, row))
+    return blocks
+
+
+def _backfill_sku_ids(df: pd.DataFrame, sheet_title: str, tab_name: str) -> pd.DataFrame:
+    """
+    Assigns IDs to rows with a blank SKU_ID and writes them back with one
+    batch_update (one range per contiguous block of rows).
+    """
+    ids   = df["SKU_ID"].astype(str).str.strip()
+    blank = (ids.eq("") | df["SKU_ID"].isna()).to_numpy()
+    if not blank.any():
+        return df
 
+    new_ids = _generate_unique_ids(int(blank.sum()), set(ids[~blank]))
+    df = df.copy()
+    df.loc[blank, "SKU_ID"] = new_ids
+
+    # DataFrame row i is sheet row i + 2 (header is row 1)
+    sheet_rows = (np.flatnonzero(blank) + 2).tolist()
+    id_by_row  = dict(zip(sheet_rows, new_ids))
+    id_col     = list(df.columns).index("SKU_ID") + 1
+    letter     = rowcol_to_a1(1, id_col).rstrip("0123456789")
+    data = [{"range": f"{letter}{first}:{letter}{last}",
+             "values": [[id_by_row[r]] for r in range(first, last + 1)]}
+            for first, last in _contiguous_blocks(sheet_rows)]
+
+    logger.info("📝 Writing %s new SKU_IDs back to sheet in %s block(s)", len(new_ids), len(data))
+    with_worksheet(sheet_title, tab_name,
+                   lambda ws: ws.batch_update(data, value_input_option="RAW"))
+    return df
+
+
+@metrics.timed("sheets_op_seconds", "Latency of sheets.py helpers", op="load_catalogue_df")
 def load_catalogue_df() -> pd.DataFrame:
     """
     Reads the Catalogue tab into a DataFrame.
@@ -129,43 +359,204 @@ def load_catalogue_df() -> pd.DataFrame:
     """
     sheet_title = current_app.config["GOOGLE_SHEET_TITLE"]
     tab_name    = current_app.config["CATALOGUE_TAB"]
-    logger.info(f"📊 Loading catalogue from sheet: {sheet_title}, tab: {tab_name}")
+    logger.info("📊 Loading catalogue from sheet: %s, tab: %s", sheet_title, tab_name)
     
-    ws = get_worksheet(sheet_title, tab_name)
-    df = pd.DataFrame(ws.get_all_records())
-    logger.info(f"✅ Loaded {len(df)} catalogue records")
+    df = pd.DataFrame(with_worksheet(sheet_title, tab_name, lambda w: w.get_all_records()))
+    logger.info("✅ Loaded %s catalogue records", len(df))
 
     if "SKU_ID" not in df.columns:
         error_msg = "Catalogue sheet must have a SKU_ID column"
-        logger.error(f"❌ {error_msg}")
+        logger.error("❌ %s", error_msg)
         raise ValueError(error_msg)
 
-    # Back-fill missing IDs
-    ids_seen = set(df["SKU_ID"].dropna().astype(str))
-    updated_rows: List[int] = []
-
-    for idx, row in df.iterrows():
-        if not row["SKU_ID"]:
-            new_id = _generate_unique_id(ids_seen)
-            ids_seen.add(new_id)
-            df.at[idx, "SKU_ID"] = new_id
-            updated_rows.append(idx + 2)   # +2 -> sheet row number (header + 1)
-
-    # Write back any new IDs
-    if updated_rows:
-        logger.info(f"📝 Writing {len(updated_rows)} new SKU_IDs back to sheet")
-        for sheet_row in updated_rows:
-            ws.update_cell(sheet_row, 1, df.at[sheet_row - 2, "SKU_ID"])
-        # tiny pause so Google API doesn't rate-limit
-        time.sleep(1)
-
-    return df
+    return _backfill_sku_ids(df, sheet_title, tab_name)
 
 
 # -------------------------------------------------
 # Order-logging helpers
 # -------------------------------------------------
+# With write-behind enabled (see start_write_behind) the public helpers
+# below only queue the write; the sheet_writer thread applies them in
+# batches through _apply_write_batch().
+
+_ORDER_COLUMNS = {"Timestamp", "Phone", "Query", "SKU_ID", "Qty", "Status"}
+_LOG_HEADERS   = ["Timestamp", "Phone", "Message"]
+
+_writer: Optional[SheetWriter] = None
+
+
+def start_write_behind(app) -> SheetWriter:
+    """
+    Starts the background writer for Orders_Status / Orders_Log writes.
+    Call once per process (after forking, when running under gunicorn).
+    """
+    global _writer
+    if _writer is None:
+        _writer = SheetWriter(
+            app,
+            _apply_write_batch,
+            flush_interval_ms = app.config["SHEETS_FLUSH_INTERVAL_MS"],
+            max_batch_rows    = app.config["SHEETS_FLUSH_MAX_ROWS"],
+            queue_size        = app.config["SHEETS_QUEUE_SIZE"],
+            spool_dir         = app.config["SHEETS_SPOOL_DIR"],
+            # Status updates land after the appends they refer to, and
+            # ahead of message logs, which can wait out a quota squeeze
+            last_kinds        = ("status", "log"),
+            max_attempts      = app.config["SHEETS_WRITE_MAX_ATTEMPTS"],
+            retryable         = _retryable_write_error,
+        ).start()
+        metrics.gauge("sheets_write_queue_depth", "Sheets writes waiting in the write-behind queue",
+                      lambda: _writer.depth if _writer is not None else 0)
+        logger.info("✅ Sheets write-behind queue started")
+    return _writer
+
+
+def _retryable_write_error(exc: Exception) -> bool:
+    """
+    A missing column (ValueError) or a 4xx other than 429 comes back the
+    same every time; network errors, 429 and 5xx are worth another try.
+    """
+    if isinstance(exc, ValueError):
+        return False
+    status = _status_code(exc)
+    return status is None or status == 429 or status >= 500
+
+
+def get_writer() -> Optional[SheetWriter]:
+    return _writer
 
+
+@metrics.timed("sheets_op_seconds", "Latency of sheets.py helpers", op="apply_write_batch")
+def _apply_write_batch(kind: str, ops: List[Dict[str, Any]]):
+    if kind == "order":
+        _append_order_rows([op["row"] for op in ops])
+    elif kind == "log":
+        _append_log_rows([op["row"] for op in ops])
+    elif kind == "status":
+        for op in ops:
+            _update_status_now(op["phone"], op["sku_id"], op["status"])
+    else:
+        logger.error("❌ Unknown Sheets write kind: %s", kind)
+
+
+@metrics.timed("sheets_op_seconds", "Latency of sheets.py helpers", op="append_order_rows")
+def _append_order_rows(row_dicts: List[Dict[str, Any]]):
+    sheet_title = current_app.config["GOOGLE_SHEET_TITLE"]
+    tab_name    = current_app.config["ORDERS_TAB"]
+
+    # Verify headers exist and match expected format
+    header = get_header(sheet_title, tab_name, priority=PRIORITY_ORDER)
+    logger.info("📋 Sheet headers: %s", header)
+
+    # Check if we have all required columns
+    missing_columns = _ORDER_COLUMNS - set(header)
+    if missing_columns:
+        error_msg = f"Missing required columns in Orders sheet: {missing_columns}"
+        logger.error("❌ %s", error_msg)
+        raise ValueError(error_msg)
+
+    rows = [[row_dict.get(col, "") for col in header] for row_dict in row_dicts]
+    logger.info("🔄 Prepared %s row(s): %s", len(rows), rows)
+
+    # One values.append for the whole batch
+    result = with_worksheet(sheet_title, tab_name,
+                            lambda ws: ws.append_rows(rows, value_input_option="USER_ENTERED"),
+                            priority=PRIORITY_ORDER, idempotent=False)
+    logger.info("✅ %s order row(s) successfully appended!", len(rows))
+
+    # Keep the (phone, SKU_ID) → row index current without re-reading the tab
+    updated = rows_from_updated_range(((result or {}).get("updates") or {}).get("updatedRange", ""))
+    if updated:
+        _get_order_index(sheet_title, tab_name).add_rows(
+            updated[0],
+            [(str(r.get("Phone", "")), str(r.get("SKU_ID", ""))) for r in row_dicts],
+        )
+
+
+@metrics.timed("sheets_op_seconds", "Latency of sheets.py helpers", op="append_log_rows")
+def _append_log_rows(rows: List[List[Any]], timeout: Optional[float] = None):
+    sheet_title = current_app.config["GOOGLE_SHEET_TITLE"]
+    tab_name    = current_app.config["ORDERS_LOG_TAB"]
+
+    # Tab is created (with headers) on first use if it doesn't exist
+    with_worksheet(sheet_title, tab_name,
+                   lambda ws: ws.append_rows(rows, value_input_option="USER_ENTERED"),
+                   create_headers=_LOG_HEADERS, priority=PRIORITY_LOG, timeout=timeout,
+                   idempotent=False)
+    logger.info("[OK] %s message(s) logged successfully!", len(rows))
+
+
+def _get_order_index(sheet_title: str, tab_name: str) -> OrderIndex:
+    key = (sheet_title, tab_name)
+    with _cache_lock:
+        index = _order_indexes.get(key)
+        if index is None:
+            index = OrderIndex(current_app.config["ORDERS_INDEX_RECONCILE_SECONDS"])
+            _order_indexes[key] = index
+        return index
+
+
+def _order_columns(sheet_title: str, tab_name: str) -> Tuple[int, int, int]:
+    """
+    1-based (phone, SKU_ID, Status) columns, read from the cached header.
+    """
+    header = get_header(sheet_title, tab_name, priority=PRIORITY_STATUS)
+
+    def col(name, default):
+        return header.index(name) + 1 if name in header else default
+
+    return col("Phone", 2), col("SKU_ID", 4), col("Status", 6)
+
+
+@metrics.timed("sheets_op_seconds", "Latency of sheets.py helpers", op="reconcile_order_index")
+def _reconcile_order_index(sheet_title: str, tab_name: str, index: OrderIndex):
+    """
+    Reads only the Phone..SKU_ID columns of rows not indexed yet.
+    """
+    phone_col, sku_col, _ = _order_columns(sheet_title, tab_name)
+    first_col, last_col = min(phone_col, sku_col), max(phone_col, sku_col)
+    end_letter = rowcol_to_a1(1, last_col).rstrip("0123456789")
+
+    def read_from(start_row: int):
+        a1 = f"{rowcol_to_a1(start_row, first_col)}:{end_letter}"
+        values = with_worksheet(sheet_title, tab_name, lambda ws: ws.get(a1), priority=PRIORITY_STATUS)
+        width = last_col - first_col + 1
+        pairs = []
+        for row in values:
+            row = list(row) + [""] * (width - len(row))
+            pairs.append((str(row[phone_col - first_col]), str(row[sku_col - first_col])))
+        return pairs
+
+    read = index.reconcile(read_from)
+    logger.info("🔎 Order index reconciled: %s new row(s), %s keys", read, len(index))
+
+
+@metrics.timed("sheets_op_seconds", "Latency of sheets.py helpers", op="update_status_now")
+def _update_status_now(customer_phone: str, sku_id: str, new_status: str):
+    sheet_title = current_app.config["GOOGLE_SHEET_TITLE"]
+    tab_name    = current_app.config["ORDERS_TAB"]
+    index       = _get_order_index(sheet_title, tab_name)
+
+    if index.reconcile_due():
+        _reconcile_order_index(sheet_title, tab_name, index)
+
+    row = index.lookup(customer_phone, sku_id)
+    if row is None:
+        # Might have been appended by another worker since the last read
+        _reconcile_order_index(sheet_title, tab_name, index)
+        row = index.lookup(customer_phone, sku_id)
+
+    if row is None:
+        logger.warning("⚠️ No matching order found to update status")
+        return
+
+    _, _, status_col = _order_columns(sheet_title, tab_name)
+    with_worksheet(sheet_title, tab_name,
+                   lambda ws: ws.update_cell(row, status_col, new_status), priority=PRIORITY_STATUS)
+    logger.info("✅ Status successfully updated!")
+
+
+@metrics.timed("sheets_op_seconds", "Latency of sheets.py helpers", op="append_order")
 def append_order(row_dict: Dict[str, Any]):
     """
     Appends a new order row into Orders_Status tab.
@@ -174,61 +565,77 @@ def append_order(row_dict: Dict[str, Any]):
     try:
         sheet_title = current_app.config["GOOGLE_SHEET_TITLE"]
         tab_name    = current_app.config["ORDERS_TAB"]
-        logger.info(f"📝 Attempting to append order to sheet: {sheet_title}, tab: {tab_name}")
-        logger.info(f"📦 Order data: {row_dict}")
-        
-        ws = get_worksheet(sheet_title, tab_name)
-        
-        # Verify headers exist and match expected format
-        header = ws.row_values(1)
-        logger.info(f"📋 Sheet headers: {header}")
-        
-        # Check if we have all required columns
-        required_columns = {"Timestamp", "Phone", "Query", "SKU_ID", "Qty", "Status"}
-        missing_columns = required_columns - set(header)
-        if missing_columns:
-            error_msg = f"Missing required columns in Orders sheet: {missing_columns}"
-            logger.error(f"❌ {error_msg}")
-            raise ValueError(error_msg)
-        
-        row = [row_dict.get(col, "") for col in header]
-        logger.info(f"🔄 Prepared row: {row}")
-        
-        ws.append_row(row, value_input_option="USER_ENTERED")
-        logger.info("✅ Order successfully appended!")
+        logger.info("📝 Attempting to append order to sheet: %s, tab: %s", sheet_title, tab_name)
+        logger.info("📦 Order data: %s", row_dict)
+
+        if _writer is not None:
+            _writer.submit("order", row=row_dict)
+            logger.info("✅ Order queued for write-behind")
+            return
+
+        _append_order_rows([row_dict])
+    except Exception as e:
+        logger.error("❌ Failed to append order: %s", e)
+        raise
+
+
+@metrics.timed("sheets_op_seconds", "Latency of sheets.py helpers", op="append_orders")
+def append_orders(row_dicts: List[Dict[str, Any]]):
+    """
+    Appends the rows of a multi-item draft order in one write (queued
+    together when write-behind is on, so they land in the same batch).
+    """
+    try:
+        logger.info("📝 Attempting to append %s order rows", len(row_dicts))
+        if _writer is not None:
+            for row_dict in row_dicts:
+                _writer.submit("order", row=row_dict)
+            logger.info("✅ %s order rows queued for write-behind", len(row_dicts))
+            return
+
+        _append_order_rows(row_dicts)
     except Exception as e:
-        logger.error(f"❌ Failed to append order: {str(e)}")
+        logger.error("❌ Failed to append orders: %s", e)
         raise
 
 
+@metrics.timed("sheets_op_seconds", "Latency of sheets.py helpers", op="update_status")
 def update_status(customer_phone: str, sku_id: str, new_status: str):
     """
     Finds the first row that matches customer_phone & sku_id, updates Status col.
     """
     try:
-        sheet_title = current_app.config["GOOGLE_SHEET_TITLE"]
-        tab_name    = current_app.config["ORDERS_TAB"]
-        logger.info(f"🔄 Updating status for phone: {customer_phone}, SKU: {sku_id} to {new_status}")
-        
-        ws = get_worksheet(sheet_title, tab_name)
-
-        phone_col   = 2  # adjust if your header differs
-        sku_col     = 4  # SKU_ID column in Orders sheet
-        status_col  = 6  # Status column
-
-        # Quick scan (could cache later)
-        data = ws.get_all_values()
-        for r, row in enumerate(data[1:], start=2):   # skip header
-            if row[phone_col - 1] == customer_phone and row[sku_col - 1] == sku_id:
-                ws.update_cell(r, status_col, new_status)
-                logger.info("✅ Status successfully updated!")
-                return
-        logger.warning("⚠️ No matching order found to update status")
+        logger.info("🔄 Updating status for phone: %s, SKU: %s to %s", customer_phone, sku_id, new_status)
+
+        if _writer is not None:
+            # Queued behind any pending append of the same order
+            _writer.submit("status", phone=customer_phone, sku_id=sku_id, status=new_status)
+            logger.info("✅ Status update queued for write-behind")
+            return
+
+        _update_status_now(customer_phone, sku_id, new_status)
     except Exception as e:
-        logger.error(f"❌ Failed to update status: {str(e)}")
+        logger.error("❌ Failed to update status: %s", e)
         raise
 
 
+def update_statuses(customer_phone: str, sku_ids: List[str], new_status: str):
+    """
+    update_status() for every SKU of a (multi-item) draft order. Every SKU
+    is attempted, so one failed row doesn't leave the rest unconfirmed; the
+    first error is raised once all have been tried.
+    """
+    error = None
+    for sku_id in sku_ids:
+        try:
+            update_status(customer_phone, sku_id, new_status)
+        except Exception as e:
+            error = error or e
+    if error is not None:
+        raise error
+
+
+@metrics.timed("sheets_op_seconds", "Latency of sheets.py helpers", op="log_message")
 def log_message(phone: str, message: str):
     """
     Logs a raw message to Orders_Log tab with timestamp and phone number.
@@ -237,22 +644,7 @@ def log_message(phone: str, message: str):
     try:
         sheet_title = current_app.config["GOOGLE_SHEET_TITLE"]
         tab_name = current_app.config["ORDERS_LOG_TAB"]
-        logger.info(f"[LOG] Logging raw message to sheet: {sheet_title}, tab: {tab_name}")
-        
-        # Get spreadsheet
-        client = _authorize()
-        spreadsheet = client.open(sheet_title)
-        
-        # Try to get worksheet, create if doesn't exist
-        try:
-            ws = spreadsheet.worksheet(tab_name)
-            logger.info(f"[OK] Found existing tab: {tab_name}")
-        except Exception:
-            logger.info(f"[LOG] Creating new tab: {tab_name}")
-            ws = spreadsheet.add_worksheet(title=tab_name, rows=1000, cols=3)
-            # Add headers
-            ws.append_row(["Timestamp", "Phone", "Message"], value_input_option="USER_ENTERED")
-            logger.info("[OK] Created new tab with headers")
+        logger.info("[LOG] Logging raw message to sheet: %s, tab: %s", sheet_title, tab_name)
         
         # Prepare row data
         row = [
@@ -260,9 +652,38 @@ def log_message(phone: str, message: str):
             phone,                       # Phone
             message                      # Message
         ]
-        
-        ws.append_row(row, value_input_option="USER_ENTERED")
-        logger.info("[OK] Message logged successfully!")
+
+        if _writer is not None:
+            _writer.submit("log", row=row)
+            return
+
+        _log_now(row)
     except Exception as e:
-        logger.error(f"[ERROR] Failed to log message: {str(e)}")
-        # Don't raise the error - logging failure shouldn't break the main flow
+        logger.error("[ERROR] Failed to log message: %s", e)
+
+
+# Log rows whose synchronous write failed (no quota in time, Sheets down);
+# they go out with the next log write instead of being lost (or, if the
+# failed write landed after all, twice).
+_unlogged: deque = deque()
+_unlogged_lock = threading.Lock()
+
+
+def _log_now(row: List[Any]):
+    limit = current_app.config.get("SHEETS_UNLOGGED_MAX_ROWS", 1000)
+    with _unlogged_lock:
+        rows = list(_unlogged) + [row]
+        _unlogged.clear()
+    try:
+        _append_log_rows(rows, timeout=current_app.config.get("SHEETS_LOG_WAIT_SECONDS"))
+    except Exception:
+        with _unlogged_lock:
+            _unlogged.extendleft(reversed(rows))
+            dropped = len(_unlogged) - limit
+            for _ in range(max(0, dropped)):
+                logger.error("[ERROR] Dropping unlogged message row: %s", _unlogged.popleft())
+            if dropped > 0:
+                metrics.counter("sheets_log_rows_dropped_total",
+                                "Message-log rows dropped after failed writes").inc(dropped)
+        logger.warning("⚠️ %s message row(s) kept for the next log write", len(rows))
+        raise
@@ -0,0 +1,171 @@
+"""
+Rate-limited scheduler for Google Sheets API calls
+———————————
+Every call made through sheets.with_worksheet() passes through here:
+• A token bucket meters calls to SHEETS_REQUESTS_PER_MINUTE (with bursts
+  up to SHEETS_BURST), so a spike queues up locally instead of tripping
+  Google's per-minute quota.
+• Callers waiting for a token are served by priority, then arrival:
+  status updates → order appends → catalogue / index reads → message logs.
+• 429 and 5xx answers are retried with jittered exponential backoff
+  (Retry-After is honoured when Google sends it). Calls that aren't
+  idempotent (appends) are only retried here on 429; a 5xx is raised to
+  the caller. This doesn't make appends exactly-once: the write-behind
+  writer and the message log re-send a failed append later, so a 5xx that
+  came back after Google committed the rows still duplicates them.
+The quota is per process; with several gunicorn workers give each its
+share of the project quota.
+"""
+
+import heapq
+import random
+import logging
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import gspread
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_STATUS, PRIORITY_ORDER, PRIORITY_CATALOGUE, PRIORITY_LOG = range(4)
+PRIORITY_NAMES = {
+    PRIORITY_STATUS   : "status",
+    PRIORITY_ORDER    : "order",
+    PRIORITY_CATALOGUE: "catalogue",
+    PRIORITY_LOG      : "log",
+}
+
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+_REJECTED_STATUS = {429}          # refused before doing anything: safe to repeat any call
+
+
+class SheetsThrottled(Exception):
+    """No token became available within the caller's timeout."""
+
+
+def _status_code(exc: Exception) -> Optional[int]:
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, capacity: float, clock=time.monotonic):
+        self.rate     = rate_per_second
+        self.capacity = max(1.0, capacity)
+        self.tokens   = self.capacity
+        self._clock   = clock
+        self._last    = clock()
+
+    def take(self) -> float:
+        """Takes a token and returns 0, or returns the seconds until one is due."""
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class SheetsScheduler:
+    def __init__(self, requests_per_minute: float = 60, burst: float = 10, max_retries: int = 5,
+                 backoff_base: float = 1.0, backoff_max: float = 32.0, sleep=time.sleep):
+        self.bucket       = TokenBucket(requests_per_minute / 60.0, burst)
+        self.max_retries  = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max  = backoff_max
+        self._sleep       = sleep
+        self._cond        = threading.Condition()
+        self._waiting     = []                   # heap of (priority, seq)
+        self._seq         = itertools.count()
+
+    # ---------- metering ----------
+
+    def acquire(self, priority: int = PRIORITY_CATALOGUE, timeout: Optional[float] = None):
+        """
+        Blocks until this caller is the most urgent waiter and a token is
+        available. Raises SheetsThrottled after timeout seconds.
+        """
+        started  = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        ticket   = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    wait = None
+                    if self._waiting[0] == ticket:
+                        wait = self.bucket.take()
+                        if wait == 0:
+                            heapq.heappop(self._waiting)
+                            self._cond.notify_all()
+                            break
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise SheetsThrottled(f"no Sheets quota within {timeout}s")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+            except BaseException:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                    self._cond.notify_all()
+                raise
+        metrics.summary("sheets_scheduler_wait_seconds", "Time spent waiting for Sheets quota").observe(
+            time.monotonic() - started, priority=PRIORITY_NAMES.get(priority, priority))
+
+    def depth(self) -> Dict[int, int]:
+        """Waiting callers per priority."""
+        with self._cond:
+            counts: Dict[int, int] = {}
+            for priority, _ in self._waiting:
+                counts[priority] = counts.get(priority, 0) + 1
+        return counts
+
+    # ---------- calls ----------
+
+    def _backoff(self, attempt: int, exc: Exception) -> float:
+        retry_after = _retry_after(exc)
+        if retry_after is not None:
+            return min(self.backoff_max, retry_after)
+        # "full jitter": uniform over [0, base * 2^attempt], capped
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def call(self, fn: Callable[[], Any], priority: int = PRIORITY_CATALOGUE,
+             what: str = "", timeout: Optional[float] = None, idempotent: bool = True) -> Any:
+        """
+        Runs fn() once a token is granted; retries 429 / 5xx answers (only
+        429 unless idempotent) up to max_retries times. timeout only bounds
+        the first wait for quota.
+        """
+        retry_status = _RETRY_STATUS if idempotent else _REJECTED_STATUS
+        attempt = 0
+        while True:
+            self.acquire(priority, timeout if attempt == 0 else None)
+            try:
+                return fn()
+            except gspread.exceptions.APIError as e:
+                status = _status_code(e)
+                if status not in retry_status or attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt, e)
+                attempt += 1
+                metrics.counter("sheets_retries_total", "Sheets calls retried after 429 / 5xx").inc(
+                    status=status, priority=PRIORITY_NAMES.get(priority, priority))
+                logger.warning(
+                    "⏳ Sheets returned %s for %s, retry %s/%s in %.1fs",
+                    status, what or "call", attempt, self.max_retries, delay)
+                self._sleep(delay)
@@ -0,0 +1,100 @@
+"""
+Size index over the catalogue
+———————————
+For every (item type, DimScheme) group the index keeps the distinct sizes
+in mm and the rows that have each size:
+• one-dimension schemes (OD, CS, VOL) – sizes sorted, so the k nearest
+  to a query are found by binary search plus a short walk outwards
+• two-dimension schemes (ODxOD, LxW) – (larger, smaller) pairs; a group
+  has at most a few dozen distinct pairs, scored in one vectorised pass.
+  With the pair sorted, |a - q1| + |b - q2| is the best of both
+  orientations, which is what the search scores.
+nearest() returns the rows of the k nearest sizes of an item type, the
+candidate set the semantic re-rank then runs over.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+class _Group:
+    __slots__ = ('keys', 'order', 'bounds', 'two_dim')
+
+    def __init__(self, keys: np.ndarray, rows: np.ndarray, two_dim: bool):
+        self.two_dim = two_dim
+        self.keys, inverse = np.unique(keys, axis=0 if two_dim else None, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        self.order  = rows[np.argsort(inverse, kind='stable')]
+        self.bounds = np.concatenate([[0], np.cumsum(np.bincount(inverse, minlength=len(self.keys)))])
+
+    def nearest(self, q_mm: List[float], k: int) -> Optional[np.ndarray]:
+        """Rows of the k nearest distinct sizes (ties at the k-th included)."""
+        if self.two_dim:
+            if len(q_mm) < 2:
+                return None
+            hi, lo = max(q_mm[0], q_mm[1]), min(q_mm[0], q_mm[1])
+            first = 0
+            dist = np.abs(self.keys[:, 0] - hi) + np.abs(self.keys[:, 1] - lo)
+        else:
+            # Only sizes within k places either side can be among the k nearest
+            at    = int(np.searchsorted(self.keys, q_mm[0]))
+            first = max(0, at - k)
+            dist  = np.abs(self.keys[first:at + k] - q_mm[0])
+        if len(dist) > k:
+            cutoff = np.partition(dist, k - 1)[k - 1]
+            picked = np.flatnonzero(dist <= cutoff) + first
+        else:
+            picked = np.arange(first, first + len(dist))
+        return np.concatenate([self.order[self.bounds[i]:self.bounds[i + 1]] for i in picked])
+
+    def has_size(self, value: float, tolerance: float) -> bool:
+        """Whether a size (either side of a pair) is within tolerance of value."""
+        keys = self.keys.reshape(-1) if self.two_dim else self.keys
+        return bool(len(keys)) and bool(np.abs(keys - value).min() <= tolerance)
+
+
+class SizeIndex:
+    def __init__(self, type_rows: Dict[str, np.ndarray], scheme_codes: np.ndarray,
+                 dim_a: np.ndarray, dim_b: np.ndarray,
+                 one_dim: Iterable[int], two_dim: Iterable[int]):
+        one_dim, two_dim = set(one_dim), set(two_dim)
+        self.groups: Dict[str, List[_Group]] = {}
+        for item_type, rows in type_rows.items():
+            groups = []
+            codes = scheme_codes[rows]
+            for code in np.unique(codes).tolist():
+                sub = rows[codes == code]
+                if code in one_dim:
+                    groups.append(_Group(dim_a[sub], sub, two_dim=False))
+                elif code in two_dim:
+                    a, b = dim_a[sub], dim_b[sub]
+                    groups.append(_Group(np.stack([np.maximum(a, b), np.minimum(a, b)], axis=1),
+                                         sub, two_dim=True))
+            self.groups[item_type] = groups
+
+    def __len__(self):
+        return sum(len(g.keys) for groups in self.groups.values() for g in groups)
+
+    def nearest(self, item_types: Iterable[str], q_mm: List[float], k: int) -> Optional[np.ndarray]:
+        """
+        Sorted rows of the k nearest sizes per (item type, scheme); None when
+        no group can compare against the query's numbers.
+        """
+        if not q_mm or k <= 0:
+            return None
+        parts = []
+        for item_type in item_types:
+            for group in self.groups.get(item_type, ()):
+                rows = group.nearest(q_mm, k)
+                if rows is not None:
+                    parts.append(rows)
+        if not parts:
+            return None
+        return np.unique(np.concatenate(parts))
+
+    def has_size(self, item_types: Iterable[str], value: float, tolerance: float) -> bool:
+        """Whether any of item_types comes in a size within tolerance of value (mm)."""
+        return any(group.has_size(value, tolerance)
+                   for item_type in item_types for group in self.groups.get(item_type, ()))
+
@@ -0,0 +1,65 @@
+"""
+Item-type matcher for search queries
+———————————
+Finds every catalogue product name ("coupler", "reducer coupler", ...)
+mentioned in a query, plural-aware ("couplers"), in one pass over the
+query's tokens. Names are kept in a token trie, so the cost depends on
+the query length, not on how many product names the catalogue has.
+"""
+
+import re
+from typing import Iterable, List
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_END   = None      # trie key marking "a product name ends here"
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class ItemTypeMatcher:
+    def __init__(self, item_types: Iterable[str]):
+        self._trie: dict = {}
+        self.item_types = set()
+        for item_type in item_types:
+            tokens = tokenize(item_type)
+            if not tokens:
+                continue
+            node = self._trie
+            for tok in tokens:
+                node = node.setdefault(tok, {})
+            node[_END] = item_type
+            self.item_types.add(item_type)
+
+    def __len__(self):
+        return len(self.item_types)
+
+    def match(self, query: str) -> List[str]:
+        """
+        Item types found in query, in order of first appearance. Overlapping
+        names all match ("reducer coupler" also yields "coupler").
+        """
+        tokens = tokenize(query)
+        found: List[str] = []
+        seen = set()
+
+        def hit(item_type):
+            if item_type not in seen:
+                seen.add(item_type)
+                found.append(item_type)
+
+        for start in range(len(tokens)):
+            node = self._trie
+            for tok in tokens[start:]:
+                # Plural of a name's last token: "couplers" → "coupler"
+                if tok.endswith('s'):
+                    singular = node.get(tok[:-1])
+                    if singular is not None and _END in singular:
+                        hit(singular[_END])
+                node = node.get(tok)
+                if node is None:
+                    break
+                if _END in node:
+                    hit(node[_END])
+        return found
@@ -0,0 +1,168 @@
+"""
+Vector indexes over the catalogue embeddings
+———————————
+Candidate retrieval for the semantic stage of enhanced_search(). Rows are
+expected to be L2-normalised, so scores are plain dot products.
+• FlatIndex – exact, scans every row. Fine up to a few thousand SKUs.
+• IVFIndex  – inverted-file index: spherical k-means splits the rows into
+  nlist clusters and a query only scans the nprobe closest ones. More
+  nprobe = better recall, more latency.
+IVF indexes are saved as .npz next to the embedding matrix they were built
+from and reused while that matrix is unchanged.
+"""
+
+import os
+import logging
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_ASSIGN_CHUNK = 8192          # rows per block when assigning to centroids
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k largest scores (unordered)."""
+    if k >= len(scores):
+        return np.arange(len(scores))
+    return np.argpartition(-scores, k - 1)[:k]
+
+
+class FlatIndex:
+    kind = 'flat'
+
+    def __init__(self, embeddings: np.ndarray):
+        self.embeddings = embeddings
+
+    def __len__(self):
+        return self.embeddings.shape[0]
+
+    def search(self, q: np.ndarray, k: int) -> np.ndarray:
+        """Row indices of the (approximately) k best rows, ascending."""
+        return np.sort(_top_k(self.embeddings @ q, k))
+
+
+class IVFIndex:
+    kind = 'ivf'
+
+    def __init__(self, embeddings: np.ndarray, centroids: np.ndarray,
+                 order: np.ndarray, offsets: np.ndarray, nprobe: int = 8):
+        self.embeddings = embeddings
+        self.centroids  = centroids   # (nlist, d), unit length
+        self.order      = order       # row ids grouped by list
+        self.offsets    = offsets     # list i = order[offsets[i]:offsets[i+1]]
+        self.nprobe     = nprobe
+
+    def __len__(self):
+        return self.embeddings.shape[0]
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+
+    # ---------- build ----------
+
+    @staticmethod
+    def _assign(embeddings: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        labels = np.empty(embeddings.shape[0], dtype=np.int32)
+        for start in range(0, embeddings.shape[0], _ASSIGN_CHUNK):
+            block = np.asarray(embeddings[start:start + _ASSIGN_CHUNK])
+            labels[start:start + _ASSIGN_CHUNK] = np.argmax(block @ centroids.T, axis=1)
+        return labels
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, nlist: int = 0, nprobe: int = 8,
+              iterations: int = 10, train_size: int = 64, seed: int = 0) -> "IVFIndex":
+        """
+        Spherical k-means on at most train_size * nlist sampled rows, then
+        every row is assigned to its closest centroid. nlist=0 picks
+        about 4·sqrt(N).
+        """
+        n = embeddings.shape[0]
+        if nlist <= 0:
+            nlist = int(4 * np.sqrt(n))
+        nlist = max(1, min(nlist, n))
+        rng = np.random.default_rng(seed)
+
+        sample_size = min(n, train_size * nlist)
+        sample = np.asarray(embeddings[np.sort(rng.choice(n, sample_size, replace=False))],
+                            dtype=np.float32)
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            labels = cls._assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=nlist)
+            empty = counts == 0
+            if empty.any():
+                # re-seed empty clusters from random sample rows
+                sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        labels  = cls._assign(embeddings, centroids)
+        order   = np.argsort(labels, kind='stable').astype(np.int64)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=nlist))]).astype(np.int64)
+        return cls(embeddings, centroids, order, offsets, nprobe)
+
+    # ---------- query ----------
+
+    def search(self, q: np.ndarray, k: int) -> np.ndarray:
+        nprobe = min(self.nprobe, self.nlist)
+        probe  = _top_k(self.centroids @ q, nprobe)
+        rows   = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in probe])
+        if len(rows) == 0:
+            return rows
+        best = rows[_top_k(self.embeddings[rows] @ q, k)]
+        return np.sort(best)
+
+    # ---------- persistence ----------
+
+    def save(self, path: str):
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, centroids=self.centroids, order=self.order, offsets=self.offsets)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, embeddings: np.ndarray, nprobe: int = 8) -> Optional["IVFIndex"]:
+        try:
+            with np.load(path) as data:
+                index = cls(embeddings, data['centroids'], data['order'], data['offsets'], nprobe)
+        except (OSError, ValueError, KeyError):
+            return None
+        if len(index.order) != embeddings.shape[0]:
+            return None
+        return index
+
+
+def build_index(embeddings: np.ndarray, kind: str = 'auto', min_rows: int = 5000,
+                nlist: int = 0, nprobe: int = 8):
+    """
+    Returns the index to use for embeddings. kind='auto' uses IVF once the
+    catalogue has at least min_rows rows. If embeddings is a memory-mapped
+    file, the IVF index is cached next to it.
+    """
+    n = embeddings.shape[0]
+    if kind == 'auto':
+        kind = 'ivf' if n >= min_rows else 'flat'
+    if kind == 'flat' or n == 0:
+        return FlatIndex(embeddings)
+    if kind != 'ivf':
+        raise ValueError(f"Unknown vector index kind: {kind}")
+
+    base = getattr(embeddings, 'filename', None)
+    path = f"{base}.ivf{nlist}.npz" if base else None
+    if path and os.path.exists(path):
+        index = IVFIndex.load(path, embeddings, nprobe)
+        if index is not None:
+            logger.info("✅ Loaded IVF index (%s lists) from %s", index.nlist, path)
+            return index
+
+    index = IVFIndex.build(embeddings, nlist=nlist, nprobe=nprobe)
+    logger.info("🧭 Built IVF index with %s lists over %s rows", index.nlist, n)
+    if path:
+        index.save(path)
+    return index
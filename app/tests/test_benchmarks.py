@@ -0,0 +1,54 @@
+# tests/test_benchmarks.py
+from app.services import catalogue, sheets
+from app.utils.cache import LRUCache
+from app.utils import conversation_utils, reply_cache
+from benchmarks import replay
+from benchmarks.fakes import FakeSheetsBackend
+from benchmarks.catalogue_gen import COLUMNS, generate_catalogue
+from benchmarks.harness import make_app, read_catalogue
+
+
+def test_replay_runs_against_fake_sheets(monkeypatch):
+    # make_app swaps these module globals; let monkeypatch put them back
+    for module, name in [(sheets, '_authorize'), (catalogue, '_model'),
+                         (catalogue, '_snapshot'), (conversation_utils, '_store')]:
+        monkeypatch.setattr(module, name, getattr(module, name))
+    monkeypatch.setattr(sheets, '_order_indexes', {})
+    monkeypatch.setattr(sheets, '_scheduler', None)
+    monkeypatch.setattr(reply_cache, '_reply_cache', None)
+    monkeypatch.setattr(catalogue, '_query_embedding_cache', LRUCache())
+    monkeypatch.setattr(catalogue, '_result_cache', LRUCache())
+
+    df = read_catalogue()
+    backend = FakeSheetsBackend(df)
+    app = make_app(backend)
+    assert all(backend.tabs['Catalogue'][row][0] for row in range(1, len(df) + 1))   # IDs back-filled
+
+    messages = list(replay.synthetic_conversations(df, conversations=3))
+    result = replay.replay(app, messages)
+    assert result['overall']['n'] == len(messages)
+    assert result['overall']['errors'] == 0
+    assert backend.calls['append_rows'] >= 3
+
+    # error replies are answered 200 too and must still be counted
+    def fail(*args):
+        raise RuntimeError('sheet unavailable')
+    monkeypatch.setattr(sheets, 'update_statuses', fail)
+    phone = 'whatsapp:+919900000099'
+    failing = [{'From': phone, 'Body': body, 'MessageSid': f'SMfail{n}'}
+               for n, body in enumerate(('hi', messages[1]['Body'], 'yes', 'cod'))]
+    assert replay.replay(app, failing)['overall']['errors'] == 1
+    sheets.invalidate(drop_client=True)
+
+
+def test_generated_catalogue_covers_every_scheme():
+    df = generate_catalogue(500, seed=1)
+    assert list(df.columns) == COLUMNS
+    assert df['SKU_ID'].is_unique and df['SKU'].is_unique
+    assert {s.upper() for s in df['DimScheme']} == set(catalogue._SCHEME_CODES)
+    assert generate_catalogue(500, seed=1).equals(df)
+
+    products, texts = catalogue._products_from_df(df)
+    two_dim = [p for p in products if p['scheme'] in ('ODXOD', 'LXW')]
+    assert all(p['dim_b'] > 0 for p in two_dim)
+    assert len(texts) == 500
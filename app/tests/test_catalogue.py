@@ -0,0 +1,287 @@
+# tests/test_catalogue.py
+import numpy as np
+import pandas as pd
+import pytest
+from flask import Flask
+from app.services import catalogue
+from app.services.embedding_store import normalize_rows
+
+
+def _product(sku_id, name, scheme, a, b=0.0, size_text=""):
+    return {
+        'id': sku_id, 'sku': sku_id.upper(), 'name': name, 'brand': 'Prince',
+        'scheme': scheme.upper(), 'size_text': size_text or f"{a:g} mm",
+        'dim_a': a, 'dim_b': b, 'unit': 'mm', 'price_unit': 'PCS', 'price': 10.0,
+    }
+
+
+class _FakeModel:
+    """Bag-of-words embedding over a tiny fixed vocabulary."""
+    VOCAB = ['coupler', 'reducer', 'bend', 'tee', 'pipe', 'valve']
+
+    def encode(self, texts, convert_to_numpy=True):
+        single = isinstance(texts, str)
+        rows = [[t.lower().count(w) + 0.01 for w in self.VOCAB] for t in ([texts] if single else texts)]
+        arr = np.array(rows, dtype=np.float32)
+        return arr[0] if single else arr
+
+
+@pytest.fixture
+def small_catalogue(monkeypatch):
+    products = [
+        _product('c110', 'Coupler', 'OD', 110),
+        _product('c75', 'Coupler', 'OD', 75),
+        _product('r11075', 'Reducer Coupler', 'ODxOD', 110, 75, '110 x 75 mm'),
+        _product('r9063', 'Reducer Coupler', 'ODxOD', 90, 63, '90 x 63 mm'),
+        _product('b110', 'Bend', 'OD', 110),
+    ]
+    model = _FakeModel()
+    texts = [f"{p['brand']} {p['name']} {p['size_text']}" for p in products]
+    monkeypatch.setattr(catalogue, '_model', model)
+    monkeypatch.setattr(catalogue, '_snapshot', catalogue.CatalogueSnapshot(
+        products, texts, normalize_rows(model.encode(texts)), version=1))
+    catalogue._query_embedding_cache.clear()
+    catalogue._result_cache.clear()
+    return products
+
+
+def test_vectorised_distance_matches_per_product(small_catalogue):
+    for query in ['110', '110 x 75', '63 x 90', '4 inch', 'coupler']:
+        nums, unit = catalogue._parse_query_dims(query)
+        snap = catalogue._snapshot
+        vec = catalogue._distances(snap.scheme_codes, snap.dim_a, snap.dim_b, nums, unit)
+        one = [catalogue._scheme_distance(p, nums, unit) for p in small_catalogue]
+        assert np.allclose(vec, one)
+
+
+def test_two_dimension_schemes_are_scored(small_catalogue):
+    nums, unit = catalogue._parse_query_dims('75 x 110')
+    assert catalogue._scheme_distance(small_catalogue[2], nums, unit) == 0
+
+
+def test_enhanced_search_ranks_by_type_and_size(small_catalogue):
+    assert [p['id'] for p in catalogue.enhanced_search('2 coupler 75 mm', top_n=2)] == ['c75', 'c110']
+    assert catalogue.enhanced_search('110 x 75 reducer', top_n=1)[0]['id'] == 'r11075'
+    assert len(catalogue.enhanced_search('something 110', top_n=10)) == len(small_catalogue)
+
+
+def test_item_type_matcher_handles_plurals_and_overlaps():
+    from app.services.type_matcher import ItemTypeMatcher
+    matcher = ItemTypeMatcher(['coupler', 'reducer coupler', 'bend_87.5°', 'tee'])
+    assert matcher.match('2 couplers 110') == ['coupler']
+    assert sorted(matcher.match('reducer coupler 110 x 75')) == ['coupler', 'reducer coupler']
+    assert matcher.match('bend_87.5° 110 mm') == ['bend_87.5°']
+    assert matcher.match('coupler110') == []
+    assert matcher.match('teeth') == []
+
+
+def test_type_rows_index(small_catalogue):
+    assert catalogue._snapshot.type_rows['reducer coupler'].tolist() == [2, 3]
+    assert [p['id'] for p in catalogue.enhanced_search('bends', top_n=3)] == ['b110']
+
+
+def test_repeated_queries_skip_the_model(small_catalogue, monkeypatch):
+    calls = []
+    model = catalogue._model
+    monkeypatch.setattr(model, 'encode', lambda t, **kw: calls.append(t) or _FakeModel.encode(model, t))
+
+    first = catalogue.enhanced_search('2 Coupler  75 mm', top_n=2)
+    again = catalogue.enhanced_search('2 coupler 75 mm', top_n=2)
+    other_n = catalogue.enhanced_search('2 coupler 75 mm', top_n=1)
+    assert again == first and other_n == first[:1]
+    assert calls == [['2 coupler 75 mm']]
+    stats = catalogue.search_cache_stats()
+    assert stats['results']['hits'] == 1
+    assert stats['query_embedding']['hits'] == 1
+
+
+def test_batch_search_matches_single_searches_with_one_encode(small_catalogue, monkeypatch):
+    queries = ['bend 110mm', 'coupler 75', '110 x 75 reducer', 'coupler 75']
+    expected = [catalogue.enhanced_search(q, top_n=2) for q in queries]
+    catalogue._query_embedding_cache.clear()
+    catalogue._result_cache.clear()
+
+    calls = []
+    model = catalogue._model
+    monkeypatch.setattr(model, 'encode', lambda t, **kw: calls.append(t) or _FakeModel.encode(model, t))
+    assert catalogue.batch_search(queries, top_n=2) == expected
+    assert calls == [sorted(set(queries))]           # one model call for every item
+
+
+def test_size_index_narrows_typed_queries_to_nearest_sizes(small_catalogue):
+    snap = catalogue._snapshot
+    index = snap.size_index
+    rows = lambda types, q_mm, k: [snap.products[i]['id'] for i in index.nearest(types, q_mm, k)]
+    assert rows(['coupler'], [100], 1) == ['c110']
+    assert rows(['coupler'], [100], 2) == ['c110', 'c75']
+    # two-dimension sizes match in either orientation
+    assert rows(['reducer coupler'], [75, 110], 1) == ['r11075']
+    # a single number can't be compared with a two-dimension size
+    assert index.nearest(['reducer coupler'], [110], 1) is None
+
+    snap.size_nearest = 1
+    assert [p['id'] for p in catalogue.enhanced_search('coupler 100', top_n=5)] == ['c110']
+
+
+@pytest.mark.parametrize('precision, tol', [('float16', 1e-3), ('int8', 2e-2)])
+def test_quantized_matrix_scores_close_to_float32(precision, tol):
+    from app.services.quantization import quantize
+    rng = np.random.default_rng(0)
+    matrix = normalize_rows(rng.standard_normal((300, 32)))
+    q = normalize_rows(rng.standard_normal((32, 4)).T).T
+    scoring = quantize(matrix, precision)
+    assert scoring.nbytes < matrix.nbytes / (1.9 if precision == 'float16' else 3.5)
+    assert np.abs(scoring @ q - matrix @ q).max() < tol
+    assert np.abs(scoring @ q[:, 0] - matrix @ q[:, 0]).max() < tol
+    assert np.allclose(scoring[[3, 7]], matrix[[3, 7]], atol=tol)
+    assert quantize(matrix, 'float32') is matrix
+
+
+def test_int8_scoring_with_exact_rerank_matches_float32(small_catalogue):
+    from app.services.quantization import quantize
+    snap = catalogue._snapshot
+    queries = ['coupler 75', '110 x 75 reducer', 'something 110', 'bend']
+    expected = [[p['id'] for p in catalogue.enhanced_search(q, top_n=3)] for q in queries]
+
+    catalogue._result_cache.clear()
+    snap.scoring, snap.rerank = quantize(snap.embeddings, 'int8'), 3
+    assert [[p['id'] for p in catalogue.enhanced_search(q, top_n=3)] for q in queries] == expected
+    catalogue._result_cache.clear()
+    assert [[p['id'] for p in r] for r in catalogue.batch_search(queries, top_n=3)] == expected
+
+
+def test_quantities_are_not_read_as_sizes():
+    assert catalogue._query_dims_mm('2 coupler 110') == (110.0,)
+    assert catalogue._query_dims_mm('need 5 pcs reducer 110 x 75') == (110.0, 75.0)
+    assert catalogue._query_dims_mm('4 inch bend') == (101.6,)
+    # a lone leading number is the size
+    assert catalogue._query_dims_mm('110 coupler') == (110.0,)
+    assert catalogue._query_dims_mm('75 tee') == (75.0,)
+    assert catalogue._query_dims_mm('20 ball valve') == (20.0,)
+    assert catalogue._query_dims_mm('4x elbow 20') == (20.0,)
+    assert catalogue._query_dims_mm('3 pcs tee') == ()
+
+
+def test_split_order_items():
+    from app.utils.conversation_utils import MessageParser
+    assert MessageParser.split_order_items('2 bend 110mm, 5 coupler 110, 1 ball valve 25') == [
+        ('2', 'bend 110mm'), ('5', 'coupler 110'), ('1', 'ball valve 25')]
+    assert MessageParser.split_order_items('3 pcs tee 75 and 4x elbow 20') == [('3', 'tee 75'), ('4', 'elbow 20')]
+    # sizes are not quantities
+    assert MessageParser.split_order_items('110 mm coupler') == [('-1', '110 mm coupler')]
+    assert MessageParser.split_order_items('8 x 4 ft plywood') == [('-1', '8 x 4 ft plywood')]
+    # separators inside one item don't make an order
+    assert MessageParser.split_order_items('prince coupler, 110mm') == [('-1', 'prince coupler, 110mm')]
+    assert MessageParser.split_order_items('ball valve 1/2 & 3/4') == [('-1', 'ball valve 1/2 & 3/4')]
+    assert MessageParser.split_order_items('2 tee 75, prince coupler, 110mm') == [('2', 'tee 75, prince coupler, 110mm')]
+    # ...unless each segment names an item type
+    types = lambda text: [t for t in ('coupler', 'tee') if t in text]
+    assert MessageParser.split_order_items('coupler 110 and tee 75', types) == [('-1', 'coupler 110'), ('-1', 'tee 75')]
+    assert MessageParser.split_order_items('2 tee 75, prince coupler, 110mm', types) == [
+        ('2', 'tee 75'), ('-1', 'prince coupler 110mm')]
+
+
+def test_bare_leading_number_is_a_size_only_if_the_item_comes_in_it(small_catalogue):
+    snap = catalogue._snapshot
+    sizes = lambda q: catalogue._query_sizes(snap, q, snap.type_matcher.match(q))
+    assert sizes('110 coupler') == (110.0,)
+    assert sizes('2 bend') == ()                      # no 2 mm bend: a quantity
+    assert sizes('5 coupler 110') == (110.0,)
+    assert sizes('2 something') == (2.0,)             # no item type to compare with
+
+    snap.size_nearest = 1
+    assert [p['id'] for p in catalogue.enhanced_search('5 coupler 110', top_n=1)] == ['c110']
+    # every coupler stays a candidate instead of the nearest to 2 mm only
+    assert {p['id'] for p in catalogue.enhanced_search('2 coupler', top_n=5)} == {'c110', 'c75'}
+
+
+def test_lru_cache_evicts_and_expires(monkeypatch):
+    from app.utils.cache import LRUCache
+    cache = LRUCache(maxsize=2, ttl=10)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert cache.get('b') is None and cache.get('a') == 1
+
+    now = [1000.0]
+    monkeypatch.setattr('app.utils.cache.time.monotonic', lambda: now[0])
+    cache.put('d', 4)
+    now[0] += 11
+    assert cache.get('d') is None
+
+
+def _sheet_rows(products):
+    return pd.DataFrame([{
+        'SKU_ID': p['id'], 'SKU': p['sku'], 'ProductName': p['name'], 'Brand': p['brand'],
+        'DimScheme': p['scheme'], 'SizeText': p['size_text'], 'DimA': p['dim_a'], 'DimB': p['dim_b'],
+        'DimUnit': p['unit'], 'PriceUnit': p['price_unit'], 'SellingPrice': p['price'],
+    } for p in products])
+
+
+def test_reload_swaps_only_on_changes_and_reembeds_changed_rows(small_catalogue, monkeypatch):
+    rows = [dict(p) for p in small_catalogue]
+    monkeypatch.setattr(catalogue.catalogue_source.sheets, 'load_catalogue_df', lambda: _sheet_rows(rows))
+    encoded = []
+    model = catalogue._model
+    monkeypatch.setattr(model, 'encode', lambda t, **kw: encoded.extend(t) or _FakeModel.encode(model, t))
+
+    app = Flask(__name__)
+    app.config.update(EMBEDDING_CACHE_DIR='', VECTOR_INDEX='flat', VECTOR_INDEX_MIN_ROWS=0,
+                      IVF_NLIST=0, IVF_NPROBE=1, SEARCH_CACHE_SIZE=16, SEARCH_CACHE_TTL_SECONDS=0)
+    with app.app_context():
+        before = catalogue._snapshot
+        assert catalogue.reload_catalogue()['swapped'] is False
+        assert catalogue._snapshot is before
+
+        rows[0]['price'] = 12.5                                   # price only: no re-embed
+        rows.append(_product('t110', 'Tee', 'OD', 110))           # new row: one encode
+        summary = catalogue.reload_catalogue()
+
+    assert summary['swapped'] and summary['changed'] == 1 and summary['added'] == 1
+    assert encoded == ['Prince Tee 110 mm']
+    assert catalogue._snapshot.version == before.version + 1
+    assert catalogue._snapshot.by_id['c110']['price'] == 12.5
+    assert np.array_equal(catalogue._snapshot.embeddings[:5], before.embeddings)
+
+
+def test_reload_announced_by_another_worker_is_followed(small_catalogue, monkeypatch, tmp_path):
+    import os
+    import threading
+    reloaded = threading.Event()
+    monkeypatch.setattr(catalogue, 'reload_catalogue', lambda: reloaded.set())
+    for name in ('_stamp_app', '_stamp_path', '_stamp_seen', '_stamp_checked'):
+        monkeypatch.setattr(catalogue, name, getattr(catalogue, name))
+
+    stamp = str(tmp_path / 'catalogue.reload')
+    app = Flask(__name__)
+    app.config.update(CATALOGUE_RELOAD_STAMP_PATH=stamp)
+    catalogue.watch_reload_stamp(app)
+    catalogue.enhanced_search('coupler 75')
+    assert not reloaded.is_set()
+
+    with open(stamp, 'a'):                 # another worker's announce_reload()
+        pass
+    os.utime(stamp, ns=(1, 10 ** 9))
+    catalogue._stamp_checked = 0.0
+    catalogue.enhanced_search('coupler 110')
+    assert reloaded.wait(5)
+
+
+def test_concurrent_first_searches_load_the_catalogue_once(small_catalogue, monkeypatch):
+    import threading
+    import time
+    loads = []
+    snap = catalogue._snapshot
+    monkeypatch.setattr(catalogue, '_snapshot', catalogue.CatalogueSnapshot([], [], np.zeros((0, 0))))
+
+    def load():
+        loads.append(1)
+        time.sleep(0.1)
+        catalogue._snapshot = snap
+    monkeypatch.setattr(catalogue, 'load_catalogue', load)
+
+    threads = [threading.Thread(target=catalogue.enhanced_search, args=(f'coupler {n}',)) for n in (75, 110, 90)]
+    [t.start() for t in threads]
+    [t.join(5) for t in threads]
+    assert loads == [1]
@@ -0,0 +1,56 @@
+# tests/test_catalogue_source.py
+import pandas as pd
+import pytest
+from flask import Flask
+from app.services import catalogue, catalogue_source
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config.update(CATALOGUE_SOURCE='sheets', CATALOGUE_FILE='master_catalogue.csv',
+                      CATALOGUE_SNAPSHOT_PATH=str(tmp_path / 'catalogue'))
+    with app.app_context():
+        yield app
+
+
+def test_csv_source_gives_stable_ids(app):
+    app.config['CATALOGUE_SOURCE'] = 'csv'
+    first, origin = catalogue_source.load_catalogue_frame()
+    again, _ = catalogue_source.load_catalogue_frame()
+    assert origin == 'csv'
+    assert first['SKU_ID'].str.len().eq(8).all() and first['SKU_ID'].is_unique
+    assert first['SKU_ID'].tolist() == again['SKU_ID'].tolist()
+
+
+def test_sheets_load_writes_snapshot_used_at_startup_and_on_outage(app, monkeypatch):
+    df = catalogue_source.read_csv()
+    monkeypatch.setattr(catalogue_source.sheets, 'load_catalogue_df', lambda: df)
+    assert catalogue_source.load_catalogue_frame()[1] == 'sheets'
+    assert catalogue_source.snapshot_exists()
+
+    def offline():
+        raise ConnectionError('no network')
+    monkeypatch.setattr(catalogue_source.sheets, 'load_catalogue_df', offline)
+    for startup in (True, False):
+        snap, origin = catalogue_source.load_catalogue_frame(startup=startup)
+        assert origin == 'snapshot'
+        assert snap['SKU_ID'].tolist() == df['SKU_ID'].tolist()
+
+
+def test_columnar_loader_matches_row_semantics():
+    df = pd.DataFrame({
+        'SKU_ID': ['a1', 'b2'], 'SKU': ['X', 'Y'], 'ProductName': [' Coupler ', 'Tee'],
+        'Brand': ['Prince', ''], 'DimScheme': ['odxod', 'OD'], 'SizeText': ['110 x 75 mm', ''],
+        'DimA': ['110', ''], 'DimB': [75, None], 'DimUnit': ['mm', 'mm'], 'PriceUnit': ['PCS', 'PCS'],
+        'SellingPrice': ['12.5', 3],
+    })
+    columns, texts = catalogue._columns_from_df(df)
+    assert texts == ['Prince Coupler 110 x 75 mm', 'Tee']
+    assert columns['scheme'].tolist() == ['ODXOD', 'OD']
+    assert columns['dim_a'].tolist() == [110.0, 0.0] and columns['dim_b'].tolist() == [75.0, 0.0]
+    assert columns['price'].tolist() == [12.5, 3.0]
+
+    snap = catalogue.CatalogueSnapshot(catalogue.Catalogue(columns), texts, None)
+    assert snap.scheme_codes.tolist() == [catalogue._SCHEME_ODXOD, catalogue._SCHEME_OD]
+    assert snap.by_id['a1']['name'] == 'Coupler'
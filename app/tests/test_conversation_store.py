@@ -0,0 +1,70 @@
+# tests/test_conversation_store.py
+import pytest
+from app.utils.conversation_store import MemoryConversationStore, SQLiteConversationStore
+from app.utils.conversation_utils import ConversationManager
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryConversationStore(ttl=60, max_entries=2)
+    return SQLiteConversationStore(str(tmp_path / 'conv.sqlite3'), ttl=60, max_entries=2, sweep_interval=0)
+
+
+def test_conversation_manager_round_trip(store):
+    conv = ConversationManager('+911234567890', store=store)
+    assert not conv.has_active_conversation()
+    conv.set_current_sku('abc123ef')
+    assert conv.has_active_conversation()
+    assert ConversationManager('+911234567890', store=store).get_current_sku() == 'abc123ef'
+    conv.clear_state()
+    assert conv.get_current_sku() is None
+
+
+def test_store_is_capped(store):
+    for i in range(5):
+        store.set(f'+91{i}', f'sku{i}')
+    assert len(store) == 2
+    assert store.get('+914') == 'sku4'
+
+
+def test_sqlite_store_is_shared_and_expires(tmp_path, monkeypatch):
+    path = str(tmp_path / 'conv.sqlite3')
+    worker_a = SQLiteConversationStore(path, ttl=60)
+    worker_b = SQLiteConversationStore(path, ttl=60)
+    worker_a.set('+91', 'abc')
+    assert worker_b.get('+91') == 'abc'
+
+    now = [10_000.0]
+    monkeypatch.setattr('app.utils.conversation_store.time.time', lambda: now[0])
+    worker_a.set('+92', 'def')
+    now[0] += 61
+    assert worker_b.get('+92') is None
+
+
+def test_memory_store_does_not_count_expired_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('app.utils.cache.time.monotonic', lambda: now[0])
+    store = MemoryConversationStore(ttl=60)
+    store.set('+91', 'abc')
+    now[0] += 30
+    store.set('+92', 'def')
+    assert len(store) == 2
+    now[0] += 40
+    assert len(store) == 1
+
+
+def test_sqlite_store_opens_one_connection_for_all_threads(tmp_path, monkeypatch):
+    import sqlite3
+    import threading
+    from app.utils import conversation_store
+    opened = []
+    connect = sqlite3.connect
+    monkeypatch.setattr(conversation_store.sqlite3, 'connect', lambda *a, **kw: opened.append(1) or connect(*a, **kw))
+
+    db = SQLiteConversationStore(str(tmp_path / 'conv.sqlite3'), ttl=60)
+    # each async view runs on a thread of its own
+    threads = [threading.Thread(target=lambda n=n: db.set(f'+91{n}', 'sku') or db.get(f'+91{n}')) for n in range(8)]
+    [t.start() for t in threads]
+    [t.join(5) for t in threads]
+    assert len(db) == 8 and opened == [1]
@@ -0,0 +1,42 @@
+# tests/test_embedding_store.py
+import numpy as np
+from app.services.embedding_store import EmbeddingStore
+
+
+class _CountingEncoder:
+    def __init__(self):
+        self.seen = []
+
+    def __call__(self, texts):
+        self.seen.extend(texts)
+        return np.array([[len(t), t.count("a"), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_only_new_texts_are_encoded(tmp_path):
+    encoder = _CountingEncoder()
+    store = EmbeddingStore(str(tmp_path), "test-model")
+
+    first = store.load(["prince coupler 110 mm", "prince bend 75 mm"], encoder)
+    assert encoder.seen == ["prince coupler 110 mm", "prince bend 75 mm"]
+
+    encoder.seen.clear()
+    second = store.load(["prince bend 75 mm", "prince tee 90 mm", "prince coupler 110 mm"], encoder)
+    assert encoder.seen == ["prince tee 90 mm"]
+    assert np.array_equal(second[0], first[1])
+    assert np.array_equal(second[2], first[0])
+    assert not second.flags.writeable
+    assert np.allclose(np.linalg.norm(second, axis=1), 1.0)
+
+    encoder.seen.clear()
+    again = EmbeddingStore(str(tmp_path), "test-model").load(
+        ["prince bend 75 mm", "prince tee 90 mm", "prince coupler 110 mm"], encoder)
+    assert encoder.seen == []
+    assert np.array_equal(again, second)
+
+
+def test_other_model_does_not_reuse_cache(tmp_path):
+    encoder = _CountingEncoder()
+    EmbeddingStore(str(tmp_path), "model-a").load(["prince coupler"], encoder)
+    encoder.seen.clear()
+    EmbeddingStore(str(tmp_path), "model-b").load(["prince coupler"], encoder)
+    assert encoder.seen == ["prince coupler"]
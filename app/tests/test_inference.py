@@ -0,0 +1,117 @@
+# tests/test_inference.py
+import time
+import threading
+
+import numpy as np
+import pytest
+
+from app.services.inference import InferenceService
+from app.utils import metrics
+
+
+class _RecordingEncoder:
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, texts):
+        self.release.wait(5)
+        self.calls.append(list(texts))
+        return np.array([[len(t), i] for i, t in enumerate(texts)], dtype=np.float32)
+
+
+def test_concurrent_requests_share_one_model_call():
+    encoder = _RecordingEncoder()
+    service = InferenceService(encoder, window_ms=200, max_batch=64).start()
+    try:
+        futures = [service.submit(['bend 110', 'tee']), service.submit(['tee']), service.submit(['pipe 20'])]
+        results = [f.result(5) for f in futures]
+    finally:
+        service.stop()
+
+    assert encoder.calls == [['bend 110', 'tee', 'pipe 20']]      # repeated text encoded once
+    assert results[0].tolist() == [[8, 0], [3, 1]]
+    assert results[1].tolist() == [[3, 1]]
+    assert results[2].tolist() == [[7, 2]]
+    assert metrics.summary('inference_batch_size').count() >= 1
+
+
+def test_batches_are_capped_at_max_batch():
+    encoder = _RecordingEncoder()
+    encoder.release.clear()                      # hold the first call so the rest queue up
+    service = InferenceService(encoder, window_ms=50, max_batch=2).start()
+    try:
+        futures = [service.submit([f'q{i}']) for i in range(5)]
+        encoder.release.set()
+        [f.result(5) for f in futures]
+    finally:
+        service.stop()
+    assert sorted(sum(encoder.calls, [])) == [f'q{i}' for i in range(5)]
+    assert all(len(call) <= 2 for call in encoder.calls)
+
+
+def test_errors_reach_every_caller_and_idle_service_encodes_inline():
+    def boom(texts):
+        raise RuntimeError('model unavailable')
+
+    service = InferenceService(boom, window_ms=1).start()
+    try:
+        with pytest.raises(RuntimeError):
+            service.encode(['coupler'], timeout=5)
+    finally:
+        service.stop()
+
+    # not started: the caller's own thread runs the model
+    encoder = _RecordingEncoder()
+    assert InferenceService(encoder).encode(['valve']).tolist() == [[5, 0]]
+    assert encoder.calls == [['valve']]
+
+
+def test_searches_encode_through_the_service(monkeypatch):
+    from app.services import catalogue
+    encoder = _RecordingEncoder()
+    service = InferenceService(encoder, window_ms=1).start()
+    monkeypatch.setattr(catalogue, '_inference', service)
+    monkeypatch.setattr(catalogue, '_query_embedding_cache', catalogue.LRUCache())
+    try:
+        q_embed = catalogue._encode_query('tee 75')
+    finally:
+        service.stop()
+    assert encoder.calls == [['tee 75']]
+    assert np.allclose(q_embed, np.array([6, 0]) / 6)
+
+
+def test_bad_model_output_fails_the_batch_not_the_worker():
+    answers = [np.zeros((1, 2), dtype=np.float32), np.ones((1, 2), dtype=np.float32)]
+    service = InferenceService(lambda texts: answers.pop(0), window_ms=1).start()
+    try:
+        with pytest.raises(IndexError):
+            service.encode(['tee', 'bend'], timeout=5)      # one row for two texts
+        assert service.encode(['tee'], timeout=5).tolist() == [[1, 1]]
+    finally:
+        service.stop()
+
+
+def test_large_requests_are_encoded_in_max_batch_calls():
+    encoder = _RecordingEncoder()
+    service = InferenceService(encoder, window_ms=1, max_batch=2).start()
+    try:
+        assert len(service.encode([f'q{i}' for i in range(5)], timeout=5)) == 5
+    finally:
+        service.stop()
+    assert [len(call) for call in encoder.calls] == [2, 2, 1]
+
+
+def test_stop_does_not_hang_on_a_full_queue():
+    encoder = _RecordingEncoder()
+    encoder.release.clear()
+    service = InferenceService(encoder, window_ms=0, max_batch=1, queue_size=1).start()
+    service.submit(['a'])
+    while service.depth:                         # the worker is held inside the model call
+        time.sleep(0.01)
+    service.submit(['b'])                        # ...and the queue is full
+    started = time.monotonic()
+    service.stop(timeout=0.1)
+    assert time.monotonic() - started < 1
+    encoder.release.set()
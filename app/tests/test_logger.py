@@ -0,0 +1,30 @@
+# tests/test_logger.py
+import json
+import logging
+
+from app.utils import logger as log_utils
+
+
+def test_parse_levels_ignores_blank_and_malformed_items():
+    levels = log_utils._parse_levels(" urllib3=warning, ,gspread=INFO,broken ")
+    assert levels == {'urllib3': 'WARNING', 'gspread': 'INFO'}
+
+
+def test_log_request_emits_one_json_line(caplog):
+    with caplog.at_level(logging.INFO, logger='app.requests'):
+        log_utils.log_request(phone='whatsapp:+911', outcome='greeting', total_ms=12.5, search_ms=3.0)
+    records = [r for r in caplog.records if r.name == 'app.requests']
+    assert len(records) == 1
+    fields = json.loads(records[0].getMessage())
+    assert fields == {'phone': 'whatsapp:+911', 'outcome': 'greeting', 'total_ms': 12.5, 'search_ms': 3.0}
+
+
+def test_log_file_is_appended_to_and_only_rotated_on_request(tmp_path):
+    assert log_utils._file_handler({'LOG_FILE': ''}) is None          # stdout only
+    path = str(tmp_path / 'app.log')
+    handler = log_utils._file_handler({'LOG_FILE': path, 'LOG_MAX_BYTES': 0})
+    assert isinstance(handler, logging.handlers.WatchedFileHandler)
+    handler.close()
+    handler = log_utils._file_handler({'LOG_FILE': path, 'LOG_MAX_BYTES': 1024})
+    assert isinstance(handler, logging.handlers.RotatingFileHandler)
+    handler.close()
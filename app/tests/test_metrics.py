@@ -0,0 +1,52 @@
+# tests/test_metrics.py
+import math
+import logging
+import pytest
+from app.utils import metrics
+
+
+def test_summary_quantiles_and_render():
+    s = metrics.summary('test_latency_seconds', 'Test latency')
+    for ms in range(1, 101):
+        s.observe(ms / 1000, op='x')
+    q = s.quantiles(op='x')
+    assert q[0.5] == pytest.approx(0.051)
+    assert q[0.99] == pytest.approx(0.1)
+    assert math.isnan(s.quantiles(op='missing')[0.5])
+
+    text = metrics.render()
+    assert '# TYPE test_latency_seconds summary' in text
+    assert 'test_latency_seconds{op="x",quantile="0.95"} 0.096' in text
+    assert 'test_latency_seconds_count{op="x"} 100' in text
+
+
+def test_timed_counts_calls_and_errors():
+    @metrics.timed('test_call_seconds', op='boom')
+    def boom():
+        raise RuntimeError('x')
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            boom()
+    assert metrics.summary('test_call_seconds').count(op='boom') == 2
+    assert metrics.counter('test_call_errors_total').value(op='boom') == 2
+
+
+def test_callback_gauge_with_labels():
+    metrics.gauge('test_cache_hits_total', 'hits', lambda: [({'cache': 'a'}, 3)], kind='counter')
+    text = metrics.render()
+    assert '# TYPE test_cache_hits_total counter' in text
+    assert 'test_cache_hits_total{cache="a"} 3' in text
+
+
+def test_failing_gauge_callback_is_logged_and_exported(caplog):
+    def broken():
+        raise AttributeError('depth')
+
+    metrics.gauge('test_broken_depth', 'depth', broken)
+    with caplog.at_level(logging.ERROR, logger='app.utils.metrics'):
+        text = metrics.render()
+        metrics.render()
+    assert 'test_broken_depth NaN' in text
+    assert metrics.counter('metrics_callback_errors_total').value(metric='test_broken_depth') == 2
+    assert len([r for r in caplog.records if 'test_broken_depth' in r.getMessage()]) == 1
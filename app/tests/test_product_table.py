@@ -0,0 +1,43 @@
+# tests/test_product_table.py
+import json
+import pytest
+from app.services.product_table import Catalogue, Product, FIELDS
+from app.utils.conversation_utils import MessageFormatter
+
+RECORDS = [
+    {'id': 'c110', 'sku': 'COUP-OD110', 'name': 'Coupler', 'brand': 'Prince', 'scheme': 'OD',
+     'size_text': '110 mm', 'dim_a': 110.0, 'dim_b': 0.0, 'unit': 'mm', 'price_unit': 'PCS', 'price': 364.85},
+    {'id': 'c75', 'sku': 'COUP-OD75', 'name': 'Coupler', 'brand': 'Prince', 'scheme': 'OD',
+     'size_text': '75 mm', 'dim_a': 75.0, 'dim_b': 0.0, 'unit': 'mm', 'price_unit': 'PCS', 'price': 120.0},
+]
+
+
+def test_product_view_reads_like_the_record():
+    table = Catalogue.from_records(RECORDS)
+    product = table[1]
+    assert isinstance(product, Product) and not hasattr(product, '__dict__')
+    assert product == RECORDS[1] and dict(product) == RECORDS[1]
+    assert product['brand'] == 'Prince' and product.get('missing', 'x') == 'x'
+    assert json.loads(json.dumps(dict(product))) == RECORDS[1]
+    assert table.by_id['c110']['price'] == 364.85 and 'nope' not in table.by_id
+    with pytest.raises(KeyError):
+        product['missing']
+
+
+def test_repeated_text_is_stored_once():
+    table = Catalogue.from_records(RECORDS * 50)
+    codes, categories = table.codes('name')
+    assert categories.tolist() == ['Coupler'] and codes.dtype.itemsize == 2
+    assert table.column('size_text').tolist()[:2] == ['110 mm', '75 mm']
+    assert set(table.row_tuples()) == {'c110', 'c75'}
+    assert list(table[0]) == list(FIELDS)
+
+
+def test_missing_text_is_a_category_of_its_own():
+    table = Catalogue.from_records([{**RECORDS[0], 'brand': None}, RECORDS[1], {**RECORDS[0], 'brand': None}])
+    assert [p['brand'] for p in table] == ['None', 'Prince', 'None']
+
+
+def test_formatter_accepts_product_views():
+    body, buttons = MessageFormatter.format_product_response(Catalogue.from_records(RECORDS)[0])
+    assert 'Prince Coupler' in body and '₹364.85/PCS' in body
@@ -0,0 +1,50 @@
+# tests/test_reply_cache.py
+import time
+import pytest
+from app.utils.reply_cache import PENDING, MemoryReplyCache, SQLiteReplyCache, delivery_key
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def cache(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryReplyCache(ttl=60, max_entries=10, pending_ttl=0.2)
+    return SQLiteReplyCache(str(tmp_path / 'replies.sqlite3'), ttl=60, max_entries=10,
+                            pending_ttl=0.2, sweep_interval=0)
+
+
+def test_claim_then_replay(cache):
+    assert cache.claim('sid:SM1') is None            # first delivery owns it
+    assert cache.claim('sid:SM1') == PENDING         # retry while it runs
+    cache.put('sid:SM1', '<Response/>')
+    assert cache.claim('sid:SM1') == '<Response/>'
+
+
+def test_released_and_abandoned_claims_can_be_retaken(cache):
+    assert cache.claim('a') is None
+    cache.release('a')
+    assert cache.claim('a') is None
+    time.sleep(0.25)                                 # past pending_ttl
+    assert cache.claim('a') is None
+
+
+def test_sqlite_cache_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / 'replies.sqlite3')
+    SQLiteReplyCache(path).claim('sid:SM1')
+    assert SQLiteReplyCache(path).claim('sid:SM1') == PENDING
+
+
+def test_delivery_key_prefers_message_sid():
+    data = {'From': '+91', 'Body': 'hi'}
+    assert delivery_key({**data, 'MessageSid': 'SM1'}, 30) == 'sid:SM1'
+    assert delivery_key(data, 30) == delivery_key(dict(data), 30)
+    assert delivery_key(data, 30) != delivery_key({**data, 'Body': 'yes'}, 30)
+
+
+def test_sqlite_cache_is_usable_from_any_thread(tmp_path):
+    import threading
+    cache = SQLiteReplyCache(str(tmp_path / 'replies.sqlite3'))
+    results = []
+    threads = [threading.Thread(target=lambda n=n: results.append(cache.claim(f'sid:{n}'))) for n in range(8)]
+    [t.start() for t in threads]
+    [t.join(5) for t in threads]
+    assert results == [None] * 8 and len(cache) == 8
@@ -0,0 +1,157 @@
+# tests/test_routes.py
+import json
+import time
+import logging
+import pytest
+from flask import Flask
+from app.config import Config
+from app import routes
+from app.utils import conversation_utils, reply_cache
+from app.utils.conversation_store import MemoryConversationStore
+
+PRODUCT = {
+    'id': 'abc123ef', 'sku': 'COUP-OD110', 'name': 'Coupler', 'brand': 'Prince',
+    'scheme': 'OD', 'size_text': '110 mm', 'dim_a': 110.0, 'dim_b': 0.0,
+    'unit': 'mm', 'price_unit': 'PCS', 'price': 364.85,
+}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    calls = {'log': [], 'orders': [], 'status': []}
+    monkeypatch.setattr(routes.sheets, 'log_message', lambda phone, msg: calls['log'].append((phone, msg)))
+    monkeypatch.setattr(routes.sheets, 'append_order', lambda row: calls['orders'].append(row))
+    monkeypatch.setattr(routes.sheets, 'update_status', lambda *args: calls['status'].append(args))
+    monkeypatch.setattr(routes, 'enhanced_search', lambda query, top_n=3: [PRODUCT])
+    monkeypatch.setattr(routes, 'batch_search', lambda queries, top_n=3: [
+        [] if 'valve' in q else [{**PRODUCT, 'id': f'id-{n}'}] for n, q in enumerate(queries)])
+    monkeypatch.setattr(routes.sheets, 'append_orders', lambda rows: calls['orders'].append(rows))
+    monkeypatch.setattr(conversation_utils, '_store', MemoryConversationStore())
+    monkeypatch.setattr(reply_cache, '_reply_cache', reply_cache.MemoryReplyCache())
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config.update(UPI_NUMBER='9999999999')
+    app.register_blueprint(routes.main_bp)
+    test_client = app.test_client()
+    test_client.calls = calls
+    return test_client
+
+
+def _send(client, body, phone='whatsapp:+911234567890'):
+    return client.post('/webhook', data={'Body': body, 'From': phone})
+
+
+def test_product_query_logs_message_and_draft_order(client):
+    resp = _send(client, '2 pieces coupler 110')
+    assert resp.status_code == 200
+    assert 'Prince Coupler' in resp.get_data(as_text=True)
+    assert client.calls['log'] == [('whatsapp:+911234567890', '2 pieces coupler 110')]
+    assert client.calls['orders'][0]['SKU_ID'] == 'abc123ef'
+
+
+def test_yes_then_cod_updates_status(client):
+    _send(client, '2 pieces coupler 110')
+    assert 'payment method' in _send(client, 'yes').get_data(as_text=True)
+    assert 'Order confirmed' in _send(client, 'cod').get_data(as_text=True)
+    assert client.calls['status'] == [('whatsapp:+911234567890', 'abc123ef', 'COD Confirmed')]
+
+
+def test_slow_status_write_keeps_the_draft_without_write_behind(client, monkeypatch):
+    slow = lambda *args: time.sleep(0.3) or client.calls['status'].append(args)
+    monkeypatch.setattr(routes.sheets, 'update_status', slow)
+    monkeypatch.setattr(routes.sheets, 'get_writer', lambda: None)
+    client.application.config['PIPELINE_SHEETS_TIMEOUT'] = 0.05
+    _send(client, '2 pieces coupler 110')
+    _send(client, 'yes')
+    assert 'busy' in _send(client, 'cod').get_data(as_text=True)
+    # the draft is kept: trying again confirms it
+    monkeypatch.setattr(reply_cache, '_reply_cache', reply_cache.MemoryReplyCache())
+    client.application.config['PIPELINE_SHEETS_TIMEOUT'] = 5
+    assert 'Order confirmed' in _send(client, 'cod').get_data(as_text=True)
+
+
+def test_slow_queued_status_write_is_confirmed_once(client, monkeypatch):
+    slow = lambda *args: time.sleep(0.3) or client.calls['status'].append(args)
+    monkeypatch.setattr(routes.sheets, 'update_status', slow)
+    monkeypatch.setattr(routes.sheets, 'get_writer', lambda: object())
+    client.application.config['PIPELINE_SHEETS_TIMEOUT'] = 0.05
+    _send(client, '2 pieces coupler 110')
+    _send(client, 'yes')
+    assert 'Order confirmed' in _send(client, 'cod').get_data(as_text=True)
+    # the draft is done with: a repeated reply can't apply it again
+    monkeypatch.setattr(reply_cache, '_reply_cache', reply_cache.MemoryReplyCache())
+    assert 'Order confirmed' not in _send(client, 'cod').get_data(as_text=True)
+    time.sleep(0.4)
+    assert len(client.calls['status']) == 1
+
+
+def test_slow_search_returns_busy_reply(client, monkeypatch):
+    monkeypatch.setattr(routes, 'enhanced_search', lambda query, top_n=3: time.sleep(0.5) or [PRODUCT])
+    client.application.config['PIPELINE_SEARCH_TIMEOUT'] = 0.05
+    resp = _send(client, '2 pieces coupler 110')
+    assert 'busy' in resp.get_data(as_text=True)
+    assert client.calls['orders'] == []
+
+
+def test_request_log_line_has_outcome_and_timings(client, caplog):
+    with caplog.at_level(logging.INFO, logger='app.requests'):
+        _send(client, '2 pieces coupler 110')
+    line = json.loads([r for r in caplog.records if r.name == 'app.requests'][-1].getMessage())
+    assert line['outcome'] == 'product_match'
+    assert {'total_ms', 'search_ms', 'append_order_ms', 'log_message_ms'} <= set(line)
+
+
+def test_metrics_endpoint_reports_stages(client):
+    _send(client, '2 pieces coupler 110')
+    resp = client.get('/metrics')
+    assert resp.status_code == 200
+    text = resp.get_data(as_text=True)
+    assert 'webhook_stage_seconds_count{stage="search"}' in text
+    assert 'webhook_request_seconds_count{outcome="product_match"}' in text
+
+
+def test_redelivered_message_is_answered_from_cache(client):
+    data = {'Body': 'coupler 110mm', 'From': 'whatsapp:+911234567890', 'MessageSid': 'SM1'}
+    first = client.post('/webhook', data=data)
+    again = client.post('/webhook', data=data)
+    assert again.data == first.data
+    assert len(client.calls['log']) == 1
+
+    # Same text under a new SID is a new message
+    client.post('/webhook', data={**data, 'MessageSid': 'SM2'})
+    assert len(client.calls['log']) == 2
+
+
+def test_retry_of_a_delivery_still_in_flight_is_counted(client):
+    from app.utils import metrics
+    client.application.config.update(WEBHOOK_DEDUPE_WAIT_SECONDS=0.1)
+    data = {'Body': 'coupler 110mm', 'From': 'whatsapp:+911234567890', 'MessageSid': 'SM9'}
+    reply_cache._reply_cache.claim(reply_cache.delivery_key(data, 30))    # first delivery running
+    before = metrics.counter('webhook_duplicates_total').value(state='in_flight_timeout')
+    resp = client.post('/webhook', data=data)
+    assert '<Message>' not in resp.get_data(as_text=True)
+    assert client.calls['log'] == []
+    assert metrics.counter('webhook_duplicates_total').value(state='in_flight_timeout') == before + 1
+
+
+def test_multi_item_order_is_one_search_and_one_append(client):
+    body = _send(client, '2 bend 110mm, 5 coupler 110, 1 ball valve 25').get_data(as_text=True)
+    assert 'Found 2 items' in body and 'Not found: ball valve 25' in body
+    [rows] = client.calls['orders']
+    assert [(r['Qty'], r['SKU_ID']) for r in rows] == [('2', 'id-0'), ('5', 'id-1')]
+
+    _send(client, 'yes')
+    _send(client, 'cod')
+    assert [args[1] for args in client.calls['status']] == ['id-0', 'id-1']
+
+
+def test_items_matching_the_same_sku_are_one_order_line(client, monkeypatch):
+    monkeypatch.setattr(routes, 'batch_search', lambda queries, top_n=3: [[PRODUCT] for _ in queries])
+    body = _send(client, '2 coupler 110, 3 coupler 110mm').get_data(as_text=True)
+    assert 'Found 1 item' in body and '5 × Prince Coupler' in body
+    [rows] = client.calls['orders']
+    assert [(r['Qty'], r['SKU_ID']) for r in rows] == [('5', 'abc123ef')]
+    _send(client, 'yes')
+    _send(client, 'cod')
+    assert [args[1] for args in client.calls['status']] == ['abc123ef']
@@ -0,0 +1,142 @@
+# tests/test_sheet_writer.py
+import os
+import json
+import threading
+from flask import Flask
+from app.services.sheet_writer import SheetWriter
+
+
+def _writer(tmp_path, handler, **kwargs):
+    app = Flask(__name__)
+    return SheetWriter(app, handler, spool_dir=str(tmp_path), **kwargs)
+
+
+def test_ops_are_batched_per_kind(tmp_path):
+    calls = []
+    writer = _writer(tmp_path, lambda kind, ops: calls.append((kind, len(ops))),
+                     flush_interval_ms=200, max_batch_rows=10, last_kinds=("status",)).start()
+    writer.submit("status", phone="+91", sku_id="a", status="COD Confirmed")
+    for i in range(3):
+        writer.submit("log", row=["t", "+91", f"msg {i}"])
+    writer.submit("order", row={"SKU_ID": "a"})
+    assert writer.flush(5)
+    writer.stop()
+    assert calls == [("log", 3), ("order", 1), ("status", 1)]
+
+
+def test_last_kinds_are_applied_in_the_given_order(tmp_path):
+    calls = []
+    writer = _writer(tmp_path, lambda kind, ops: calls.append(kind),
+                     flush_interval_ms=200, max_batch_rows=10, last_kinds=("status", "log")).start()
+    writer.submit("log", row=["t", "+91", "hi"])
+    writer.submit("status", phone="+91", sku_id="a", status="COD Confirmed")
+    writer.submit("order", row={"SKU_ID": "a"})
+    assert writer.flush(5)
+    writer.stop()
+    assert calls == ["order", "status", "log"]
+
+
+def test_failed_ops_stay_in_spool_and_replay(tmp_path):
+    def failing(kind, ops):
+        raise RuntimeError("sheets down")
+
+    writer = _writer(tmp_path, failing, flush_interval_ms=50).start()
+    writer.submit("log", row=["t", "+91", "hello"])
+    writer.flush(5)
+    writer.stop(timeout=0.5)
+
+    spooled = [json.loads(l) for l in open(os.path.join(tmp_path, f"sheets-{os.getpid()}.jsonl"))]
+    assert [op["row"][2] for op in spooled] == ["hello"]
+
+    seen = []
+    writer = _writer(tmp_path, lambda kind, ops: seen.extend(op["row"][2] for op in ops),
+                     flush_interval_ms=50).start()
+    assert writer.flush(5)
+    writer.stop()
+    assert seen == ["hello"]
+    assert open(os.path.join(tmp_path, f"sheets-{os.getpid()}.jsonl")).read() == ""
+
+
+def test_spool_larger_than_the_queue_replays_without_blocking_start(tmp_path):
+    with open(os.path.join(tmp_path, f"sheets-{os.getpid()}.jsonl"), "w") as f:
+        for i in range(10):
+            f.write(json.dumps({"seq": i, "kind": "log", "row": ["t", "+91", f"msg {i}"]}) + "\n")
+    seen = []
+    writer = _writer(tmp_path, lambda kind, ops: seen.extend(op["row"][2] for op in ops),
+                     flush_interval_ms=20, queue_size=2).start()
+    assert writer.flush(5)
+    writer.stop()
+    assert seen == [f"msg {i}" for i in range(10)]
+
+
+def test_failed_synchronous_write_is_retried(tmp_path):
+    busy, release = threading.Event(), threading.Event()
+    hello_attempts, written = [], []
+
+    def handler(kind, ops):
+        rows = [op["row"][2] for op in ops]
+        if "block" in rows:
+            busy.set()
+            release.wait(5)
+        if "hello" in rows:
+            hello_attempts.append(1)
+            if len(hello_attempts) == 1:
+                raise RuntimeError("sheets down")
+        written.extend(rows)
+
+    writer = _writer(tmp_path, handler, flush_interval_ms=20, max_batch_rows=1, queue_size=1).start()
+    writer.submit("log", row=["t", "+91", "block"])
+    assert busy.wait(5)                                  # worker is stuck on this one
+    writer.submit("log", row=["t", "+91", "filler"])     # fills the queue
+    writer.submit("log", row=["t", "+91", "hello"])      # queue full: written inline, fails
+    assert hello_attempts == [1]
+
+    release.set()
+    assert writer.flush(10)
+    writer.stop()
+    assert sorted(written) == ["block", "filler", "hello"]
+
+
+def test_status_waits_for_the_failed_append_it_refers_to(tmp_path):
+    calls, attempts = [], []
+
+    def handler(kind, ops):
+        if kind == "order":
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("sheets down")
+        calls.append(kind)
+
+    writer = _writer(tmp_path, handler, flush_interval_ms=200, max_batch_rows=10,
+                     last_kinds=("status",)).start()
+    writer.submit("order", row={"SKU_ID": "a"})
+    writer.submit("status", phone="+91", sku_id="a", status="COD Confirmed")
+    assert writer.flush(10)
+    writer.stop()
+    assert calls == ["order", "status"]
+
+
+def test_ops_that_cant_succeed_are_dead_lettered(tmp_path):
+    written = []
+
+    def handler(kind, ops):
+        rows = [op["row"][2] for op in ops]
+        if "bad" in rows:
+            raise ValueError("missing column")
+        if "flaky" in rows:
+            raise RuntimeError("sheets down")
+        written.extend(rows)
+
+    writer = _writer(tmp_path, handler, flush_interval_ms=200, max_batch_rows=10, max_attempts=2,
+                     retryable=lambda e: not isinstance(e, ValueError)).start()
+    for msg in ("bad", "ok", "flaky"):
+        writer.submit("log", row=["t", "+91", msg])
+    assert writer.flush(10)
+    writer.submit("log", row=["t", "+91", "later"])
+    assert writer.flush(10)
+    writer.stop()
+
+    assert written == ["ok", "later"]
+    dead = [json.loads(l) for l in open(os.path.join(tmp_path, "dead-letter.jsonl"))]
+    assert [(op["row"][2], op["attempts"]) for op in dead] == [("bad", 1), ("flaky", 2)]
+    assert open(os.path.join(tmp_path, f"sheets-{os.getpid()}.jsonl")).read() == ""
@@ -1,6 +1,7 @@
 # tests/test_sheets.py
 import pytest
 from app.services import sheets
+from app.services.sheets_scheduler import SheetsScheduler, SheetsThrottled
 from flask import Flask
 import gspread
 
@@ -12,3 +13,231 @@ def test_get_sheet():
     with app.app_context():
         sheet = sheets.get_sheet()
         assert isinstance(sheet, gspread.models.Worksheet)
+
+
+class _FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.text = ""
+
+    def json(self):
+        return {"error": {"code": self.status_code, "message": "fake", "status": "FAKE"}}
+
+
+class _FakeWorksheet:
+    def __init__(self):
+        self.rows = [["Timestamp", "Phone", "Query", "SKU_ID", "Qty", "Status"]]
+        self.fail_next = None
+        self.reads = []
+        self.batches = []
+
+    def row_values(self, n):
+        return self.rows[n - 1]
+
+    def append_row(self, row, value_input_option=None):
+        if self.fail_next:
+            status, self.fail_next = self.fail_next, None
+            raise gspread.exceptions.APIError(_FakeResponse(status))
+        self.rows.append(row)
+
+    def append_rows(self, rows, value_input_option=None):
+        if self.fail_next:
+            status, self.fail_next = self.fail_next, None
+            raise gspread.exceptions.APIError(_FakeResponse(status))
+        first = len(self.rows) + 1
+        self.rows.extend(rows)
+        return {"updates": {"updatedRange": f"Orders_Status!A{first}:F{len(self.rows)}"}}
+
+    def get(self, a1):
+        self.reads.append(a1)
+        start = int("".join(c for c in a1.split(":")[0] if c.isdigit()))
+        return [row[1:4] for row in self.rows[start - 1:]]
+
+    def update_cell(self, row, col, value):
+        self.rows[row - 1][col - 1] = value
+
+    def get_all_records(self):
+        return [dict(zip(self.rows[0], row)) for row in self.rows[1:]]
+
+    def batch_update(self, data, value_input_option=None):
+        if self.fail_next:
+            status, self.fail_next = self.fail_next, None
+            raise gspread.exceptions.APIError(_FakeResponse(status))
+        self.batches.append([item["range"] for item in data])
+        for item in data:
+            first = int("".join(c for c in item["range"].split(":")[0] if c.isdigit()))
+            for offset, values in enumerate(item["values"]):
+                self.rows[first - 1 + offset][0] = values[0]
+
+
+class _FakeSpreadsheet:
+    id = "fake-key"
+
+    def __init__(self, ws):
+        self.ws = ws
+
+    def worksheet(self, tab_name):
+        return self.ws
+
+
+class _FakeClient:
+    def __init__(self, ws):
+        self.ws = ws
+        self.opened = 0
+
+    def open(self, title):
+        self.opened += 1
+        return _FakeSpreadsheet(self.ws)
+
+    def open_by_key(self, key):
+        self.opened += 1
+        return _FakeSpreadsheet(self.ws)
+
+
+@pytest.fixture
+def fake_sheets(monkeypatch):
+    ws = _FakeWorksheet()
+    clients = []
+
+    def fake_authorize():
+        clients.append(_FakeClient(ws))
+        return clients[-1]
+
+    monkeypatch.setattr(sheets, "_authorize", fake_authorize)
+    monkeypatch.setattr(sheets, "_scheduler", None)
+    monkeypatch.setattr(sheets, "_unlogged", type(sheets._unlogged)())
+    sheets.invalidate(drop_client=True)
+    app = Flask(__name__)
+    app.config.update(GOOGLE_SHEET_TITLE="Jirago Ops", ORDERS_TAB="Orders_Status",
+                      ORDERS_LOG_TAB="Orders_Log", ORDERS_INDEX_RECONCILE_SECONDS=3600,
+                      SHEETS_REQUESTS_PER_MINUTE=60000, SHEETS_BURST=100)
+    with app.app_context():
+        yield ws, clients
+    sheets.invalidate(drop_client=True)
+
+
+def test_handles_are_cached_across_calls(fake_sheets):
+    ws, clients = fake_sheets
+    for _ in range(3):
+        sheets.append_order({"Phone": "+91", "SKU_ID": "abc", "Status": "Awaiting Confirm"})
+    assert len(clients) == 1
+    assert clients[0].opened == 1
+    assert len(ws.rows) == 4
+
+
+def test_401_drops_client_and_retries(fake_sheets):
+    ws, clients = fake_sheets
+    sheets.append_order({"Phone": "+91", "SKU_ID": "abc"})
+    ws.fail_next = 401
+    sheets.append_order({"Phone": "+91", "SKU_ID": "def"})
+    assert len(clients) == 2
+    assert ws.rows[-1][3] == "def"
+
+
+def test_update_status_uses_row_index(fake_sheets):
+    ws, _ = fake_sheets
+    ws.rows.append(["t0", "+91", "old", "zzz", "1", "Awaiting Confirm"])
+    sheets.append_order({"Phone": "+91", "SKU_ID": "abc", "Status": "Awaiting Confirm"})
+    sheets.append_order({"Phone": "+92", "SKU_ID": "abc", "Status": "Awaiting Confirm"})
+
+    sheets.update_status("+92", "abc", "COD Confirmed")
+    assert ws.rows[3][5] == "COD Confirmed"
+    assert ws.reads == ["B2:D"]          # one narrow read to build the index
+
+    # a row written by someone else is found with an incremental read
+    ws.rows.append(["t1", "+93", "q", "def", "1", "Awaiting Confirm"])
+    sheets.update_status("+93", "def", "Awaiting UPI Payment")
+    assert ws.rows[4][5] == "Awaiting UPI Payment"
+    assert ws.reads == ["B2:D", "B5:D"]
+
+
+def test_sku_backfill_is_one_batch_update_with_quota_retry(fake_sheets, monkeypatch):
+    ws, _ = fake_sheets
+    ws.rows = [["SKU_ID", "SKU"], ["", "A"], ["", "B"], ["keep1", "C"], ["", "D"], ["", "E"], ["", "F"]]
+    ws.fail_next = 429
+    sleeps = []
+    monkeypatch.setattr(sheets, "_scheduler", SheetsScheduler(60000, 100, sleep=sleeps.append))
+    sheets.current_app.config.update(CATALOGUE_TAB="Catalogue")
+
+    df = sheets.load_catalogue_df()
+    assert len(sleeps) == 1                              # one backoff after the 429
+    assert ws.batches == [["A2:A3", "A5:A7"]]            # one call, one range per block
+    ids = df["SKU_ID"].tolist()
+    assert ids[2] == "keep1" and len(set(ids)) == 6
+    assert all(len(i) == 8 for i in ids if i != "keep1")
+    assert [row[0] for row in ws.rows[1:]] == ids
+
+
+def test_generated_ids_avoid_existing_and_each_other(monkeypatch):
+    draws = iter(["0000002a00000001", "00000001", "00000002"])
+    monkeypatch.setattr(sheets.os, "urandom", lambda n: bytes.fromhex(next(draws)))
+    assert sheets._generate_unique_ids(2, {"0000002a"}) == ["00000001", "00000002"]
+
+
+def test_scheduler_retries_5xx_and_gives_up_on_4xx():
+    sleeps = []
+    scheduler = SheetsScheduler(60000, 100, max_retries=2, sleep=sleeps.append)
+    answers = iter([503, 429, None])
+
+    def flaky():
+        status = next(answers)
+        if status:
+            raise gspread.exceptions.APIError(_FakeResponse(status))
+        return "ok"
+
+    assert scheduler.call(flaky) == "ok"
+    assert len(sleeps) == 2
+
+    with pytest.raises(gspread.exceptions.APIError):
+        scheduler.call(lambda: (_ for _ in ()).throw(gspread.exceptions.APIError(_FakeResponse(400))))
+    assert len(sleeps) == 2
+
+    # an append may have landed before a 5xx: only 429 is retried
+    answers = iter([429, 502, None])
+    with pytest.raises(gspread.exceptions.APIError):
+        scheduler.call(flaky, idempotent=False)
+    assert len(sleeps) == 3
+
+
+def test_scheduler_serves_status_before_logs_when_out_of_quota():
+    import threading
+    import time
+    from app.services.sheets_scheduler import PRIORITY_LOG, PRIORITY_STATUS
+
+    scheduler = SheetsScheduler(600, 1)          # one token, then one per 0.1s
+    scheduler.acquire()
+    served = []
+    log = threading.Thread(target=lambda: (scheduler.acquire(PRIORITY_LOG), served.append("log")))
+    log.start()
+    time.sleep(0.02)                             # the log write is queued first...
+    status = threading.Thread(target=lambda: (scheduler.acquire(PRIORITY_STATUS), served.append("status")))
+    status.start()
+    log.join(2)
+    status.join(2)
+    assert served == ["status", "log"]           # ...but the status update goes first
+
+    with pytest.raises(SheetsThrottled):
+        scheduler.acquire(PRIORITY_LOG, timeout=0.01)
+    assert scheduler.depth() == {}
+
+
+def test_failed_log_rows_are_kept_for_the_next_write(fake_sheets):
+    ws, _ = fake_sheets
+    ws.fail_next = 400
+    sheets.log_message("+91", "first")            # fails, row is kept
+    sheets.log_message("+91", "second")
+    assert [row[2] for row in ws.rows[1:]] == ["first", "second"]
+
+
+def test_update_statuses_attempts_every_sku(monkeypatch):
+    done = []
+
+    def update_status(phone, sku_id, status):
+        if sku_id == 'b':
+            raise RuntimeError('quota')
+        done.append(sku_id)
+
+    monkeypatch.setattr(sheets, 'update_status', update_status)
+    with pytest.raises(RuntimeError):
+        sheets.update_statuses('whatsapp:+91', ['a', 'b', 'c'], 'COD Confirmed')
+    assert done == ['a', 'c']
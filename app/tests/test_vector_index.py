@@ -0,0 +1,39 @@
+# tests/test_vector_index.py
+import numpy as np
+from app.services.embedding_store import normalize_rows
+from app.services.vector_index import FlatIndex, IVFIndex, build_index
+
+
+def _clustered(n=2000, d=16, centres=20, seed=1):
+    rng = np.random.default_rng(seed)
+    means = rng.normal(size=(centres, d))
+    rows = means[rng.integers(0, centres, n)] + 0.1 * rng.normal(size=(n, d))
+    return normalize_rows(rows)
+
+
+def test_ivf_with_all_lists_probed_is_exact():
+    emb = _clustered()
+    ivf = IVFIndex.build(emb, nlist=16, nprobe=16)
+    flat = FlatIndex(emb)
+    for q in emb[:20]:
+        assert np.array_equal(ivf.search(q, 10), flat.search(q, 10))
+
+
+def test_ivf_recall_with_few_probes():
+    emb = _clustered()
+    ivf = IVFIndex.build(emb, nlist=32, nprobe=4)
+    flat = FlatIndex(emb)
+    queries = _clustered(n=50, seed=2)
+    hits = sum(len(set(ivf.search(q, 10)) & set(flat.search(q, 10))) for q in queries)
+    assert hits / (10 * len(queries)) > 0.8
+
+
+def test_ivf_index_is_persisted_next_to_embeddings(tmp_path):
+    path = str(tmp_path / "emb.npy")
+    np.save(path, _clustered(n=500))
+    emb = np.load(path, mmap_mode="r")
+    built = build_index(emb, kind="ivf", nlist=8)
+    assert (tmp_path / "emb.npy.ivf8.npz").exists()
+    loaded = build_index(emb, kind="ivf", nlist=8)
+    assert np.array_equal(loaded.centroids, built.centroids)
+    assert isinstance(build_index(emb, kind="auto", min_rows=1000), FlatIndex)
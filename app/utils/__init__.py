@@ -5,6 +5,7 @@ This package contains utility modules for:
 - Message parsing and validation
 - Conversation state management
 - Message formatting and templating
+- Small in-process caches
 """
 
 from .conversation_utils import (
@@ -12,9 +13,11 @@ from .conversation_utils import (
     ConversationManager,
     MessageFormatter
 )
+from .cache import LRUCache
 
 __all__ = [
     'MessageParser',
     'ConversationManager',
-    'MessageFormatter'
+    'MessageFormatter',
+    'LRUCache'
 ] 
\ No newline at end of file
@@ -0,0 +1,124 @@
+# app/utils/conversation_store.py
+"""
+Backends for per-customer conversation state (the SKU last offered).
+- MemoryConversationStore: per-process LRU + TTL.
+- SQLiteConversationStore: one WAL-mode SQLite file shared by every
+  gunicorn worker, so a "yes" routed to another worker still finds it.
+Both expire entries after ttl seconds and keep at most max_entries.
+"""
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from .cache import LRUCache
+
+
+class MemoryConversationStore:
+    def __init__(self, ttl: float = 3600, max_entries: int = 10000):
+        # value is just the SKU_ID string; the LRU keeps the expiry
+        self._cache = LRUCache(maxsize=max_entries, ttl=ttl)
+
+    def get(self, phone: str) -> Optional[str]:
+        return self._cache.get(phone)
+
+    def set(self, phone: str, sku_id: str) -> None:
+        self._cache.put(phone, sku_id)
+
+    def delete(self, phone: str) -> None:
+        self._cache.pop(phone)
+
+    def __len__(self) -> int:
+        self._cache.expire()
+        return len(self._cache)
+
+
+class SQLiteConversationStore:
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS conversations (
+            phone   TEXT PRIMARY KEY,
+            sku_id  TEXT NOT NULL,
+            updated REAL NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS conversations_updated ON conversations(updated);
+    """
+
+    def __init__(self, path: str, ttl: float = 3600, max_entries: int = 10000,
+                 sweep_interval: float = 60):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = None
+        self._last_sweep = 0.0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(self._SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One connection per process (re-opened after a fork), used by one
+        # thread at a time. Per-thread connections were opened and set up
+        # again for every request, as each async view runs on a new thread.
+        with self._lock:
+            if self._conn is None or self._pid != os.getpid():
+                self._conn = sqlite3.connect(self.path, timeout=5, isolation_level=None,
+                                             check_same_thread=False)
+                self._conn.execute('PRAGMA journal_mode=WAL')
+                self._conn.execute('PRAGMA synchronous=NORMAL')
+                self._pid = os.getpid()
+            yield self._conn
+
+    def get(self, phone: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT sku_id FROM conversations WHERE phone = ? AND updated > ?',
+                (phone, time.time() - self.ttl),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, phone: str, sku_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO conversations (phone, sku_id, updated) VALUES (?, ?, ?)',
+                (phone, sku_id, time.time()),
+            )
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self.sweep()
+
+    def delete(self, phone: str) -> None:
+        with self._connect() as conn:
+            conn.execute('DELETE FROM conversations WHERE phone = ?', (phone,))
+
+    def sweep(self) -> None:
+        """Drops expired rows, then the oldest ones beyond max_entries."""
+        self._last_sweep = time.monotonic()
+        with self._connect() as conn:
+            conn.execute('DELETE FROM conversations WHERE updated <= ?', (time.time() - self.ttl,))
+            conn.execute(
+                'DELETE FROM conversations WHERE phone IN ('
+                '  SELECT phone FROM conversations ORDER BY updated DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,),
+            )
+
+    def __len__(self) -> int:
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM conversations WHERE updated > ?',
+                                (time.time() - self.ttl,)).fetchone()[0]
+
+
+def create_store(config) -> 'MemoryConversationStore | SQLiteConversationStore':
+    backend = config.get('CONVERSATION_BACKEND', 'sqlite')
+    ttl = config.get('CONVERSATION_TTL_SECONDS', 3600)
+    max_entries = config.get('CONVERSATION_MAX_ENTRIES', 10000)
+    if backend == 'sqlite':
+        return SQLiteConversationStore(config['CONVERSATION_DB_PATH'], ttl=ttl, max_entries=max_entries)
+    if backend == 'memory':
+        return MemoryConversationStore(ttl=ttl, max_entries=max_entries)
+    raise ValueError(f"Unknown conversation backend: {backend}")
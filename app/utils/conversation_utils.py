@@ -1,12 +1,23 @@
-from collections import defaultdict
-from datetime import datetime
 import re
 import logging
+import threading
 from flask import current_app
 
-# Simple in-memory store for conversation state
-# In production, you'd want to use Redis or a database
-conversation_state = defaultdict(dict)
+from .conversation_store import create_store
+
+# Conversation state backend (memory or shared SQLite), built on first use
+# from CONVERSATION_* settings
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_conversation_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_store(current_app.config)
+    return _store
 
 class MessageParser:
     GREETINGS = {'hi', 'hello', 'hey', 'hii', 'hiii', 'hiiii', 'helo', 'hllo', 'hola'}
@@ -51,6 +62,45 @@ class MessageParser:
         qty_match = re.search(r'(\d+)\s*(?:pc|pcs|pieces?|units?)?\b', message, re.I)
         return qty_match.group(1) if qty_match else "-1"
 
+    # Line items are separated by commas, semicolons, new lines, '+', '&'
+    # or a standalone 'and'
+    ITEM_SEPARATORS = re.compile(r'\s*(?:[,;\n+&]|\band\b)\s*')
+    # Leading quantity: "2 bend", "2 pcs bend", "2x bend"; a number followed
+    # by a unit ("110 mm", "1.5 inch") is a size, not a quantity
+    LEADING_QTY = re.compile(
+        r'^(\d+)\s*(?:x|pc|pcs|pieces?|units?|nos?|qty)?\s+'
+        r'(?!(?:mm|cm|m|inch|inches|ft|feet|l|ltr|litres?|liters?|sq|sqmm|x)\b)(?=\D)', re.I)
+
+    @staticmethod
+    def split_order_items(message: str, match_types=None) -> list[tuple[str, str]]:
+        """
+        Splits a multi-item message ("2 bend 110mm, 5 coupler 110") into
+        (qty, item text) pairs; qty is "-1" when an item has none. A segment
+        starts a new item only when it has a leading quantity or names an
+        item type of its own (match_types(text) -> list of types); anything
+        else ("prince coupler, 110mm", "ball valve 1/2 & 3/4") belongs to the
+        item before it. A message with fewer than two items is kept whole
+        and returns one pair.
+        """
+        items = []
+        for segment in MessageParser.ITEM_SEPARATORS.split(message):
+            segment = segment.strip()
+            if not segment:
+                continue
+            qty_match = MessageParser.LEADING_QTY.match(segment)
+            if qty_match:
+                items.append([qty_match.group(1), segment[qty_match.end():].strip()])
+            elif items and not (match_types and match_types(segment)):
+                items[-1][1] = f"{items[-1][1]} {segment}"
+            else:
+                items.append(["-1", segment])
+        if len(items) < 2:
+            qty_match = MessageParser.LEADING_QTY.match(message)
+            if qty_match:
+                return [(qty_match.group(1), message[qty_match.end():].strip())]
+            return [("-1", message.strip())]
+        return [tuple(item) for item in items]
+
     @staticmethod
     def is_order_id_response(message: str) -> tuple[bool, str]:
         """Check if message is an order ID response and extract the ID"""
@@ -65,29 +115,34 @@ class MessageParser:
         return len(words) >= 2 or any(char.isdigit() for char in message)
 
 class ConversationManager:
-    def __init__(self, user_phone: str):
+    def __init__(self, user_phone: str, store=None):
         self.user_phone = user_phone
+        self.store = store if store is not None else get_conversation_store()
 
     def get_current_sku(self) -> str | None:
         """Get the current SKU ID for the user"""
-        state = conversation_state.get(self.user_phone, {})
-        return state.get('last_sku')
+        return self.store.get(self.user_phone)
 
     def set_current_sku(self, sku_id: str) -> None:
         """Set the current SKU ID for the user"""
-        conversation_state[self.user_phone] = {
-            'last_sku': sku_id,
-            'timestamp': datetime.now().isoformat()
-        }
+        self.store.set(self.user_phone, sku_id)
+
+    def get_current_skus(self) -> list[str]:
+        """Every SKU ID of the draft order (several for a multi-item order)"""
+        value = self.get_current_sku()
+        return value.split(',') if value else []
+
+    def set_current_skus(self, sku_ids: list[str]) -> None:
+        """Set the SKU IDs of a multi-item draft order"""
+        self.store.set(self.user_phone, ','.join(sku_ids))
 
     def clear_state(self) -> None:
         """Clear the conversation state for the user"""
-        if self.user_phone in conversation_state:
-            del conversation_state[self.user_phone]
+        self.store.delete(self.user_phone)
 
     def has_active_conversation(self) -> bool:
         """Check if user has an active conversation with a product context"""
-        return self.user_phone in conversation_state and 'last_sku' in conversation_state[self.user_phone]
+        return self.get_current_sku() is not None
 
 class MessageFormatter:
     @staticmethod
@@ -106,6 +161,10 @@ class MessageFormatter:
     def format_error_response() -> str:
         return "❌ Something went wrong. Please try again."
 
+    @staticmethod
+    def format_busy() -> str:
+        return "⏳ We're a bit busy right now. Please send your message again in a minute."
+
     @staticmethod
     def format_order_error() -> str:
         return "❌ Order processing failed. Please try again."
@@ -126,6 +185,24 @@ class MessageFormatter:
         buttons = ["Yes", "No"]
         return body_text, buttons
 
+    @staticmethod
+    def format_order_items_response(items: list[tuple[str, str, dict | None]]) -> tuple[str, list[str]]:
+        """Format the matches of a multi-item order, given (qty, item text, product or None)"""
+        found = [(qty, p) for qty, _, p in items if p is not None]
+        lines = [f"✨ Found {len(found)} item{'s' if len(found) != 1 else ''}:"]
+        for idx, (qty, product) in enumerate(found, start=1):
+            qty_text = f"{qty} × " if qty != "-1" else ""
+            lines.append(
+                f"{idx}. {qty_text}{product['brand']} {product['name']} ({product['size_text']}) "
+                f"₹{product['price']}/{product['price_unit']}"
+            )
+        missing = [text for _, text, p in items if p is None]
+        if missing:
+            lines.append(f"\n🔍 Not found: {', '.join(missing)}")
+        body_text = "\n".join(lines) + "\n\nWould you like to place order?"
+        buttons = ["Yes", "No"]
+        return body_text, buttons
+
     @staticmethod
     def format_payment_options() -> tuple[str, list[str]]:
         """Format payment options message"""
@@ -1,5 +1,10 @@
 # app/utils/logger.py
+import sys
+import json
+import queue
+import atexit
 import logging
+import logging.handlers
 
 def setup_logger(name, log_file, level=logging.ERROR):
     formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
@@ -15,3 +20,106 @@ def setup_logger(name, log_file, level=logging.ERROR):
     return logger
 
 error_logger = setup_logger('error_logger', 'error.log', level=logging.ERROR)
+
+
+# -------------------------------------------------
+# Application logging
+# -------------------------------------------------
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+
+_queue_handler = None
+_listener = None
+_sinks = []
+
+
+def _parse_levels(spec):
+    """'urllib3=WARNING,gspread=INFO' -> {'urllib3': 'WARNING', 'gspread': 'INFO'}"""
+    levels = {}
+    for item in (spec or '').split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _start_listener():
+    global _listener
+    _queue_handler.queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *_sinks, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+def _file_handler(config):
+    """
+    Handler for LOG_FILE (None when unset). By default the file is only
+    appended to and reopened once something else (logrotate) moved it, which
+    is safe with every gunicorn worker writing to it. LOG_MAX_BYTES > 0
+    rotates in-process instead: only for a single process, since workers
+    rotating one file race each other and lose records.
+    """
+    log_file = config.get('LOG_FILE')
+    if not log_file:
+        return None
+    max_bytes = config.get('LOG_MAX_BYTES', 0)
+    if max_bytes:
+        return logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=config.get('LOG_BACKUP_COUNT', 5), encoding='utf-8')
+    return logging.handlers.WatchedFileHandler(log_file, encoding='utf-8')
+
+
+def configure_logging(config):
+    """
+    Root logging for the app. Records are put on an in-memory queue by the
+    calling thread and written to stdout (and LOG_FILE, when set) by a
+    QueueListener thread, so request threads never wait on disk.
+    Per-module levels come from LOG_LEVELS ('urllib3=WARNING,...').
+    Safe to call more than once; only the first call configures.
+    """
+    global _queue_handler
+    if _queue_handler is not None:
+        return
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(formatter)
+    _sinks.append(stream)
+
+    log_file = _file_handler(config)
+    if log_file is not None:
+        log_file.setFormatter(formatter)
+        _sinks.append(log_file)
+
+    _queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    root = logging.getLogger()
+    root.setLevel(config.get('LOG_LEVEL', 'INFO').upper())
+    root.addHandler(_queue_handler)
+    for name, level in _parse_levels(config.get('LOG_LEVELS')).items():
+        logging.getLogger(name).setLevel(level)
+
+    _start_listener()
+    atexit.register(_stop_listener)
+
+
+def restart_logging_after_fork():
+    """
+    The listener thread doesn't survive fork(); give the child a fresh
+    queue and listener of its own.
+    """
+    if _queue_handler is not None:
+        _start_listener()
+
+
+request_logger = logging.getLogger('app.requests')
+
+
+def log_request(**fields):
+    """
+    One structured JSON line per webhook request (timings in ms).
+    """
+    if request_logger.isEnabledFor(logging.INFO):
+        request_logger.info('%s', json.dumps(fields, ensure_ascii=False, default=str))
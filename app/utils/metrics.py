@@ -0,0 +1,227 @@
+# app/utils/metrics.py
+"""
+In-process metrics
+———————————
+Counters, latency summaries and callback gauges, rendered in the
+Prometheus text format by the /metrics route.
+• Summaries keep count and sum plus the last _WINDOW samples per label
+  set; p50/p95/p99 are computed from that window at scrape time, so an
+  observe() is just an append under a lock.
+• Values are per process: under gunicorn each worker reports its own.
+"""
+
+import time
+import math
+import logging
+import threading
+from collections import deque
+from contextlib import ContextDecorator
+from typing import Callable, Dict, Tuple
+
+_WINDOW    = 1024
+_QUANTILES = (0.5, 0.95, 0.99)
+_GAUGE_ERROR_LOG_SECONDS = 60     # a failing gauge callback is logged at most this often
+
+logger = logging.getLogger(__name__)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    body = ','.join('%s="%s"' % (k, v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                    for k, v in labels)
+    return '{%s}' % body
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return 'NaN'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def value(self, **labels) -> float:
+        return self._values.get(_labels(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield self.name, labels, value
+
+
+class Summary:
+    kind = 'summary'
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._series: Dict[Labels, list] = {}    # labels -> [count, sum, deque]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0, 0.0, deque(maxlen=_WINDOW)]
+            series[0] += 1
+            series[1] += value
+            series[2].append(value)
+
+    def time(self, **labels) -> "_Timer":
+        return _Timer(self, labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(_labels(labels))
+        return series[0] if series else 0
+
+    def quantiles(self, **labels) -> Dict[float, float]:
+        series = self._series.get(_labels(labels))
+        with self._lock:
+            window = sorted(series[2]) if series else []
+        return {q: _quantile(window, q) for q in _QUANTILES}
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, s[0], s[1], sorted(s[2])) for labels, s in self._series.items()]
+        for labels, count, total, window in items:
+            for q in _QUANTILES:
+                yield self.name, labels + (('quantile', str(q)),), _quantile(window, q)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class Gauge:
+    """Read from a callback at scrape time: fn() → number, or [(labels dict, number), ...]."""
+
+    def __init__(self, name: str, help: str, fn: Callable, kind: str = 'gauge'):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.kind = kind    # 'counter' for totals kept elsewhere (e.g. cache hits)
+        self._logged_at = None
+
+    def samples(self):
+        try:
+            value = self.fn()
+        except Exception:
+            # Don't fail the scrape, but don't lose the series quietly either:
+            # it reads NaN and metrics_callback_errors_total counts the failure
+            now = time.monotonic()
+            if self._logged_at is None or now - self._logged_at >= _GAUGE_ERROR_LOG_SECONDS:
+                self._logged_at = now
+                logger.exception("❌ Metrics callback for %s failed", self.name)
+            counter("metrics_callback_errors_total", "Exceptions raised by gauge callbacks").inc(metric=self.name)
+            yield self.name, (), float('nan')
+            return
+        if isinstance(value, (list, tuple)):
+            for labels, v in value:
+                yield self.name, _labels(labels), v
+        elif value is not None:
+            yield self.name, (), value
+
+
+def _quantile(window, q: float) -> float:
+    if not window:
+        return float('nan')
+    return window[min(len(window) - 1, int(q * len(window)))]
+
+
+class _Timer(ContextDecorator):
+    """
+    Times a block (or, as a decorator, a call) into a Summary. Exceptions
+    are counted on <name without _seconds>_errors_total, same labels.
+    """
+
+    def __init__(self, summary: Summary, labels: dict):
+        self.summary = summary
+        self.labels = labels
+        self._local = threading.local()
+
+    def __enter__(self):
+        starts = getattr(self._local, 'starts', None)
+        if starts is None:
+            starts = self._local.starts = []
+        starts.append(time.perf_counter())
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._local.starts.pop()
+        self.summary.observe(elapsed, **self.labels)
+        if exc_type is not None:
+            base = self.summary.name
+            if base.endswith('_seconds'):
+                base = base[:-len('_seconds')]
+            counter(f"{base}_errors_total", f"Exceptions raised inside {self.summary.name}").inc(**self.labels)
+        return False
+
+
+# -------------------------------------------------
+# Registry
+# -------------------------------------------------
+
+_registry: Dict[str, object] = {}
+_registry_lock = threading.Lock()
+
+
+def _register(name: str, factory):
+    metric = _registry.get(name)
+    if metric is None:
+        with _registry_lock:
+            metric = _registry.get(name)
+            if metric is None:
+                metric = _registry[name] = factory()
+    return metric
+
+
+def counter(name: str, help: str = '') -> Counter:
+    return _register(name, lambda: Counter(name, help))
+
+
+def summary(name: str, help: str = '') -> Summary:
+    return _register(name, lambda: Summary(name, help))
+
+
+def gauge(name: str, help: str, fn: Callable, kind: str = 'gauge') -> Gauge:
+    """Registers (or replaces) a metric whose value is read from fn()."""
+    with _registry_lock:
+        metric = _registry[name] = Gauge(name, help, fn, kind)
+    return metric
+
+
+def timed(name: str, help: str = '', **labels) -> _Timer:
+    """metrics.timed('x_seconds', op='y') as a `with` block or a decorator."""
+    return summary(name, help).time(**labels)
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (0.0.4)."""
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda m: m.name)
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,192 @@
+# app/utils/reply_cache.py
+"""
+Replies to recent webhook deliveries, so a Twilio retry of the same message
+is answered with the TwiML already rendered instead of doing the work again.
+- MemoryReplyCache: per-process LRU + TTL.
+- SQLiteReplyCache: one WAL-mode SQLite file shared by every gunicorn
+  worker (a retry is often routed to another worker).
+A delivery first claim()s its key. The claim is PENDING until the reply is
+put(); a retry arriving meanwhile sees PENDING and waits for it. Pending
+claims expire after pending_ttl so a crashed request doesn't block its key.
+"""
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from flask import current_app
+
+from .cache import LRUCache
+
+PENDING = ''
+
+
+def delivery_key(data: dict, window: float) -> str:
+    """Twilio's MessageSid, or a hash of (From, Body, time window) without one."""
+    sid = data.get('MessageSid') or data.get('SmsMessageSid')
+    if sid:
+        return f"sid:{sid}"
+    bucket = int(time.time() // window) if window > 0 else 0
+    raw = f"{data.get('From', '')}\x00{data.get('Body', '')}\x00{bucket}"
+    return 'hash:' + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class MemoryReplyCache:
+    def __init__(self, ttl: float = 600, max_entries: int = 10000, pending_ttl: float = 30):
+        # value is (claimed_at, body); body is PENDING until the reply is known
+        self._cache = LRUCache(maxsize=max_entries, ttl=ttl)
+        self._lock = threading.Lock()
+        self.pending_ttl = pending_ttl
+
+    def claim(self, key: str) -> Optional[str]:
+        """None if the caller now owns key; else the cached body (or PENDING)."""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                claimed_at, body = entry
+                if body != PENDING or time.monotonic() - claimed_at < self.pending_ttl:
+                    return body
+            self._cache.put(key, (time.monotonic(), PENDING))
+            return None
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._cache.get(key)
+        return None if entry is None else entry[1]
+
+    def put(self, key: str, body: str) -> None:
+        self._cache.put(key, (time.monotonic(), body))
+
+    def release(self, key: str) -> None:
+        self._cache.pop(key)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+class SQLiteReplyCache:
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS replies (
+            key      TEXT PRIMARY KEY,
+            body     TEXT NOT NULL,
+            updated  REAL NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS replies_updated ON replies(updated);
+    """
+
+    def __init__(self, path: str, ttl: float = 600, max_entries: int = 10000,
+                 pending_ttl: float = 30, sweep_interval: float = 60):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.pending_ttl = pending_ttl
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = None
+        self._last_sweep = 0.0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(self._SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One connection per process (re-opened after a fork), used by one
+        # thread at a time. Per-thread connections were opened and set up
+        # again for every request, as each async view runs on a new thread.
+        with self._lock:
+            if self._conn is None or self._pid != os.getpid():
+                self._conn = sqlite3.connect(self.path, timeout=5, isolation_level=None,
+                                             check_same_thread=False)
+                self._conn.execute('PRAGMA journal_mode=WAL')
+                self._conn.execute('PRAGMA synchronous=NORMAL')
+                self._pid = os.getpid()
+            yield self._conn
+
+    def claim(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Expired replies and abandoned claims can be taken over
+                conn.execute(
+                    'DELETE FROM replies WHERE key = ? AND (updated <= ? OR (body = ? AND updated <= ?))',
+                    (key, now - self.ttl, PENDING, now - self.pending_ttl),
+                )
+                claimed = conn.execute(
+                    'INSERT OR IGNORE INTO replies (key, body, updated) VALUES (?, ?, ?)',
+                    (key, PENDING, now),
+                ).rowcount == 1
+                row = None if claimed else conn.execute(
+                    'SELECT body FROM replies WHERE key = ?', (key,)).fetchone()
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self.sweep()
+        return None if claimed else row[0]
+
+    def get(self, key: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT body FROM replies WHERE key = ? AND updated > ?',
+                (key, time.time() - self.ttl),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, body: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO replies (key, body, updated) VALUES (?, ?, ?)',
+                (key, body, time.time()),
+            )
+
+    def release(self, key: str) -> None:
+        with self._connect() as conn:
+            conn.execute('DELETE FROM replies WHERE key = ? AND body = ?', (key, PENDING))
+
+    def sweep(self) -> None:
+        """Drops expired rows, then the oldest ones beyond max_entries."""
+        self._last_sweep = time.monotonic()
+        with self._connect() as conn:
+            conn.execute('DELETE FROM replies WHERE updated <= ?', (time.time() - self.ttl,))
+            conn.execute(
+                'DELETE FROM replies WHERE key IN ('
+                '  SELECT key FROM replies ORDER BY updated DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,),
+            )
+
+    def __len__(self) -> int:
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM replies').fetchone()[0]
+
+
+def create_reply_cache(config) -> 'MemoryReplyCache | SQLiteReplyCache':
+    backend = config.get('WEBHOOK_DEDUPE_BACKEND', 'sqlite')
+    ttl = config.get('WEBHOOK_DEDUPE_TTL_SECONDS', 600)
+    max_entries = config.get('WEBHOOK_DEDUPE_MAX_ENTRIES', 10000)
+    pending_ttl = config.get('WEBHOOK_DEDUPE_PENDING_SECONDS', 30)
+    if backend == 'sqlite':
+        return SQLiteReplyCache(config['WEBHOOK_DEDUPE_DB_PATH'], ttl=ttl,
+                                max_entries=max_entries, pending_ttl=pending_ttl)
+    if backend == 'memory':
+        return MemoryReplyCache(ttl=ttl, max_entries=max_entries, pending_ttl=pending_ttl)
+    raise ValueError(f"Unknown webhook dedupe backend: {backend}")
+
+
+_reply_cache = None
+_reply_cache_lock = threading.Lock()
+
+
+def get_reply_cache():
+    global _reply_cache
+    if _reply_cache is None:
+        with _reply_cache_lock:
+            if _reply_cache is None:
+                _reply_cache = create_reply_cache(current_app.config)
+    return _reply_cache
@@ -0,0 +1,39 @@
+# app/utils/runtime.py
+import os
+import sys
+import resource
+
+
+def _smaps_rollup() -> dict:
+    """Pss / Private_* / Rss from /proc (Linux only), in kB."""
+    values = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                    values[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        pass
+    return values
+
+
+def memory_report() -> dict:
+    """
+    Resident memory of this process in MB. On Linux also reports PSS
+    (shared pages split between the processes mapping them) and private
+    memory, which show how much a forked worker really shares with the
+    gunicorn master.
+    """
+    report = {'pid': os.getpid()}
+    rollup = _smaps_rollup()
+    if rollup:
+        report['rss_mb'] = round(rollup.get('Rss', 0) / 1024, 1)
+        report['pss_mb'] = round(rollup.get('Pss', 0) / 1024, 1)
+        private = rollup.get('Private_Clean', 0) + rollup.get('Private_Dirty', 0)
+        report['private_mb'] = round(private / 1024, 1)
+    else:
+        # ru_maxrss is the peak, in kB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        report['max_rss_mb'] = round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    return report
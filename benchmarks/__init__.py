@@ -0,0 +1,23 @@
+"""
+Offline benchmarks for the WhatsApp bot
+———————————
+Runs the app against in-process fakes (no Twilio, no Google Sheets, no
+model download by default) and writes results as JSON, so numbers can be
+compared across commits.
+• fakes.py   – fake gspread backend with injectable latency, hashing encoder
+• harness.py – app factory for benchmarks, timing + JSON result helpers
+• replay.py  – posts Twilio-form payloads to /webhook via the test client
+• micro.py   – enhanced_search, batch_search, encode bursts (per thread vs
+  the inference service), _scheme_distance, load_catalogue, MessageParser
+• catalogue_gen.py / scaling.py – synthetic 10k–100k SKU catalogues; load
+  time, memory, latency and recall per size and vector index
+• precision.py – memory, latency and top-3 agreement with float32 per
+  EMBEDDING_PRECISION
+
+Usage:
+    python -m benchmarks                       # micro + replay, results to stdout
+    python -m benchmarks micro --out bench.json
+    python -m benchmarks replay --messages msgs.jsonl --sheets-latency-ms 80
+    python -m benchmarks scaling --sizes 1000,10000,100000 --indexes flat,ivf
+    python -m benchmarks precision --sizes 10000,100000 --precisions float32,int8
+"""
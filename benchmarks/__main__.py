@@ -0,0 +1,74 @@
+# benchmarks/__main__.py
+import logging
+import argparse
+
+import benchmarks
+from benchmarks import micro, precision, replay, scaling
+from benchmarks.fakes import FakeSheetsBackend
+from benchmarks.harness import DEFAULT_CATALOGUE, make_app, read_catalogue, write_results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=benchmarks.__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("suite", nargs="?", default="all", choices=["all", "micro", "replay", "scaling", "precision"],
+                        help="all = micro + replay; scaling and precision run on their own")
+    parser.add_argument("--catalogue", default=DEFAULT_CATALOGUE, help="catalogue CSV (Catalogue tab layout)")
+    parser.add_argument("--messages", help="JSONL of {From, Body[, kind]} to replay (default: synthetic)")
+    parser.add_argument("--conversations", type=int, default=50, help="synthetic conversations to replay")
+    parser.add_argument("--sheets-latency-ms", type=float, default=0.0, help="injected per-call Sheets latency")
+    parser.add_argument("--sheets-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--write-behind", action="store_true", help="queue Sheets writes like production")
+    parser.add_argument("--real-model", action="store_true", help="use the sentence-transformer, not the hashing encoder")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--sizes", default="1000,10000,100000", help="scaling: catalogue sizes")
+    parser.add_argument("--indexes", default="flat,ivf", help="scaling: vector index backends")
+    parser.add_argument("--precisions", default="float32,float16,int8", help="precision: embedding precisions")
+    parser.add_argument("--rerank", type=int, default=50, help="precision: candidates re-scored in float32")
+    parser.add_argument("--out", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    # Per-request INFO logging would dominate the numbers
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.suite == "scaling":
+        results = scaling.run(sizes=[int(n) for n in args.sizes.split(",")],
+                              indexes=args.indexes.split(","), repeat=args.repeat)
+        write_results({"config": {k: v for k, v in vars(args).items() if k != "out"}, "scaling": results},
+                      args.out)
+        return
+    if args.suite == "precision":
+        results = precision.run(sizes=[int(n) for n in args.sizes.split(",")],
+                                precisions=args.precisions.split(","),
+                                index_kind=args.indexes.split(",")[0], repeat=args.repeat,
+                                rerank=args.rerank)
+        write_results({"config": {k: v for k, v in vars(args).items() if k != "out"}, "precision": results},
+                      args.out)
+        return
+
+    df = read_catalogue(args.catalogue)
+    backend = FakeSheetsBackend(df, latency_ms=args.sheets_latency_ms, jitter_ms=args.sheets_jitter_ms)
+    app = make_app(backend, real_model=args.real_model, SHEETS_WRITE_BEHIND=args.write_behind)
+    if args.write_behind:
+        from app.services import sheets
+        sheets.start_write_behind(app)
+
+    results = {
+        "config": {k: v for k, v in vars(args).items() if k not in ("out",)},
+        "catalogue_rows": len(df),
+    }
+    if args.suite in ("all", "micro"):
+        results["micro"] = micro.run(app, args.repeat)
+    if args.suite in ("all", "replay"):
+        messages = (replay.load_messages(args.messages) if args.messages
+                    else list(replay.synthetic_conversations(df, args.conversations)))
+        calls_before = backend.total_calls()
+        results["replay"] = replay.replay(app, messages)
+        results["replay"]["sheets_calls"] = backend.total_calls() - calls_before
+        results["replay"]["sheets_calls_by_method"] = dict(backend.calls)
+
+    write_results(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
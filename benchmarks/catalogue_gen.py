@@ -0,0 +1,130 @@
+# benchmarks/catalogue_gen.py
+"""
+Synthetic catalogues in the Catalogue tab layout (see master_catalogue.csv)
+for scaling runs. Rows cover every DimScheme the search understands:
+• OD    – pipes, couplers, bends, valves…       DimA = outer diameter (mm)
+• ODxOD – reducers                              DimA/DimB = both ends (mm)
+• LxW   – boards, sheets, tiles                 DimA/DimB = length/width (mm)
+• CS    – cables / wire                         DimA = cross-section (sq mm)
+• VOL   – paint, solvent cement, tanks          DimA = volume (litres)
+DimA/DimB are stored in the unit enhanced_search() compares against;
+SizeText is written the way a shop would (inches, feet, litres).
+Output is deterministic for a given (rows, seed).
+"""
+
+import uuid
+import random
+from typing import List, Optional
+
+import pandas as pd
+
+COLUMNS = ["SKU_ID", "SKU", "ProductName", "Category", "Brand", "DimScheme", "SizeText",
+           "DimA", "DimB", "DimUnit", "PriceUnit", "SellingPrice", "CostPrice", "StockQty",
+           "Supplier", "Notes"]
+
+BRANDS = ["Prince", "Supreme", "Finolex", "Astral", "Ashirvad", "Jain", "Kisan", "Sudhakar",
+          "Vectus", "Apollo", "Polycab", "Havells", "KEI", "RR Kabel", "Anchor", "Asian Paints",
+          "Berger", "Nerolac", "Dulux", "Indigo", "Pidilite", "Fevicol", "Century", "Greenply",
+          "Kajaria", "Somany", "Johnson", "Sintex", "Plasto", "Cera", "Hindware", "Jaquar",
+          "Parryware", "Tata", "Jindal", "Birla", "Ajanta", "Oriplast", "Sheetal", "Nova"]
+
+SERIES = ["PN4", "PN6", "PN10", "SCH 40", "SCH 80", "ISI", "Heavy", "Medium", "Light", "Premium",
+          "Eco", "Gold", "Pro", "Plus", "Std"]
+
+_OD_MM    = [16, 20, 25, 32, 40, 50, 63, 75, 90, 110, 125, 140, 160, 200, 250, 315]
+_INCH     = [0.5, 0.75, 1, 1.25, 1.5, 2, 2.5, 3, 4, 6]
+_SHEET_FT = [(8, 4), (7, 4), (6, 4), (8, 3), (6, 3)]
+_TILE_MM  = [(300, 300), (600, 600), (600, 1200), (800, 800), (300, 450)]
+_CS_SQMM  = [0.75, 1, 1.5, 2.5, 4, 6, 10, 16, 25, 35]
+_PAINT_L  = [0.5, 1, 4, 10, 20]
+_TANK_L   = [300, 500, 750, 1000, 1500, 2000]
+
+# scheme → [(product name, category, price unit, base price)]
+_FAMILIES = {
+    "OD": [("Coupler", "UPVC Fittings", "PCS", 2.5), ("Bend", "UPVC Fittings", "PCS", 3.0),
+           ("Elbow", "CPVC Fittings", "PCS", 2.0), ("Tee", "UPVC Fittings", "PCS", 3.5),
+           ("End Cap", "UPVC Fittings", "PCS", 1.5), ("Union", "CPVC Fittings", "PCS", 6.0),
+           ("Ball Valve", "Valves", "PCS", 9.0), ("Pipe", "UPVC Pipes", "Mtr", 1.6),
+           ("SWR Pipe", "SWR Pipes", "Mtr", 1.4), ("Tank Connector", "Fittings", "PCS", 4.0)],
+    "ODXOD": [("Reducer Coupler", "UPVC Fittings", "PCS", 2.2), ("Reducer Tee", "UPVC Fittings", "PCS", 3.8),
+              ("Reducing Bush", "CPVC Fittings", "PCS", 1.8)],
+    "LXW": [("Plywood Sheet", "Boards", "PCS", 0.0006), ("Laminate", "Boards", "PCS", 0.0003),
+            ("Floor Tile", "Tiles", "Box", 0.0009), ("Mirror", "Glass", "PCS", 0.0008)],
+    "CS": [("Copper Wire", "Wires", "Coil", 900.0), ("Armoured Cable", "Cables", "Mtr", 60.0),
+           ("Flexible Cable", "Cables", "Coil", 700.0)],
+    "VOL": [("Emulsion Paint", "Paints", "PCS", 280.0), ("Primer", "Paints", "PCS", 180.0),
+            ("Solvent Cement", "Adhesives", "PCS", 420.0), ("Water Tank", "Tanks", "PCS", 7.0)],
+}
+
+# Share of rows per scheme (fittings dominate a hardware store)
+_SCHEME_WEIGHTS = {"OD": 0.55, "ODXOD": 0.15, "LXW": 0.12, "CS": 0.10, "VOL": 0.08}
+
+
+def _fmt(x: float) -> str:
+    return f"{x:g}"
+
+
+def _size(scheme: str, name: str, rng: random.Random):
+    """Returns (DimScheme, SizeText, DimA, DimB, DimUnit)."""
+    if scheme == "OD":
+        if rng.random() < 0.3:
+            inch = rng.choice(_INCH)
+            return "OD", f"{_fmt(inch)} inch", round(inch * 25.4, 1), 0.0, "mm"
+        od = rng.choice(_OD_MM)
+        return "OD", f"{od} mm", float(od), 0.0, "mm"
+    if scheme == "ODXOD":
+        a, b = sorted(rng.sample(_OD_MM, 2), reverse=True)
+        return "ODxOD", f"{a} x {b} mm", float(a), float(b), "mm"
+    if scheme == "LXW":
+        if name == "Floor Tile":
+            a, b = rng.choice(_TILE_MM)
+            return "LxW", f"{a} x {b} mm", float(a), float(b), "mm"
+        a, b = rng.choice(_SHEET_FT)
+        return "LxW", f"{a} x {b} ft", round(a * 304.8, 1), round(b * 304.8, 1), "mm"
+    if scheme == "CS":
+        cs = rng.choice(_CS_SQMM)
+        return "CS", f"{_fmt(cs)} sq mm", float(cs), 0.0, "sqmm"
+    litres = rng.choice(_TANK_L if name == "Water Tank" else _PAINT_L)
+    return "VOL", f"{_fmt(litres)} L", float(litres), 0.0, "L"
+
+
+def generate_catalogue(rows: int, seed: int = 0, brands: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    rows synthetic SKUs with unique SKU_ID and SKU codes. Many rows share
+    name and size across brands / series, as in a real multi-brand store.
+    brands defaults to BRANDS.
+    """
+    brands = list(BRANDS if brands is None else brands)
+    rng = random.Random(seed)
+    schemes = list(_SCHEME_WEIGHTS)
+    weights = [_SCHEME_WEIGHTS[s] for s in schemes]
+    seen_ids = set()
+    records = []
+    for n in range(rows):
+        scheme = rng.choices(schemes, weights)[0]
+        name, category, price_unit, base = rng.choice(_FAMILIES[scheme])
+        brand  = rng.choice(brands)
+        series = rng.choice(SERIES)
+        dim_scheme, size_text, dim_a, dim_b, unit = _size(scheme, name, rng)
+
+        sku_id = uuid.UUID(int=rng.getrandbits(128)).hex[:8]
+        while sku_id in seen_ids:
+            sku_id = uuid.UUID(int=rng.getrandbits(128)).hex[:8]
+        seen_ids.add(sku_id)
+
+        size_factor = max(dim_a, 1.0) * max(dim_b, 1.0) if dim_b else max(dim_a, 1.0)
+        price = round(base * size_factor * rng.uniform(0.8, 1.3) + rng.uniform(5, 50), 2)
+        records.append([
+            sku_id,
+            f"{name[:4].upper()}-{dim_scheme.upper()}{int(dim_a)}-{brand[:3].upper()}-{n:06d}",
+            name, category, brand, dim_scheme, size_text, dim_a, dim_b, unit, price_unit,
+            price, round(price * rng.uniform(0.7, 0.9), 2), rng.randint(0, 500),
+            f"{brand} Distributor", f"{series}",
+        ])
+    return pd.DataFrame(records, columns=COLUMNS)
+
+
+if __name__ == "__main__":
+    import sys
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    generate_catalogue(rows).to_csv(sys.stdout, index=False)
@@ -0,0 +1,179 @@
+# benchmarks/fakes.py
+"""
+In-process stand-ins for Google Sheets and the sentence-transformer.
+"""
+
+import re
+import time
+import zlib
+import random
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import gspread
+
+from app.services import sheets
+
+ORDER_HEADERS = ["Timestamp", "Phone", "Query", "SKU_ID", "Qty", "Status"]
+
+_A1_ROW = re.compile(r"[A-Z]+(\d+)")
+
+
+class FakeSheetsBackend:
+    """
+    Holds every tab in memory and sleeps latency_ms (± jitter_ms) on each
+    API call, like a round trip to Google would. Counts calls per method.
+    """
+
+    def __init__(self, catalogue: Optional[pd.DataFrame] = None, latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms  = jitter_ms
+        self.calls: Dict[str, int] = {}
+        self._rng  = random.Random(seed)
+        self._lock = threading.Lock()
+        self.tabs: Dict[str, List[list]] = {}
+        if catalogue is not None:
+            self.set_catalogue(catalogue)
+
+    def set_catalogue(self, df: pd.DataFrame, tab_name: str = "Catalogue"):
+        df = df.fillna("")
+        self.tabs[tab_name] = [list(df.columns)] + df.astype(object).values.tolist()
+
+    def api_call(self, method: str):
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            delay = self.latency_ms + (self._rng.uniform(-1, 1) * self.jitter_ms if self.jitter_ms else 0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def client(self) -> "FakeClient":
+        return FakeClient(self)
+
+
+class FakeWorksheet:
+    def __init__(self, backend: FakeSheetsBackend, title: str):
+        self.backend = backend
+        self.title   = title
+
+    @property
+    def rows(self) -> List[list]:
+        return self.backend.tabs[self.title]
+
+    def get_all_records(self):
+        self.backend.api_call("get_all_records")
+        header, *body = self.rows
+        return [dict(zip(header, row)) for row in body]
+
+    def row_values(self, n):
+        self.backend.api_call("row_values")
+        return list(self.rows[n - 1]) if len(self.rows) >= n else []
+
+    def get(self, a1):
+        self.backend.api_call("get")
+        start = int(_A1_ROW.match(a1.split(":")[0]).group(1))
+        return [list(row[1:4]) for row in self.rows[start - 1:]]
+
+    def append_row(self, row, value_input_option=None):
+        self.append_rows([row], value_input_option)
+
+    def append_rows(self, rows, value_input_option=None):
+        self.backend.api_call("append_rows")
+        with self.backend._lock:
+            first = len(self.rows) + 1
+            self.rows.extend(list(r) for r in rows)
+            last = len(self.rows)
+        return {"updates": {"updatedRange": f"{self.title}!A{first}:F{last}"}}
+
+    def update_cell(self, row, col, value):
+        self.backend.api_call("update_cell")
+        with self.backend._lock:
+            target = self.rows[row - 1]
+            target.extend([""] * (col - len(target)))
+            target[col - 1] = value
+
+    def batch_update(self, data, **kwargs):
+        self.backend.api_call("batch_update")
+        with self.backend._lock:
+            for item in data:
+                first_row = int(_A1_ROW.match(item["range"].split(":")[0]).group(1))
+                for offset, values in enumerate(item["values"]):
+                    target = self.rows[first_row - 1 + offset]
+                    target[:len(values)] = values
+        return {}
+
+
+class FakeSpreadsheet:
+    id = "fake-spreadsheet"
+
+    def __init__(self, backend: FakeSheetsBackend):
+        self.backend = backend
+
+    def worksheet(self, tab_name):
+        self.backend.api_call("worksheet")
+        if tab_name not in self.backend.tabs:
+            raise gspread.exceptions.WorksheetNotFound(tab_name)
+        return FakeWorksheet(self.backend, tab_name)
+
+    def add_worksheet(self, title, rows=1000, cols=26):
+        self.backend.api_call("add_worksheet")
+        self.backend.tabs[title] = []
+        return FakeWorksheet(self.backend, title)
+
+
+class FakeClient:
+    def __init__(self, backend: FakeSheetsBackend):
+        self.backend = backend
+
+    def open(self, title):
+        self.backend.api_call("open")
+        return FakeSpreadsheet(self.backend)
+
+    def open_by_key(self, key):
+        self.backend.api_call("open_by_key")
+        return FakeSpreadsheet(self.backend)
+
+
+def install(backend: FakeSheetsBackend, orders_tab: str = "Orders_Status"):
+    """
+    Points app.services.sheets at backend. Returns a callable that undoes it.
+    """
+    backend.tabs.setdefault(orders_tab, [list(ORDER_HEADERS)])
+    original = sheets._authorize
+    sheets._authorize = backend.client
+    sheets.invalidate(drop_client=True)
+
+    def uninstall():
+        sheets._authorize = original
+        sheets.invalidate(drop_client=True)
+    return uninstall
+
+
+class HashingEncoder:
+    """
+    Deterministic bag-of-tokens encoder with the SentenceTransformer.encode
+    signature. Stands in for the real model when only the search maths is
+    being measured.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _row(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for token in re.findall(r"\w+", text.lower()):
+            h = zlib.crc32(token.encode())
+            vec[h % self.dim] += 1.0 if (h >> 16) & 1 else -1.0
+        return vec
+
+    def encode(self, texts, convert_to_numpy=True, **kwargs):
+        if isinstance(texts, str):
+            return self._row(texts)
+        if not len(texts):
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([self._row(t) for t in texts])
@@ -0,0 +1,140 @@
+# benchmarks/harness.py
+"""
+App factory, timing and JSON result helpers shared by the benchmarks.
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from flask import Flask
+
+from app.config import Config
+from app.services import catalogue, sheets
+from app.utils import conversation_utils, reply_cache
+from app.utils.conversation_store import MemoryConversationStore
+from benchmarks.fakes import FakeSheetsBackend, HashingEncoder, install
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CATALOGUE = os.path.join(REPO_ROOT, "master_catalogue.csv")
+
+
+def read_catalogue(path: str = DEFAULT_CATALOGUE) -> pd.DataFrame:
+    return pd.read_csv(path, dtype={"SKU_ID": str}, keep_default_na=False)
+
+
+def make_app(backend: FakeSheetsBackend, real_model: bool = False, load: bool = True,
+             **overrides) -> Flask:
+    """
+    A Flask app wired like create_app() but against the fake backend, with
+    no background threads and nothing written under the repo. The
+    catalogue is loaded before returning unless load=False.
+    """
+    from app.routes import main_bp
+
+    scratch = tempfile.mkdtemp(prefix="bench-")
+    app = Flask("benchmarks")
+    app.config.from_object(Config)
+    app.config.update(
+        SHEETS_WRITE_BEHIND=False,
+        SHEETS_SPOOL_DIR=os.path.join(scratch, "spool"),
+        EMBEDDING_CACHE_DIR="",
+        CATALOGUE_SOURCE="sheets",
+        CATALOGUE_SNAPSHOT_PATH="",
+        CONVERSATION_BACKEND="memory",
+        WEBHOOK_DEDUPE_BACKEND="memory",
+        CATALOGUE_RELOAD_SECONDS=0,
+        # The fake backend has no quota; pass a real figure to model one
+        SHEETS_REQUESTS_PER_MINUTE=1e9,
+        SHEETS_BURST=1000,
+    )
+    app.config.update(overrides)
+    app.register_blueprint(main_bp)
+
+    install(backend, app.config["ORDERS_TAB"])
+    sheets._scheduler = None
+    reply_cache._reply_cache = None
+    catalogue._model = None if real_model else HashingEncoder()
+    catalogue._snapshot = catalogue.CatalogueSnapshot([], [], np.zeros((0, 0), dtype=np.float32))
+    catalogue._inference = None
+    conversation_utils._store = MemoryConversationStore(app.config["CONVERSATION_TTL_SECONDS"],
+                                                        app.config["CONVERSATION_MAX_ENTRIES"])
+    catalogue._query_embedding_cache.clear()
+    catalogue._result_cache.clear()
+    if load:
+        with app.app_context():
+            catalogue.load_catalogue()
+    return app
+
+
+def summarize(samples_s: Iterable[float]) -> Dict[str, float]:
+    """Latency stats in milliseconds."""
+    arr = np.asarray(list(samples_s), dtype=np.float64) * 1000
+    if not len(arr):
+        return {"n": 0}
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {
+        "n": int(len(arr)),
+        "mean_ms": round(float(arr.mean()), 4),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "min_ms": round(float(arr.min()), 4),
+        "max_ms": round(float(arr.max()), 4),
+    }
+
+
+def measure(fn: Callable[[], object], repeat: int = 200, warmup: int = 10,
+            setup: Optional[Callable[[], object]] = None) -> Dict[str, float]:
+    """Calls fn() repeat times (after warmup calls); setup() runs untimed before each call."""
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def environment() -> dict:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def write_results(results: dict, out: Optional[str] = None) -> dict:
+    """Adds run metadata and writes JSON to out (or stdout)."""
+    document = {"environment": environment(), **results}
+    text = json.dumps(document, indent=2, sort_keys=True, default=str)
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return document
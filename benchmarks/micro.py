@@ -0,0 +1,138 @@
+# benchmarks/micro.py
+"""
+Microbenchmarks for the hot functions of a webhook request.
+"""
+
+import random
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from app.services import catalogue
+from app.utils import metrics
+from app.utils.conversation_utils import MessageParser
+from benchmarks.harness import measure
+
+_PARSER_MESSAGES = ["hi", "2 pieces coupler 110", "yes", "cod", "upi", "abc123ef",
+                    "need 10 reducer coupler 110 x 75 mm", "ok", "no thanks", "pipe"]
+
+
+def sample_queries(n: int = 50, seed: int = 0) -> List[str]:
+    products = catalogue._snapshot.products
+    rng = random.Random(seed)
+    return [f"{p['name']} {p['size_text']}".lower() for p in (rng.choice(products) for _ in range(n))]
+
+
+def bench_enhanced_search(app, repeat: int = 200) -> Dict[str, dict]:
+    queries = sample_queries()
+    it = itertools.count()
+
+    def search():
+        catalogue.enhanced_search(queries[next(it) % len(queries)], top_n=3)
+
+    def clear_caches():
+        catalogue._query_embedding_cache.clear()
+        catalogue._result_cache.clear()
+
+    with app.app_context():
+        return {
+            "cold": measure(search, repeat, setup=clear_caches),
+            "warm": measure(search, repeat),
+        }
+
+
+def bench_batch_search(app, repeat: int = 50, items: int = 10) -> Dict[str, dict]:
+    """A 10-item order: one batch_search() against ten enhanced_search() calls, both cold."""
+    orders = [sample_queries(items, seed) for seed in range(repeat + 10)]
+    it = itertools.count()
+
+    def clear_caches():
+        catalogue._query_embedding_cache.clear()
+        catalogue._result_cache.clear()
+
+    def one_by_one():
+        for query in orders[next(it) % len(orders)]:
+            catalogue.enhanced_search(query, top_n=1)
+
+    def batched():
+        catalogue.batch_search(orders[next(it) % len(orders)], top_n=1)
+
+    with app.app_context():
+        return {
+            "one_by_one": measure(one_by_one, repeat, setup=clear_caches),
+            "batched": measure(batched, repeat, setup=clear_caches),
+            "items": items,
+        }
+
+
+def bench_encode_burst(app, repeat: int = 50, concurrency: int = 8) -> Dict[str, dict]:
+    """
+    concurrency threads each encode a new query at the same moment: one model
+    call per thread, against calls batched by the inference service. Only
+    meaningful with --real-model; the hashing encoder has no per-call cost.
+    """
+    queries = sample_queries((repeat + 10) * concurrency, seed=1)
+    it = itertools.count()
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+
+    def burst():
+        start = next(it) % (repeat + 10) * concurrency
+        list(pool.map(catalogue._encode_query, queries[start:start + concurrency]))
+
+    try:
+        result = {"per_thread": measure(burst, repeat, setup=catalogue._query_embedding_cache.clear)}
+        batch_sizes = metrics.summary("inference_batch_size")
+        before = batch_sizes.count()
+        service = catalogue.start_inference(app)
+        try:
+            result["batched"] = measure(burst, repeat, setup=catalogue._query_embedding_cache.clear)
+        finally:
+            service.stop()
+            catalogue._inference = None
+        result["batches"] = batch_sizes.count() - before
+        result["batch_size_quantiles"] = batch_sizes.quantiles()
+        result["queue_wait_quantiles_ms"] = {q: round(v * 1000, 3) for q, v in
+                                             metrics.summary("inference_queue_wait_seconds").quantiles().items()}
+        result["concurrency"] = concurrency
+        return result
+    finally:
+        pool.shutdown()
+
+
+def bench_scheme_distance(repeat: int = 200) -> Dict[str, dict]:
+    snap = catalogue._snapshot
+    q_nums, q_unit = catalogue._parse_query_dims("110 x 75 mm")
+    return {
+        "per_product": measure(lambda: [catalogue._scheme_distance(p, q_nums, q_unit)
+                                        for p in snap.products], repeat),
+        "vectorised": measure(lambda: catalogue._distances(snap.scheme_codes, snap.dim_a, snap.dim_b,
+                                                           q_nums, q_unit), repeat),
+        "rows": len(snap),
+    }
+
+
+def bench_load_catalogue(app, repeat: int = 10) -> dict:
+    with app.app_context():
+        return measure(catalogue.load_catalogue, repeat, warmup=1)
+
+
+def bench_message_parser(repeat: int = 2000) -> dict:
+    def parse():
+        for raw in _PARSER_MESSAGES:
+            msg = MessageParser.normalize_message(raw)
+            if MessageParser.is_greeting(msg) or not MessageParser.is_valid_query(msg):
+                continue
+            MessageParser.is_order_id_response(msg)
+            MessageParser.split_order_items(msg)
+    return {**measure(parse, repeat), "messages_per_call": len(_PARSER_MESSAGES)}
+
+
+def run(app, repeat: int = 200) -> Dict[str, dict]:
+    return {
+        "enhanced_search": bench_enhanced_search(app, repeat),
+        "batch_search": bench_batch_search(app, max(10, repeat // 4)),
+        "encode_burst": bench_encode_burst(app, max(10, repeat // 4)),
+        "scheme_distance": bench_scheme_distance(repeat),
+        "load_catalogue": bench_load_catalogue(app, max(3, repeat // 20)),
+        "message_parser": bench_message_parser(repeat * 10),
+    }
@@ -0,0 +1,130 @@
+# benchmarks/precision.py
+"""
+What EMBEDDING_PRECISION costs and saves. The catalogue is loaded once per
+precision from the same on-disk EmbeddingStore (so float32 rows are
+memory-mapped, as in production) and for every (rows, precision) pair the
+suite reports:
+• memory   – bytes of the matrix each worker scores against, next to the
+             float32 matrix, and process RSS growth over the load
+• latency  – enhanced_search() with cold caches, per query kind
+• accuracy – top 3 of every query against the same snapshot scored in
+             float32: share of queries whose top 3 have the same exact
+             (float32) scores, share of identical top-3 lists and of
+             overlapping SKUs, plus the typed hit@3 of scaling.py.
+             Generated catalogues hold many SKUs with equal scores (one
+             item across brands), so an equally good top 3 often differs
+             from float32 only in which tied SKUs it picks.
+RSS includes the float32 pages read while quantizing; those are clean,
+file-backed and shared between workers, so the OS can drop them again.
+"""
+
+import gc
+import time
+import tempfile
+from typing import Dict, List
+
+import numpy as np
+
+from app.services import catalogue
+from app.utils.runtime import memory_report
+from benchmarks.catalogue_gen import generate_catalogue
+from benchmarks.fakes import FakeSheetsBackend
+from benchmarks.harness import make_app
+from benchmarks.scaling import TOP_N, _clear_caches, _latency, _queries, _typed_recall
+
+
+def _top(queries: List[str]) -> List[List[str]]:
+    _clear_caches()
+    return [[p['id'] for p in catalogue.enhanced_search(q, top_n=TOP_N)] for q in queries]
+
+
+def _float32_top(queries: List[str]) -> List[List[str]]:
+    """Top-N of queries with the live snapshot scored against its float32 rows."""
+    snap = catalogue._snapshot
+    scoring = snap.scoring
+    snap.scoring = snap.index.embeddings = snap.embeddings
+    try:
+        return _top(queries)
+    finally:
+        snap.scoring = snap.index.embeddings = scoring
+        _clear_caches()
+
+
+def _exact_scores(query: str, ids: List[str], row_of: Dict[str, int]) -> np.ndarray:
+    """What enhanced_search() scores ids with in float32."""
+    snap  = catalogue._snapshot
+    rows  = np.array([row_of[i] for i in ids], dtype=np.intp)
+    dist  = catalogue._distances_mm(snap.scheme_codes[rows], snap.dim_a[rows], snap.dim_b[rows],
+                                    catalogue._query_sizes(snap, query, snap.type_matcher.match(query)))
+    return np.asarray(snap.embeddings[rows]) @ catalogue._encode_query(query) - 0.01 * dist
+
+
+def _agreement(queries: List[str], results: List[List[str]], exact: List[List[str]]) -> dict:
+    row_of  = {p['id']: i for i, p in enumerate(catalogue._snapshot.products)}
+    scores  = sum(len(r) == len(e) and np.allclose(_exact_scores(q, r, row_of), _exact_scores(q, e, row_of),
+                                                   atol=1e-5)
+                  for q, r, e in zip(queries, results, exact))
+    same    = sum(r == e for r, e in zip(results, exact))
+    overlap = sum(len(set(r) & set(e)) for r, e in zip(results, exact))
+    return {
+        "same_scores_at_3": round(scores / max(1, len(exact)), 4),
+        "same_top_3": round(same / max(1, len(exact)), 4),
+        "overlap_at_3": round(overlap / max(1, sum(len(e) for e in exact)), 4),
+    }
+
+
+def run_one(df, precision: str, cache_dir: str, index_kind: str = "flat", queries: int = 200,
+            repeat: int = 200, rerank: int = 50) -> dict:
+    backend = FakeSheetsBackend(df)
+    gc.collect()
+    rss_before = memory_report().get('rss_mb')
+    app = make_app(backend, load=False, VECTOR_INDEX=index_kind, VECTOR_INDEX_MIN_ROWS=0,
+                   EMBEDDING_CACHE_DIR=cache_dir, EMBEDDING_PRECISION=precision,
+                   EMBEDDING_RERANK=rerank)
+    with app.app_context():
+        started = time.perf_counter()
+        catalogue.load_catalogue()
+        load_s = time.perf_counter() - started
+        rss_after = memory_report().get('rss_mb')
+
+        snap = catalogue._snapshot
+        typed, free = _queries(snap.products, queries)
+        typed_q = [q for q, _ in typed]
+        results = {
+            "typed": _agreement(typed_q, _top(typed_q), _float32_top(typed_q)),
+            "free": _agreement(free, _top(free), _float32_top(free)),
+        }
+        return {
+            "rows": len(snap),
+            "precision": precision,
+            "index": snap.index.kind,
+            "rerank": rerank,
+            "load_s": round(load_s, 3),
+            "memory": {
+                "scoring_mb": round(snap.scoring.nbytes / 2 ** 20, 2),
+                "float32_mb": round(snap.embeddings.nbytes / 2 ** 20, 2),
+                "rss_growth_mb": round(rss_after - rss_before, 1) if rss_before is not None else None,
+            },
+            "latency": {
+                "typed": _latency(typed_q, repeat),
+                "free": _latency(free, repeat),
+            },
+            "accuracy": {
+                **results,
+                "typed_hit_at_3": round(_typed_recall(typed), 4),
+            },
+        }
+
+
+def run(sizes=(10000, 100000), precisions=("float32", "float16", "int8"), index_kind: str = "flat",
+        queries: int = 200, repeat: int = 200, rerank: int = 50, seed: int = 0) -> Dict[str, list]:
+    runs = []
+    with tempfile.TemporaryDirectory(prefix="bench-embeddings-") as cache_dir:
+        for rows in sizes:
+            df = generate_catalogue(rows, seed=seed)
+            # Encode into the store once, outside the measured loads
+            make_app(FakeSheetsBackend(df), EMBEDDING_CACHE_DIR=cache_dir)
+            for precision in precisions:
+                runs.append(run_one(df, precision, cache_dir, index_kind=index_kind, queries=queries,
+                                    repeat=repeat, rerank=rerank))
+    return {"runs": runs}
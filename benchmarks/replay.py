@@ -0,0 +1,100 @@
+# benchmarks/replay.py
+"""
+Replay driver: posts Twilio-form payloads to /webhook through the Flask
+test client and reports latency per message kind.
+
+A messages file is JSONL, one {"From": ..., "Body": ...} object per line
+(an optional "kind" groups the results). Without a file, synthetic
+conversations are generated from the catalogue.
+"""
+
+import json
+import time
+import random
+from typing import Dict, Iterator, List
+
+import pandas as pd
+
+from app.services import sheets
+from app.utils import metrics
+from benchmarks.harness import summarize
+
+_FILLER = ["Do you have any stock?", "what is the price of paint", "need plumber tomorrow"]
+
+# The webhook answers 200 on its error paths too; the outcome it recorded
+# for the request tells them apart
+_ERROR_OUTCOMES = ("error", "order_error")
+
+
+def _error_count() -> int:
+    requests = metrics.summary("webhook_request_seconds")
+    return sum(requests.count(outcome=outcome) for outcome in _ERROR_OUTCOMES)
+
+
+def load_messages(path: str) -> List[dict]:
+    messages = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            msg = json.loads(line)
+            messages.append({
+                "From": msg.get("From", "whatsapp:+910000000000"),
+                "Body": msg.get("Body", ""),
+                "kind": msg.get("kind", "replay"),
+            })
+    return messages
+
+
+def synthetic_conversations(df: pd.DataFrame, conversations: int = 50, seed: int = 0) -> Iterator[dict]:
+    """
+    Customer-like traffic: greeting → product query → yes → COD/UPI, with
+    some dropped conversations and unclear messages mixed in.
+    """
+    rng = random.Random(seed)
+    products = df[["ProductName", "SizeText"]].astype(str).values.tolist()
+    for n in range(conversations):
+        phone = f"whatsapp:+9199{n:08d}"
+        name, size = rng.choice(products)
+        qty = rng.choice(["", "2 ", "5 pcs ", "10 pieces "])
+        yield {"From": phone, "Body": "hi", "kind": "greeting"}
+        yield {"From": phone, "Body": f"{qty}{name} {size}".strip(), "kind": "search"}
+        if rng.random() < 0.2:
+            yield {"From": phone, "Body": rng.choice(_FILLER), "kind": "search"}
+            continue
+        yield {"From": phone, "Body": "yes", "kind": "confirm"}
+        yield {"From": phone, "Body": rng.choice(["cod", "upi"]), "kind": "payment"}
+
+
+def replay(app, messages: List[dict]) -> Dict[str, dict]:
+    """
+    Posts every message in order; returns latency stats per kind and
+    overall. errors counts non-200 answers and requests the webhook
+    answered with an error outcome.
+    """
+    client = app.test_client()
+    by_kind: Dict[str, List[float]] = {}
+    errors = 0
+    errors_before = _error_count()
+    for n, msg in enumerate(messages):
+        started = time.perf_counter()
+        # Every delivery gets its own SID, as from Twilio, so none is de-duplicated
+        resp = client.post("/webhook", data={"From": msg["From"], "Body": msg["Body"],
+                                             "MessageSid": msg.get("MessageSid", f"SMbench{n:08d}")})
+        elapsed = time.perf_counter() - started
+        if resp.status_code != 200:
+            errors += 1
+        by_kind.setdefault(msg.get("kind", "replay"), []).append(elapsed)
+
+    errors += _error_count() - errors_before
+
+    writer = sheets.get_writer()
+    if writer is not None:
+        writer.flush(timeout=30)
+
+    everything = [s for samples in by_kind.values() for s in samples]
+    return {
+        "overall": {**summarize(everything), "errors": errors},
+        "by_kind": {kind: summarize(samples) for kind, samples in sorted(by_kind.items())},
+    }
@@ -0,0 +1,118 @@
+# benchmarks/scaling.py
+"""
+How load_catalogue() and enhanced_search() scale with catalogue size, per
+vector index backend. For every (rows, index) pair it reports:
+• load_s          – load_catalogue() wall time (sheet read, embed, index build)
+• memory          – embedding / index bytes and process RSS growth
+• latency         – enhanced_search() with cold caches, per query kind
+• recall          – 'typed' queries (product name + size): share whose top 3
+                    holds an SKU with that name and size; 'free' queries
+                    (brand + size, no product name, so the vector index is
+                    used): overlap of the top 3 with an exact flat search
+"""
+
+import gc
+import time
+import random
+import itertools
+from typing import Dict, List
+
+from app.services import catalogue
+from app.services.vector_index import FlatIndex
+from app.utils.runtime import memory_report
+from benchmarks.catalogue_gen import generate_catalogue
+from benchmarks.fakes import FakeSheetsBackend
+from benchmarks.harness import make_app, measure
+
+TOP_N = 3
+
+
+def _queries(products: List[dict], n: int, seed: int = 0):
+    rng = random.Random(seed)
+    picks = [rng.choice(products) for _ in range(n)]
+    typed = [(f"{p['name']} {p['size_text']}".lower(), p) for p in picks]
+    free  = [f"{p['brand']} {p['size_text']}".lower() for p in picks]
+    return typed, free
+
+
+def _clear_caches():
+    catalogue._query_embedding_cache.clear()
+    catalogue._result_cache.clear()
+
+
+def _index_bytes(index) -> int:
+    return sum(getattr(index, attr).nbytes for attr in ("centroids", "order", "offsets")
+               if hasattr(index, attr))
+
+
+def _latency(queries: List[str], repeat: int) -> dict:
+    it = itertools.count()
+    return measure(lambda: catalogue.enhanced_search(queries[next(it) % len(queries)], top_n=TOP_N),
+                   repeat, warmup=5, setup=_clear_caches)
+
+
+def _typed_recall(typed) -> float:
+    hits = 0
+    for query, target in typed:
+        results = catalogue.enhanced_search(query, top_n=TOP_N)
+        hits += any(r['name'] == target['name'] and r['size_text'] == target['size_text'] for r in results)
+    return hits / len(typed)
+
+
+def _free_recall(free) -> float:
+    """Top-N overlap with an exact search over the same snapshot."""
+    snap = catalogue._snapshot
+    _clear_caches()
+    approx = [{p['id'] for p in catalogue.enhanced_search(q, top_n=TOP_N)} for q in free]
+    original, snap.index = snap.index, FlatIndex(snap.embeddings)
+    try:
+        _clear_caches()
+        exact = [{p['id'] for p in catalogue.enhanced_search(q, top_n=TOP_N)} for q in free]
+    finally:
+        snap.index = original
+        _clear_caches()
+    return sum(len(a & e) for a, e in zip(approx, exact)) / max(1, sum(len(e) for e in exact))
+
+
+def run_one(df, index_kind: str, queries: int = 200, repeat: int = 200, **overrides) -> dict:
+    backend = FakeSheetsBackend(df)
+    gc.collect()
+    rss_before = memory_report().get('rss_mb')
+    app = make_app(backend, load=False, VECTOR_INDEX=index_kind, VECTOR_INDEX_MIN_ROWS=0, **overrides)
+    with app.app_context():
+        started = time.perf_counter()
+        catalogue.load_catalogue()
+        load_s = time.perf_counter() - started
+        rss_after = memory_report().get('rss_mb')
+
+        snap = catalogue._snapshot
+        typed, free = _queries(snap.products, queries)
+        result = {
+            "rows": len(snap),
+            "index": snap.index.kind,
+            "load_s": round(load_s, 3),
+            "memory": {
+                "embedding_mb": round(snap.embeddings.nbytes / 2 ** 20, 2),
+                "index_mb": round(_index_bytes(snap.index) / 2 ** 20, 2),
+                "rss_growth_mb": round(rss_after - rss_before, 1) if rss_before is not None else None,
+            },
+            "latency": {
+                "typed": _latency([q for q, _ in typed], repeat),
+                "free": _latency(free, repeat),
+            },
+            "recall": {
+                "typed_hit_at_3": round(_typed_recall(typed), 4),
+                "free_overlap_at_3": round(_free_recall(free), 4),
+            },
+        }
+    return result
+
+
+def run(sizes=(1000, 10000, 100000), indexes=("flat", "ivf"), queries: int = 200,
+        repeat: int = 200, seed: int = 0) -> Dict[str, list]:
+    runs = []
+    for rows in sizes:
+        df = generate_catalogue(rows, seed=seed)
+        for kind in indexes:
+            runs.append(run_one(df, kind, queries=queries, repeat=repeat))
+    return {"runs": runs}
@@ -0,0 +1,45 @@
+# gunicorn.conf.py
+# Usage: gunicorn -c gunicorn.conf.py run:app
+#
+# With GUNICORN_PRELOAD=True (default) the master imports the app once:
+# torch, the model weights and the catalogue arrays are loaded before
+# forking, and workers share those pages copy-on-write. Background threads
+# are started per worker in post_fork, since threads don't survive fork().
+import os
+import time
+
+bind        = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers     = int(os.getenv('WEB_CONCURRENCY', 2))
+# Threaded workers: each request thread runs the async webhook, so one
+# worker serves several customers while their Sheets calls are in flight
+worker_class = 'gthread'
+threads      = int(os.getenv('GUNICORN_THREADS', 4))
+timeout     = int(os.getenv('GUNICORN_TIMEOUT', 60))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+
+if preload_app:
+    os.environ['DEFER_BACKGROUND_SERVICES'] = 'True'
+
+_boot_started = time.monotonic()
+
+
+def when_ready(server):
+    from app.utils.runtime import memory_report
+    server.log.info(f"🚀 Master ready in {time.monotonic() - _boot_started:.2f}s "
+                    f"(preload={preload_app}), memory: {memory_report()}")
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    from run import app
+    from app import start_background_services
+    from app.utils.logger import restart_logging_after_fork
+    restart_logging_after_fork()
+    start_background_services(app)
+
+
+def post_worker_init(worker):
+    from app.utils.runtime import memory_report
+    worker.log.info(f"👷 Worker {worker.pid} booted {time.monotonic() - _boot_started:.2f}s after master start, "
+                    f"memory: {memory_report()}")